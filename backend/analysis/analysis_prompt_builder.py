@@ -2,7 +2,7 @@ from __future__ import annotations
 from typing import Optional
 import os
 
-from tikhub_api.orm.prompt_template_repository import PromptTemplateRepository
+from tikhub_api.orm import prompt_cache
 from tikhub_api.orm.enums import PromptName
 
 from common.prompt_renderer import render_prompt
@@ -30,7 +30,7 @@ def get_system_prompt(name: PromptName = PromptName.ANALYZE_VIDEO, project_id: s
     """
     # 1) 优先从 DB 读取激活模板
     try:
-        tpl = PromptTemplateRepository.get_active_by_name(name.value)
+        tpl = prompt_cache.get_active_template(name.value)
         if tpl and getattr(tpl, "content", None):
             return render_prompt(str(tpl.content), project_id)
     except Exception:
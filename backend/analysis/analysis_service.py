@@ -1,19 +1,28 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional, List, Tuple
+from typing import IO, Any, Dict, Optional, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import contextvars
+import os
+import time
 import requests
 
 from jobs.logger import get_logger
 from jobs.config import Settings
+from common.request_context import set_project_id, reset_project_id
 
 
 from .gemini_client import GeminiClient
+from . import comment_selector, file_cache, result_cache, video_preprocess
+from .step_graph import StepGraph
 from .analysis_prompt_builder import get_system_prompt
 
 from tikhub_api.orm.post_repository import PostRepository
-from tikhub_api.orm.models import PlatformPost
+from tikhub_api.orm.models import PlatformPost, PostRef
 from tikhub_api.orm.video_analysis_repository import VideoAnalysisRepository
 from tikhub_api.orm.comment_repository import CommentRepository
 from tikhub_api.video_downloader import VideoDownloader
+from tikhub_api.utils.url_validator import validate_before_download
 from tikhub_api.fetchers import create_fetcher
 
 
@@ -24,6 +33,44 @@ except Exception:  # pragma: no cover
 
 log = get_logger(__name__)
 
+# 图文帖图片下载/上传的进程级共享线程池（全局并发上限，多个分析任务共用）
+IMAGE_WORKERS = int(os.getenv("ANALYSIS_IMAGE_WORKERS", "8"))
+_image_executor = ThreadPoolExecutor(max_workers=max(1, IMAGE_WORKERS), thread_name_prefix="image-upload")
+# analyze_post 准备阶段各步骤（详情补全/媒体/评论/prompt）的共享线程池
+STEP_WORKERS = int(os.getenv("ANALYSIS_STEP_WORKERS", "16"))
+_step_executor = ThreadPoolExecutor(max_workers=max(1, STEP_WORKERS), thread_name_prefix="analyze-step")
+
+
+@dataclass
+class PreparedRequest:
+    """analyze_post / analyze_posts_batch 共用的已准备好的生成请求。"""
+    post: PlatformPost
+    full_parts: List[Any]
+    system_prompt: str
+    source_key: str
+    fingerprint: Optional[str]  # 分析输入指纹（见 result_cache），媒体哈希未知或缓存关闭时为 None
+    timings: Dict[str, float]
+    hit: Optional[Any] = None  # 输入相同的已有分析结果（VideoAnalysis）；命中时媒体未上传，full_parts 为空
+
+
+@dataclass
+class MediaSource:
+    """媒体准备的前半段：已就绪的 Parts（文件缓存命中 / 图文），或已下载、待预处理上传的视频。
+
+    源文件哈希在下载后即已知，调用方可先按输入指纹查分析结果缓存，命中时不再转码与上传。
+    """
+    media_hash: Optional[str]
+    parts: Optional[List[Any]] = None
+    source_key: Optional[str] = None
+    data: Optional[IO[bytes]] = None  # 待上传视频的下载临时文件（关闭即删除）
+    digest: Optional[str] = None
+    prep_fp: Optional[str] = None
+    keys: Tuple[Optional[str], ...] = ()  # 上传后登记的文件缓存键（内容级、帖子级）
+
+    def close(self) -> None:
+        if self.data is not None:
+            self.data.close()
+
 
 class AnalysisService:
     """
@@ -39,113 +86,300 @@ class AnalysisService:
         self.gemini = gemini_client or GeminiClient(api_key=Settings.from_env().GEMINI_API_KEY_ANALYZE)
         self.downloader = VideoDownloader()
 
-    def analyze_post(self, post_id: int) -> Dict[str, Any]:
-        from tikhub_api.orm.enums import AnalysisStatus, PostType, PromptName
+    def analyze_post(self, post_id: int, force: bool = False) -> Dict[str, Any]:
+        """分析单条帖子并入库。输入与已有分析结果完全相同时直接复用（见 result_cache），force=True 强制重新调用模型。"""
+        from tikhub_api.orm.enums import AnalysisStatus
         log.info(f"开始处理帖子 post_id={post_id}：准备读取帖子信息")
         try:
-            post = self._get_post(post_id)
+            req = self._prepare_request(post_id, force=force)
+            post, timings = req.post, req.timings
+
+            if req.hit is not None:
+                log.info({"analyze_steps_ms": {"post_id": post_id, **timings, "result_cache_hit": req.hit.id}})
+                return self._reuse_result(req, req.hit)
 
-            # 1) 创建平台 fetcher 并按类型准备 contents（视频/图文）
+            # 3) 调用 generate_content（公共逻辑；system prompt 按项目走 Gemini 上下文缓存）
+            log.info(f"开始调用 Gemini 生成内容：post_id={post_id}")
+            gen_start = time.perf_counter()
+            resp = self.gemini.generate_content(
+                self.gemini.analysis_model,
+                req.full_parts,
+                req.system_prompt,
+                project_id=post.project_id,
+                temperature=0.3,
+                response_mime_type="application/json",
+            )
+            timings["generate"] = round((time.perf_counter() - gen_start) * 1000, 1)
+            log.info({"analyze_steps_ms": {"post_id": post_id, **timings}})
+            return self._save_result(req, resp)
+        except Exception as e:
             try:
-                fetcher = create_fetcher(str(post.platform))
-            except Exception as e:
+                PostRepository.update_analysis_status(post_id, AnalysisStatus.ANALYSIS_FAILED.value)
                 log.error(
-                    f"创建 fetcher 失败：post_id={post_id}, platform={getattr(post, 'platform', None)}, err={e}"
+                    f"分析失败，已更新状态为 ANALYSIS_FAILED：post_id={post_id}, err={e}"
                 )
-                raise
+            except Exception as ue:
+                log.exception("更新 ANALYSIS_FAILED 状态失败：post_id=%s, err=%s", post_id, ue)
+            raise
 
-            # 2) 小红书平台需要补全详情信息
-            post = self._ensure_post_details_complete(post, fetcher)
+    def analyze_posts_batch(self, refs: List[PostRef], poll_sec: float = 30, timeout_sec: float = 86400) -> Dict[str, int]:
+        """批量模式：逐帖准备 contents，合并为一个 Gemini batch job 提交并轮询，结果逐帖映射保存。
 
-            # 3) 构建完整的 contents（包含文本和媒体）
-            full_parts, source_key = self._build_full_contents(post, fetcher)
+        调用方已将这些帖子认领为 BATCH_QUEUED；本方法尽量把每条帖子推进到终态：
+        - 准备失败、单条结果失败：ANALYSIS_FAILED（与交互模式一致）
+        - 输入与已有结果相同：直接复用，不进入 batch job（计入 reused）
+        - job 整体失败/超时：保持 BATCH_QUEUED（计入 unfinished），由调用方按重试上限退回 PENDING 或置为 ANALYSIS_FAILED
+        返回计数 {"submitted", "analyzed", "reused", "failed", "unfinished"}。
+        """
+        counts = {"submitted": 0, "analyzed": 0, "reused": 0, "failed": 0, "unfinished": 0}
+        prepared: List[PreparedRequest] = []
+        requests: List[Any] = []
+        for ref in refs:
+            # 同一批次可能跨项目：按帖子注入 project_id（prompt 渲染、日志上下文依赖它）
+            token = set_project_id(str(ref.project_id)) if ref.project_id else None
+            try:
+                req = self._prepare_request(int(ref.id))
+                if req.hit is not None:
+                    self._reuse_result(req, req.hit)
+                    counts["reused"] += 1
+                    continue
+            except Exception as e:
+                log.error(f"批量分析准备失败：post_id={ref.id}, err={e}")
+                self._mark_failed(int(ref.id))
+                counts["failed"] += 1
+                continue
+            finally:
+                if token:
+                    reset_project_id(token)
+            prepared.append(req)
+            requests.append(types.InlinedRequest(
+                model=self.gemini.analysis_model,
+                contents=[types.Content(role="user", parts=req.full_parts)],
+                metadata={"post_id": str(req.post.id)},
+                config=types.GenerateContentConfig(
+                    system_instruction=req.system_prompt,
+                    temperature=0.3,
+                    response_mime_type="application/json",
+                ),
+            ))
+        if not requests:
+            return counts
+
+        counts["submitted"] = len(requests)
+        try:
+            results = self.gemini.run_batch(
+                self.gemini.analysis_model,
+                requests,
+                display_name=f"gg-analyze-{int(time.time())}-{len(requests)}",
+                poll_sec=poll_sec,
+                timeout_sec=timeout_sec,
+            )
+        except Exception as e:
+            log.error(f"批量分析 job 失败，{len(prepared)} 条帖子保持 BATCH_QUEUED，交由调用方处理：err={e}")
+            counts["unfinished"] = len(prepared)
+            return counts
 
-            if types is None:
-                raise RuntimeError("google-genai SDK 未正确安装")
+        for req, (resp, err) in zip(prepared, results):
+            post = req.post
+            token = set_project_id(str(post.project_id)) if post.project_id else None
+            try:
+                if resp is None:
+                    raise RuntimeError(err or "empty batch response")
+                self._save_result(req, resp)
+                counts["analyzed"] += 1
+            except Exception as e:
+                log.error(f"批量分析结果处理失败：post_id={post.id}, err={e}")
+                self._mark_failed(post.id)
+                counts["failed"] += 1
+            finally:
+                if token:
+                    reset_project_id(token)
+        log.info({"analyze_batch": counts})
+        return counts
+
+    def _prepare_request(self, post_id: int, force: bool = False) -> PreparedRequest:
+        """读取帖子并准备生成请求（contents、system prompt、输入指纹与各步骤耗时）。
+
+        媒体源文件就绪（视频下载完成、尚未预处理上传）后即按输入指纹查分析结果缓存（force=True 时不查）；
+        命中时跳过转码与上传，返回的 PreparedRequest.hit 为已有结果。
+        """
+        from tikhub_api.orm.enums import PostType, PromptName
 
-            # 2) 构建 prompt 与调用 generate_content（公共逻辑）
-            log.info(f"开始构建 prompt：post_id={post_id}")
-            prompt_name = PromptName.ANALYZE_VIDEO if post.post_type == PostType.VIDEO else PromptName.ANALYZE_PICTURE
-            system_prompt = get_system_prompt(prompt_name,post.project_id)
-            config = types.GenerateContentConfig(
-                temperature=0.3,
-                response_mime_type="application/json",
-                system_instruction=system_prompt,
-            )
+        post = self._get_post(post_id)
 
-            log.info(f"开始调用 Gemini 生成内容：post_id={post_id}")
-            resp = self.gemini.client.models.generate_content(
-                model=self.gemini.analysis_model,
-                contents=full_parts,
-                config=config,
+        # 1) 创建平台 fetcher 并按类型准备 contents（视频/图文）
+        try:
+            fetcher = create_fetcher(str(post.platform))
+        except Exception as e:
+            log.error(
+                f"创建 fetcher 失败：post_id={post_id}, platform={getattr(post, 'platform', None)}, err={e}"
             )
-            # 打印大模型的原始返回，便于排查
-            try:
-                text_raw = getattr(resp, "text", None) or getattr(resp, "output_text", None)
-                log.info(f"Gemini 返回文本：{text_raw}")
-                cands = getattr(resp, "candidates", None)
-                if cands is not None:
-                    log.info(f"Gemini 返回候选数：{len(cands)}")
-            except Exception as _e:
-                log.info(f"打印模型返回文本失败：{_e}")
+            raise
 
-            log.info(
-                f"生成完成：post_id={post_id}，model={getattr(resp, 'model_version', self.gemini.analysis_model)}"
+        if types is None:
+            raise RuntimeError("google-genai SDK 未正确安装")
+
+        # 2) 准备阶段按 DAG 并发执行：详情补全 / 媒体下载上传 / 评论读取 / prompt 渲染互不阻塞，
+        #    关键路径为 媒体就绪 + 生成。仅当帖子尚无媒体地址时，媒体步骤才等待小红书详情补全。
+        #    媒体拆为 source（下载/文件缓存）与 media（预处理+上传），中间的 lookup 命中已有结果时 media 直接跳过
+        prompt_name = PromptName.ANALYZE_VIDEO if post.post_type == PostType.VIDEO else PromptName.ANALYZE_PICTURE
+        media_deps = () if self._has_media_urls(post) else ("details",)
+        sources: List[MediaSource] = []
+
+        def fetch_source(r: Dict[str, Any]) -> MediaSource:
+            src = self._fetch_media_source(r.get("details", post), fetcher)
+            sources.append(src)
+            return src
+
+        graph = (
+            StepGraph(_step_executor)
+            .add("details", lambda r: self._ensure_post_details_complete(post, fetcher))
+            .add("comments", lambda r: self._safe_comment_parts(post_id))
+            .add("prompt", lambda r: get_system_prompt(prompt_name, post.project_id))
+            .add("source", fetch_source, deps=media_deps)
+            .add("lookup", lambda r: self._lookup_result(
+                r["details"], r["source"].media_hash, r["comments"], r["prompt"], force,
+            ), deps=("details", "comments", "prompt", "source"))
+            .add("media", lambda r: None if r["lookup"][1] is not None else self._upload_media_source(
+                r["details"], r["source"],
+            ), deps=("source", "lookup"))
+        )
+        try:
+            steps, timings = graph.run()
+        finally:
+            for src in sources:  # 命中结果缓存或中途失败时删除未上传的下载临时文件
+                src.close()
+
+        post = steps["details"]
+        system_prompt = steps["prompt"]
+        fingerprint, hit = steps["lookup"]
+        if hit is not None:
+            return PreparedRequest(post, [], system_prompt, steps["source"].source_key, fingerprint, timings, hit)
+        media_parts, source_key = steps["media"]
+        full_parts = self._assemble_contents(post, media_parts, steps["comments"])
+        return PreparedRequest(post, full_parts, system_prompt, source_key, fingerprint, timings)
+
+    def _lookup_result(self, post: PlatformPost, media_hash: Optional[str], comment_parts: List[Any],
+                       system_prompt: str, force: bool) -> Tuple[Optional[str], Optional[Any]]:
+        """计算分析输入指纹并查已有结果，返回 (指纹, 命中的 VideoAnalysis 或 None)。"""
+        fingerprint = result_cache.fingerprint(
+            media_hash,
+            getattr(post, "title", None),
+            getattr(post, "content", None),
+            [str(getattr(p, "text", "") or "") for p in comment_parts],
+            system_prompt,
+            self.gemini.analysis_model,
+        )
+        return fingerprint, None if force else result_cache.lookup(post.project_id, fingerprint)
+
+    def _reuse_result(self, req: PreparedRequest, hit: Any) -> Dict[str, Any]:
+        """复用输入相同的已有分析结果：同一帖子直接返回；其他帖子（重复行等）按原始结果为本帖映射保存一份。"""
+        post = req.post
+        log.info(f"命中分析结果缓存，跳过模型调用：post_id={post.id}，analysis_id={hit.id}，来源 post_id={hit.post_id}")
+        if hit.post_id == post.id:
+            saved, payload = hit, {}
+        else:
+            payload = self._map_result_to_video_analysis(
+                post, hit.analysis_detail or {}, source_path=self._source_path(post, req.source_key),
+                system_prompt=req.system_prompt,
             )
+            payload["input_fingerprint"] = req.fingerprint
+            saved = VideoAnalysisRepository.upsert(payload)
+        return self._finish(post.id, saved, payload)
 
-            text = getattr(resp, "text", None) or getattr(resp, "output_text", None)
-            result: Dict[str, Any]
-            if text:
+    def _save_result(self, req: PreparedRequest, resp: Any) -> Dict[str, Any]:
+        """解析模型返回并落库（gg_video_analysis upsert + 帖子置 ANALYZED），返回可 JSON 序列化的结果。"""
+        post, system_prompt, source_key = req.post, req.system_prompt, req.source_key
+        post_id = post.id
+        # 打印大模型的原始返回，便于排查
+        try:
+            text_raw = getattr(resp, "text", None) or getattr(resp, "output_text", None)
+            log.info(f"Gemini 返回文本：{text_raw}")
+            cands = getattr(resp, "candidates", None)
+            if cands is not None:
+                log.info(f"Gemini 返回候选数：{len(cands)}")
+        except Exception as _e:
+            log.info(f"打印模型返回文本失败：{_e}")
+
+        log.info(
+            f"生成完成：post_id={post_id}，model={getattr(resp, 'model_version', self.gemini.analysis_model)}"
+        )
+
+        text = getattr(resp, "text", None) or getattr(resp, "output_text", None)
+        result: Dict[str, Any]
+        if text:
+            try:
+                import json
+                result = json.loads(text)
+            except Exception:
+                result = {"raw_text": text}
+        else:
+            # 兜底：尽量序列化 resp
+            def _to_jsonable(obj):
+                if obj is None or isinstance(obj, (str, int, float, bool)):
+                    return obj
                 try:
                     import json
-                    result = json.loads(text)
+                    json.dumps(obj)
+                    return obj
                 except Exception:
-                    result = {"raw_text": text}
-            else:
-                # 兜底：尽量序列化 resp
-                def _to_jsonable(obj):
-                    if obj is None or isinstance(obj, (str, int, float, bool)):
-                        return obj
-                    try:
-                        import json
-                        json.dumps(obj)
-                        return obj
-                    except Exception:
-                        pass
-                    try:
-                        return obj.__dict__
-                    except Exception:
-                        return str(obj)
-                result = {"raw_response": _to_jsonable(resp)}
-
-            # 3) 字段映射并保存（source_path 使用上传完成后的文件/图片集合 URI 串）
-            source_path = source_key or f"post:{post.id}"
-            payload = self._map_result_to_video_analysis(post, result, source_path=source_path, system_prompt=system_prompt)
+                    pass
+                try:
+                    return obj.__dict__
+                except Exception:
+                    return str(obj)
+            result = {"raw_response": _to_jsonable(resp)}
+
+        # 字段映射并保存（source_path 为本帖唯一键，见 _source_path）
+        source_path = self._source_path(post, source_key)
+        payload = self._map_result_to_video_analysis(post, result, source_path=source_path, system_prompt=system_prompt)
+        if req.fingerprint:
+            payload["input_fingerprint"] = req.fingerprint
+        try:
+            saved = VideoAnalysisRepository.upsert(payload)
+        except Exception as e:
+            # 未执行 input_fingerprint 列的 DDL 时去掉该字段重试（结果缓存随之停用）
+            if "input_fingerprint" not in payload or not result_cache.column_missing(e):
+                raise
+            payload.pop("input_fingerprint")
             saved = VideoAnalysisRepository.upsert(payload)
+        return self._finish(post_id, saved, payload)
 
-            # 标记分析完成
-            try:
-                PostRepository.update_analysis_status(post_id, AnalysisStatus.ANALYZED.value)
-                log.info(f"分析成功，已更新状态为 ANALYZED：post_id={post_id}")
-            except Exception as ue:
-                log.exception("更新 ANALYZED 状态失败：post_id=%s, err=%s", post_id, ue)
+    @staticmethod
+    def _source_path(post: PlatformPost, source_key: Optional[str]) -> str:
+        """gg_video_analysis 的唯一键：文件/图片集合 URI 串 + 帖子 id。
 
-            # 返回可 JSON 序列化的结果（避免 datetime 等导致 json.dumps 失败）
-            try:
-                if hasattr(saved, "model_dump"):
-                    return saved.model_dump(mode="json", exclude_none=True)  # pydantic v2
-            except Exception:
-                pass
-            return payload
-        except Exception as e:
-            try:
-                PostRepository.update_analysis_status(post_id, AnalysisStatus.ANALYSIS_FAILED.value)
-                log.error(
-                    f"分析失败，已更新状态为 ANALYSIS_FAILED：post_id={post_id}, err={e}"
-                )
-            except Exception as ue:
-                log.exception("更新 ANALYSIS_FAILED 状态失败：post_id=%s, err=%s", post_id, ue)
-            raise
+        内容级文件缓存会让同一视频/图片集合的多条帖子共用 Gemini 文件 URI，仅用 URI 会使这些帖子写入同一行、互相覆盖。
+        """
+        return f"{source_key}#post:{post.id}" if source_key else f"post:{post.id}"
+
+    @staticmethod
+    def _finish(post_id: Optional[int], saved: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """帖子置 ANALYZED，返回可 JSON 序列化的分析结果。"""
+        from tikhub_api.orm.enums import AnalysisStatus
+
+        # 标记分析完成
+        try:
+            PostRepository.update_analysis_status(post_id, AnalysisStatus.ANALYZED.value)
+            log.info(f"分析成功，已更新状态为 ANALYZED：post_id={post_id}")
+        except Exception as ue:
+            log.exception("更新 ANALYZED 状态失败：post_id=%s, err=%s", post_id, ue)
+
+        # 返回可 JSON 序列化的结果（避免 datetime 等导致 json.dumps 失败）
+        try:
+            if hasattr(saved, "model_dump"):
+                return saved.model_dump(mode="json", exclude_none=True)  # pydantic v2
+        except Exception:
+            pass
+        return payload
+
+    @staticmethod
+    def _mark_failed(post_id: int) -> None:
+        from tikhub_api.orm.enums import AnalysisStatus
+        try:
+            PostRepository.update_analysis_status(post_id, AnalysisStatus.ANALYSIS_FAILED.value)
+        except Exception as ue:
+            log.exception("更新 ANALYSIS_FAILED 状态失败：post_id=%s, err=%s", post_id, ue)
 
     def _build_full_contents(self, post: PlatformPost, fetcher, include_comments: bool = True, max_comments: int = 100) -> Tuple[List[Any], str]:
         """
@@ -165,17 +399,60 @@ class AnalysisService:
         返回:
             (full_parts, source_key)
         """
+        media_parts, source_key, _ = self._prepare_media_parts(post, fetcher)
+        comment_parts = self._safe_comment_parts(post.id, max_comments=max_comments) if include_comments else []
+        return self._assemble_contents(post, media_parts, comment_parts), source_key
+
+    def _prepare_media_parts(self, post: PlatformPost, fetcher) -> Tuple[List[Any], str, Optional[str]]:
+        """根据帖子类型准备媒体 Parts，返回 (media_parts, source_key, 媒体内容哈希)。
+
+        媒体内容哈希由源文件 sha256 合成（见 result_cache.media_hash；视频另含预处理配置指纹），未知时为 None。
+        """
         from tikhub_api.orm.enums import PostType
 
-        if types is None:
-            raise RuntimeError("google-genai SDK 未正确安装")
+        if post.post_type == PostType.VIDEO:
+            return self._prepare_video_parts(post, fetcher)
+        # 默认按图文处理
+        return self._prepare_image_parts(post, fetcher)
+
+    def _fetch_media_source(self, post: PlatformPost, fetcher) -> MediaSource:
+        """媒体准备的前半段：视频只下载并计算哈希（文件缓存命中时直接就绪）；图文按原流程上传完成。"""
+        from tikhub_api.orm.enums import PostType
 
-        # 根据帖子类型准备媒体 Parts
         if post.post_type == PostType.VIDEO:
-            media_parts, source_key = self._prepare_video_parts(post, fetcher)
-        else:
-            # 默认按图文处理
-            media_parts, source_key = self._prepare_image_parts(post, fetcher)
+            return self._fetch_video_source(post, fetcher)
+        parts, source_key, media_hash = self._prepare_image_parts(post, fetcher)
+        return MediaSource(media_hash, parts, source_key)
+
+    def _upload_media_source(self, post: PlatformPost, src: MediaSource) -> Tuple[List[Any], str]:
+        """媒体准备的后半段：已就绪的直接返回，否则预处理并上传视频，返回 (media_parts, source_key)。"""
+        if src.parts is not None:
+            return src.parts, str(src.source_key)
+        return self._upload_video_source(post, src)
+
+    @staticmethod
+    def _has_media_urls(post: PlatformPost) -> bool:
+        """帖子是否已存有媒体地址（有则媒体步骤无需等待详情补全；地址失效时媒体步骤自身会回退 fetcher）。"""
+        from tikhub_api.orm.enums import PostType
+
+        if post.post_type == PostType.VIDEO:
+            return bool(getattr(post, "video_url", None))
+        return bool(getattr(post, "image_urls", None))
+
+    def _safe_comment_parts(self, post_id: Optional[int], max_comments: int = 100) -> List[Any]:
+        """读取评论 Parts；失败时返回空列表（评论缺失不影响分析）。"""
+        try:
+            return self._prepare_comment_parts(int(post_id or 0), max_comments=max_comments)
+        except Exception as e:
+            log.warning(f"获取评论失败，跳过评论分析：post_id={post_id}，err={e}")
+            return []
+
+    def _assemble_contents(self, post: PlatformPost, media_parts: List[Any], comment_parts: List[Any]) -> List[Any]:
+        """按 Title -> Content -> Media 标注 -> 媒体 Parts -> 评论 的顺序组装 contents。"""
+        from tikhub_api.orm.enums import PostType
+
+        if types is None:
+            raise RuntimeError("google-genai SDK 未正确安装")
 
         # 构建最终 contents 顺序：Title -> Content -> Media 标注 -> 媒体 Parts
         full_parts: List[Any] = []
@@ -202,32 +479,31 @@ class AnalysisService:
         # 添加媒体 Parts
         full_parts.extend(media_parts)
 
-        # 添加评论（如果启用）
-        if include_comments:
-            try:
-                comment_parts = self._prepare_comment_parts(post.id, max_comments=max_comments)
-                if comment_parts:
-                    # 添加评论引导文本
-                    full_parts.append(types.Part(
-                        text="以下是与该视频对应的评论数据，请一并纳入分析，并在 events 中标注来源 source=video 或 source=comment。"
-                    ))
-                    # 添加评论 Parts
-                    full_parts.extend(comment_parts)
-                    log.info(f"已添加评论到 contents：post_id={post.id}，评论 Parts 数={len(comment_parts)}")
-                else:
-                    log.info(f"没有评论需要添加：post_id={post.id}")
-            except Exception as e:
-                log.warning(f"获取评论失败，跳过评论分析：post_id={post.id}，err={e}")
+        # 添加评论
+        if comment_parts:
+            # 添加评论引导文本
+            full_parts.append(types.Part(
+                text="以下是与该视频对应的评论数据，请一并纳入分析，并在 events 中标注来源 source=video 或 source=comment。"
+                     "评论为列式 JSON：rows 每行按 fields 顺序，dup 为内容相同或相近的评论条数。"
+            ))
+            # 添加评论 Parts
+            full_parts.extend(comment_parts)
+            log.info(f"已添加评论到 contents：post_id={post.id}，评论 Parts 数={len(comment_parts)}")
+        else:
+            log.info(f"没有评论需要添加：post_id={post.id}")
 
-        return full_parts, source_key
+        return full_parts
 
     def _prepare_comment_parts(self, post_id: int, max_comments: int = 100) -> List[Any]:
         """
         获取评论并构建评论 Parts
 
+        候选集为高互动 + 最新评论，经去重、排序、截断后在 token 预算内挑选（见 analysis.comment_selector），
+        以列式紧凑 JSON 输出；每帖记录估算节省的 token。
+
         参数:
             post_id: 帖子ID
-            max_comments: 最大评论数量，默认100
+            max_comments: 最多入选的评论数量，默认100
 
         返回:
             List[types.Part]: 包含评论文本的 Parts 列表
@@ -235,10 +511,13 @@ class AnalysisService:
         if types is None:
             raise RuntimeError("google-genai SDK 未正确安装")
 
-        # 1. 从 CommentRepository 获取评论
+        # 1. 从 CommentRepository 获取候选评论（高互动 + 最新）
         try:
-            comments = CommentRepository.list_by_post(post_id, limit=max_comments)
-            log.info(f"获取评论成功：post_id={post_id}，评论数={len(comments)}")
+            comments = comment_selector.merge_candidates(
+                CommentRepository.list_top_by_post(post_id, limit=comment_selector.TOP_CANDIDATES),
+                CommentRepository.list_by_post(post_id, limit=comment_selector.RECENT_CANDIDATES),
+            )
+            log.info(f"获取评论成功：post_id={post_id}，候选评论数={len(comments)}")
         except Exception as e:
             log.error(f"获取评论失败：post_id={post_id}，err={e}")
             return []
@@ -247,62 +526,56 @@ class AnalysisService:
             log.info(f"该帖子没有评论：post_id={post_id}")
             return []
 
-        # 2. 规范化评论数据格式
-        normalized_comments = []
-        for comment in comments:
-            try:
-                normalized = {
-                    "id": str(comment.platform_comment_id),
-                    "text": str(comment.content),
-                }
-                # 可选字段
-                if comment.author_name:
-                    normalized["author"] = str(comment.author_name)
-                if comment.like_count is not None:
-                    normalized["like_count"] = int(comment.like_count)
-                if comment.published_at:
-                    normalized["published_at"] = comment.published_at.isoformat()
-
-                normalized_comments.append(normalized)
-            except Exception as e:
-                log.warning(f"规范化评论失败，跳过该评论：post_id={post_id}，comment_id={getattr(comment, 'id', None)}，err={e}")
-                continue
-
-        if not normalized_comments:
-            log.warning(f"所有评论规范化失败：post_id={post_id}")
+        # 2. 去重、排序、截断并在 token 预算内挑选
+        payload, stats = comment_selector.select(comments, max_comments=max_comments)
+        log.info(stats.as_log(post_id))
+        if payload is None:
+            log.warning(f"没有可用的评论：post_id={post_id}")
             return []
 
-        # 3. 构建 JSON 格式的评论数据
-        import json
-        comments_payload = {
-            "schema": {
-                "id": "string",
-                "text": "string",
-                "author": "string (optional)",
-                "like_count": "int (optional)",
-                "published_at": "datetime (optional)"
-            },
-            "items": normalized_comments
-        }
-
-        # 4. 返回 types.Part 列表
+        # 3. 返回 types.Part 列表（rows 中每行按 fields 顺序；dup 为合并的重复/近似重复评论条数）
         parts: List[Any] = [
             types.Part(text="[COMMENTS_JSON_START]"),
-            types.Part(text=json.dumps(comments_payload, ensure_ascii=False)),
+            types.Part(text=payload),
             types.Part(text="[COMMENTS_JSON_END]")
         ]
 
-        log.info(f"评论 Parts 构建完成：post_id={post_id}，有效评论数={len(normalized_comments)}")
+        log.info(f"评论 Parts 构建完成：post_id={post_id}，入选评论数={stats.selected}")
         return parts
 
-    def _prepare_video_parts(self, post: PlatformPost, fetcher) -> Tuple[List[Any], str]:
-        """下载→上传→构建视频 Part，返回 (parts, source_key)。
+    def _prepare_video_parts(self, post: PlatformPost, fetcher) -> Tuple[List[Any], str, Optional[str]]:
+        """下载→上传→构建视频 Part，返回 (parts, source_key, 媒体内容哈希)。"""
+        src = self._fetch_video_source(post, fetcher)
+        try:
+            parts, source_key = self._upload_media_source(post, src)
+        finally:
+            src.close()
+        return parts, source_key, src.media_hash
+
+    def _fetch_video_source(self, post: PlatformPost, fetcher) -> MediaSource:
+        """命中 Gemini 文件缓存时返回就绪的视频 Part；否则下载到临时文件并计算 sha256，返回待上传的 MediaSource。
 
         下载策略：
-        1. 优先使用 post.video_url 中存储的 URL 列表
+        1. 优先使用 post.video_url 中存储的 URL 列表（下载前即时校验：剔除已过期/不可用的 URL，结果带缓存）
         2. 如果全部失败，再使用 fetcher 从平台接口获取最新下载地址
         """
         post_id = int(post.id or 0)
+        mime_type = "video/mp4"
+
+        # 预处理配置指纹参与文件缓存键：预处理配置变化（或开关 ffmpeg）后不复用按旧配置上传的文件
+        prep_fp = video_preprocess.fingerprint()
+        video_kind = f"video:{prep_fp}" if prep_fp else "video"
+
+        # 帖子级文件缓存：该帖子的视频仍在 Gemini 有效期内时，跳过下载与上传
+        post_key = file_cache.item_key(getattr(post, "platform", None), getattr(post, "platform_item_id", None), video_kind)
+        cached = file_cache.lookup(self.gemini, post_key)
+        if cached:
+            log.info(f"命中 Gemini 文件缓存（帖子），跳过下载与上传：post_id={post_id}，uri={cached[0].get('uri')}")
+            return MediaSource(
+                self._video_media_hash(cached[0].get("content_hash"), prep_fp),
+                [self._video_part(cached[0]["uri"], cached[0].get("mime_type") or mime_type)],
+                str(cached[0]["uri"]),
+            )
 
         # 第一步：尝试使用 post.video_url 中存储的 URL 列表
         stored_video_urls: List[str] = []
@@ -316,14 +589,18 @@ class AnalysisService:
                 stored_video_urls = [str(video_url_attr)]
 
         log.info(f"从 post.video_url 获取到 {len(stored_video_urls)} 个存储的下载地址：post_id={post_id}")
+        if stored_video_urls:
+            # eager 模式只离线剔除已过期 URL；lazy 模式另行联网校验（结果带缓存）
+            stored_video_urls = validate_before_download(stored_video_urls)
+            log.info(f"下载前校验后可用的存储地址：{len(stored_video_urls)} 个：post_id={post_id}")
 
-        # 按顺序尝试下载存储的 URL
-        data: Optional[bytes] = None
+        # 按顺序尝试下载存储的 URL（流式写入临时文件，内存占用与视频大小无关）
+        data: Optional[IO[bytes]] = None
         chosen_url: Optional[str] = None
 
         for idx, u in enumerate(stored_video_urls):
             log.info(f"尝试下载视频（存储URL）：post_id={post_id}，idx={idx}/{len(stored_video_urls)}，url={u}")
-            data = self.downloader.download_video_as_bytes_with_retry(str(u), max_retries=1)
+            data = self.downloader.download_video_to_tempfile_with_retry(str(u), max_retries=1)
             if data is not None:
                 chosen_url = str(u)
                 log.info(f"下载成功（存储URL）：post_id={post_id}，idx={idx}，url={chosen_url}")
@@ -345,7 +622,7 @@ class AnalysisService:
             # 尝试下载平台接口返回的 URL
             for idx, u in enumerate(fetcher_urls):
                 log.info(f"尝试下载视频（平台URL）：post_id={post_id}，idx={idx}/{len(fetcher_urls)}，url={u}")
-                data = self.downloader.download_video_as_bytes_with_retry(str(u), max_retries=1)
+                data = self.downloader.download_video_to_tempfile_with_retry(str(u), max_retries=1)
                 if data is not None:
                     chosen_url = str(u)
                     log.info(f"下载成功（平台URL）：post_id={post_id}，idx={idx}，url={chosen_url}")
@@ -361,15 +638,52 @@ class AnalysisService:
                 f"总尝试数={total_tried}"
             )
 
-        log.info(f"下载完成：post_id={post_id}，选用 URL={chosen_url}，大小={len(data)} 字节")
+        try:
+            data.seek(0, os.SEEK_END)
+            size = data.tell()
+            digest = file_cache.hash_stream(data)
+            log.info(f"下载完成：post_id={post_id}，选用 URL={chosen_url}，大小={size} 字节，sha256={digest[:12]}")
+
+            # 内容级文件缓存：相同视频已上传过（如同一视频出现在多条帖子下）时，跳过上传
+            content_key = file_cache.content_key(f"{digest}:{prep_fp}" if prep_fp else digest)
+            cached = file_cache.lookup(self.gemini, content_key)
+        except BaseException:
+            data.close()
+            raise
+        media_hash = self._video_media_hash(digest, prep_fp)
+        if cached:
+            data.close()
+            log.info(f"命中 Gemini 文件缓存（内容），跳过上传：post_id={post_id}，uri={cached[0].get('uri')}")
+            file_cache.remember(self.gemini, [post_key], cached)
+            return MediaSource(
+                media_hash,
+                [self._video_part(cached[0]["uri"], cached[0].get("mime_type") or mime_type)],
+                str(cached[0]["uri"]),
+            )
+        return MediaSource(media_hash, data=data, digest=digest, prep_fp=prep_fp, keys=(content_key, post_key))
 
-        # 推断 mime 与 display name
+    def _upload_video_source(self, post: PlatformPost, src: MediaSource) -> Tuple[List[Any], str]:
+        """预处理（按需）并上传已下载的视频，登记文件缓存，返回 (parts, source_key)。关闭下载句柄即删除临时文件。"""
+        post_id = int(post.id or 0)
         mime_type = "video/mp4"
+        data, digest = src.data, str(src.digest)
         display_name = f"post_{post.id or 'unknown'}.mp4"
-
-        # 上传到 Gemini Files
-        log.info(f"开始上传到 Gemini：post_id={post_id}，文件名={display_name}")
-        upload = self.gemini.upload_file(data, display_name=display_name, mime_type=mime_type)
+        try:
+            # 未命中才探测时长、选择预处理策略（ffmpeg 降分辨率/截断/长视频仅音频+关键帧）并转码
+            prep_plan = video_preprocess.plan(data) if src.prep_fp else None
+            prepped = video_preprocess.run(prep_plan, digest) if prep_plan else None
+
+            # 上传到 Gemini Files（从文件句柄分块读取）
+            log.info(f"开始上传到 Gemini：post_id={post_id}，文件名={display_name}")
+            upload_start = time.perf_counter()
+            if prepped is not None:
+                with prepped.open() as fh:
+                    upload = self.gemini.upload_file(fh, display_name=display_name, mime_type=mime_type)
+                self._log_preprocess_savings(post_id, prepped, (time.perf_counter() - upload_start) * 1000)
+            else:
+                upload = self.gemini.upload_file(data, display_name=display_name, mime_type=mime_type)
+        finally:
+            src.close()
         file_uri = upload.get("uri")
         log.info(
             f"上传完成：post_id={post_id}，name={upload.get('name')}，uri={file_uri}"
@@ -377,18 +691,58 @@ class AnalysisService:
         if not file_uri:
             raise RuntimeError("Gemini 文件上传未返回 uri")
 
+        file_cache.remember(self.gemini, list(src.keys), [file_cache.file_ref(upload, digest)],
+                            expires_at=upload.get("expiration_time"))
+        return [self._video_part(str(file_uri), mime_type)], str(file_uri)
+
+    @staticmethod
+    def _video_media_hash(content_hash: Optional[str], prep_fp: Optional[str]) -> Optional[str]:
+        """视频媒体哈希 = 源文件 sha256 + 预处理配置指纹：模型看到的是预处理后的视频，配置变化后不复用旧结果。"""
+        return result_cache.media_hash([content_hash, prep_fp] if prep_fp else [content_hash])
+
+    @staticmethod
+    def _log_preprocess_savings(post_id: int, prepped: video_preprocess.PreprocessedVideo, upload_ms: float) -> None:
+        """记录预处理的体积缩减与端到端耗时收益。
+
+        上传 + 等待 ACTIVE 的耗时近似与字节数成正比：按本次实测吞吐估算上传源文件的耗时，
+        减去实际上传耗时与转码耗时即为节省的时间（转码缓存命中时转码耗时为 0）。
+        """
+        src_size = prepped.plan.src_size
+        est_src_upload_ms = upload_ms * src_size / max(prepped.size, 1)
+        log.info({"video_preprocess": {
+            "post_id": post_id,
+            "policy": prepped.plan.policy,
+            "duration_sec": prepped.plan.duration_sec,
+            "src_bytes": src_size,
+            "bytes": prepped.size,
+            "reduction_pct": round((1 - prepped.size / max(src_size, 1)) * 100, 1),
+            "transcode_ms": prepped.elapsed_ms,
+            "transcode_cached": prepped.cached,
+            "upload_ms": round(upload_ms, 1),
+            "est_saved_ms": round(est_src_upload_ms - upload_ms - prepped.elapsed_ms, 1),
+        }})
+
+    @staticmethod
+    def _video_part(file_uri: str, mime_type: str) -> Any:
         if types is None:
             raise RuntimeError("google-genai SDK 未正确安装")
-        video_part = types.Part(
+        return types.Part(
             file_data=types.FileData(file_uri=file_uri, mime_type=mime_type),
             video_metadata=types.VideoMetadata(fps=1),
         )
-        return [video_part], str(file_uri)
 
-    def _prepare_image_parts(self, post: PlatformPost, fetcher) -> Tuple[List[Any], str]:
-        """下载→上传多张图片→构建图片 Parts（可包含文案 Part）。返回 (parts, source_key)。"""
+    def _prepare_image_parts(self, post: PlatformPost, fetcher) -> Tuple[List[Any], str, Optional[str]]:
+        """下载→上传多张图片→构建图片 Parts（可包含文案 Part）。返回 (parts, source_key, 媒体内容哈希)。"""
         post_id = int(post.id or 0)
 
+        # 帖子级文件缓存：全部图片仍在 Gemini 有效期内时，跳过下载与上传
+        post_key = file_cache.item_key(getattr(post, "platform", None), getattr(post, "platform_item_id", None), "image")
+        cached = file_cache.lookup(self.gemini, post_key)
+        if cached:
+            log.info(f"命中 Gemini 文件缓存（帖子），跳过图片下载与上传：post_id={post_id}，图片数={len(cached)}")
+            parts, source_key = self._image_parts([(str(f["uri"]), str(f.get("mime_type") or "image/jpeg")) for f in cached])
+            return parts, source_key, result_cache.media_hash(f.get("content_hash") for f in cached)
+
         # 1) 优先使用 PlatformPost.image_urls 字段中的图片地址
         primary_urls: List[str] = []
         try:
@@ -414,44 +768,9 @@ class AnalysisService:
         if not image_urls:
             raise ValueError(f"post {post_id} 未获取到图片 URL 列表")
 
-        uploaded: List[Tuple[str, str]] = []  # (uri, mime)
-        for idx, url in enumerate(image_urls):
-            try:
-                r = requests.get(str(url), timeout=30)
-                if getattr(r, "status_code", 0) != 200:
-                    log.warning(f"下载图片失败：post_id={post_id}，status={getattr(r, 'status_code', None)}，url={url}")
-                    continue
-                data = r.content
-                ctype = r.headers.get("Content-Type") or ""
-                mime: str
-                url_l = str(url).lower()
-                if ctype.startswith("image/"):
-                    mime = ctype.split(";")[0].strip()
-                elif url_l.endswith(".png"):
-                    mime = "image/png"
-                elif url_l.endswith(".webp"):
-                    mime = "image/webp"
-                elif url_l.endswith(".gif"):
-                    mime = "image/gif"
-                else:
-                    mime = "image/jpeg"
-
-                display_name = f"post_{post.id or 'unknown'}_{idx}"
-                log.info(
-                    f"上传图片到 Gemini：post_id={post_id}，idx={idx}，mime={mime}，url={url}"
-                )
-                upload = self.gemini.upload_file(data, display_name=display_name, mime_type=mime)
-                uri = upload.get("uri")
-                if uri:
-                    uploaded.append((str(uri), mime))
-                    log.info(f"图片上传完成：post_id={post_id}，idx={idx}，uri={uri}")
-                else:
-                    log.warning(f"图片上传未返回 uri：post_id={post_id}，idx={idx}，url={url}")
-            except Exception as ue:
-                log.error(f"图片处理失败：post_id={post_id}，idx={idx}，url={url}，err={ue}")
-                continue
+        uploaded, refs, failed = self._upload_images(post_id, image_urls, f"post_{post.id or 'unknown'}", "")
 
-        # 若优先使用 post.image_urls 上传均失败，尝试 fallback：通过 fetcher 重新获取并上传
+        # 若优先使用 post.image_urls 上传均失败，尝试 fallback：通过 fetcher 重新获取并上传（同一并发引擎）
         if not uploaded and used_post_field:
             log.info(f"post.image_urls 上传均失败，尝试使用 fetcher 重新获取图片 URL：post_id={post_id}")
             try:
@@ -461,46 +780,109 @@ class AnalysisService:
                 log.error(
                     f"fallback 获取图片 URL 列表失败：post_id={post_id}, platform={getattr(post, 'platform', None)}, err={e}"
                 )
-
-            for idx, url in enumerate(fallback_urls):
-                try:
-                    r = requests.get(str(url), timeout=30)
-                    if getattr(r, "status_code", 0) != 200:
-                        log.warning(f"下载图片失败：post_id={post_id}，status={getattr(r, 'status_code', None)}，url={url}")
-                        continue
-                    data = r.content
-                    ctype = r.headers.get("Content-Type") or ""
-                    mime: str
-                    url_l = str(url).lower()
-                    if ctype.startswith("image/"):
-                        mime = ctype.split(";")[0].strip()
-                    elif url_l.endswith(".png"):
-                        mime = "image/png"
-                    elif url_l.endswith(".webp"):
-                        mime = "image/webp"
-                    elif url_l.endswith(".gif"):
-                        mime = "image/gif"
-                    else:
-                        mime = "image/jpeg"
-
-                    display_name = f"post_{post.id or 'unknown'}_fb_{idx}"
-                    log.info(
-                        f"上传图片到 Gemini（fallback）：post_id={post_id}，idx={idx}，mime={mime}，url={url}"
-                    )
-                    upload = self.gemini.upload_file(data, display_name=display_name, mime_type=mime)
-                    uri = upload.get("uri")
-                    if uri:
-                        uploaded.append((str(uri), mime))
-                        log.info(f"图片上传完成（fallback）：post_id={post_id}，idx={idx}，uri={uri}")
-                    else:
-                        log.warning(f"图片上传未返回 uri（fallback）：post_id={post_id}，idx={idx}，url={url}")
-                except Exception as ue:
-                    log.error(f"图片处理失败（fallback）：post_id={post_id}，idx={idx}，url={url}，err={ue}")
-                    continue
+            if fallback_urls:
+                uploaded, refs, failed = self._upload_images(
+                    post_id, fallback_urls, f"post_{post.id or 'unknown'}_fb", "（fallback）"
+                )
 
         if not uploaded:
             raise RuntimeError("无可用图片可供分析（上传均失败）")
 
+        # 全部图片成功时才登记帖子级缓存，避免重跑时沿用残缺的图片集合
+        if failed == 0:
+            file_cache.remember(self.gemini, [post_key], refs)
+        parts, source_key = self._image_parts(uploaded)
+        return parts, source_key, result_cache.media_hash(r.get("content_hash") for r in refs)
+
+    def _upload_images(
+        self, post_id: int, urls: List[str], name_prefix: str, label: str
+    ) -> Tuple[List[Tuple[str, str]], List[Dict[str, Any]], int]:
+        """并发下载并上传一组图片，返回 ((uri, mime) 列表, 文件引用列表, 失败数)，结果保持 urls 的原始顺序。
+
+        下载与上传提交到进程级共享线程池（ANALYSIS_IMAGE_WORKERS 为全局并发上限），上传时不逐个等待 ACTIVE，
+        全部上传后对新文件统一等待 ACTIVE。
+        """
+        futures = [
+            _image_executor.submit(
+                contextvars.copy_context().run,
+                self._fetch_and_upload_image, post_id, idx, str(url), f"{name_prefix}_{idx}", label,
+            )
+            for idx, url in enumerate(urls)
+        ]
+        results = [f.result() for f in futures]
+
+        new_names = [res[0]["name"] for res in results if res and res[2]]
+        active: Dict[str, bool] = self.gemini.wait_files_active(new_names) if new_names else {}
+
+        uploaded: List[Tuple[str, str]] = []
+        refs: List[Dict[str, Any]] = []
+        failed = 0
+        for idx, res in enumerate(results):
+            if res is None:
+                failed += 1
+                continue
+            ref, expires_at, is_new = res
+            if is_new:
+                if not active.get(ref["name"]):
+                    failed += 1
+                    log.warning(f"图片文件未就绪（非 ACTIVE）{label}：post_id={post_id}，idx={idx}，name={ref['name']}")
+                    continue
+                file_cache.remember(self.gemini, [file_cache.content_key(ref["content_hash"])], [ref], expires_at=expires_at)
+            refs.append(ref)
+            uploaded.append((str(ref["uri"]), str(ref.get("mime_type") or "image/jpeg")))
+        log.info(f"图片处理完成{label}：post_id={post_id}，成功={len(uploaded)}，失败={failed}，总数={len(urls)}")
+        return uploaded, refs, failed
+
+    def _fetch_and_upload_image(
+        self, post_id: int, idx: int, url: str, display_name: str, label: str
+    ) -> Optional[Tuple[Dict[str, Any], Any, bool]]:
+        """下载并上传单张图片（不等待 ACTIVE），返回 (文件引用, 过期时间, 是否新上传)；失败返回 None。
+
+        相同内容已上传过时直接复用（内容级文件缓存），不再上传。
+        """
+        try:
+            r = requests.get(url, timeout=30)
+            if getattr(r, "status_code", 0) != 200:
+                log.warning(f"下载图片失败{label}：post_id={post_id}，status={getattr(r, 'status_code', None)}，url={url}")
+                return None
+            data = r.content
+            ctype = r.headers.get("Content-Type") or ""
+            mime: str
+            url_l = url.lower()
+            if ctype.startswith("image/"):
+                mime = ctype.split(";")[0].strip()
+            elif url_l.endswith(".png"):
+                mime = "image/png"
+            elif url_l.endswith(".webp"):
+                mime = "image/webp"
+            elif url_l.endswith(".gif"):
+                mime = "image/gif"
+            else:
+                mime = "image/jpeg"
+
+            digest = file_cache.hash_bytes(data)
+            cached = file_cache.lookup(self.gemini, file_cache.content_key(digest))
+            if cached:
+                log.info(f"命中 Gemini 文件缓存（内容），跳过图片上传{label}：post_id={post_id}，idx={idx}")
+                return cached[0], None, False
+
+            log.info(
+                f"上传图片到 Gemini{label}：post_id={post_id}，idx={idx}，mime={mime}，url={url}"
+            )
+            upload = self.gemini.upload_file(data, display_name=display_name, mime_type=mime, wait_active=False)
+            if not upload.get("uri") or not upload.get("name"):
+                log.warning(f"图片上传未返回 uri{label}：post_id={post_id}，idx={idx}，url={url}")
+                return None
+            log.info(f"图片上传完成{label}：post_id={post_id}，idx={idx}，uri={upload.get('uri')}")
+            ref = file_cache.file_ref(upload, digest)
+            ref["mime_type"] = ref.get("mime_type") or mime
+            return ref, upload.get("expiration_time"), True
+        except Exception as ue:
+            log.error(f"图片处理失败{label}：post_id={post_id}，idx={idx}，url={url}，err={ue}")
+            return None
+
+    @staticmethod
+    def _image_parts(uploaded: List[Tuple[str, str]]) -> Tuple[List[Any], str]:
         if types is None:
             raise RuntimeError("google-genai SDK 未正确安装")
 
@@ -588,7 +970,7 @@ class AnalysisService:
         - handling_suggestions
         其余作为 analysis_detail 存档。
 
-        source_path: 使用已上传文件的 URI（例如 https://.../files/<id>）作为唯一键。
+        source_path: 本帖唯一键，已上传文件的 URI + 帖子 id（例如 https://.../files/<id>#post:<post_id>，见 _source_path）。
         """
         platform = str(getattr(post, "platform", "douyin") or "douyin")
         platform_item_id = getattr(post, "platform_item_id", None)
@@ -16,6 +16,7 @@ def main() -> None:
     parser.add_argument("--limit", type=int, default=5)
     parser.add_argument("--offset", type=int, default=0)
     parser.add_argument("--id", type=int, default=0, help="帖子 id（run-one / analyze 使用）")
+    parser.add_argument("--force", action="store_true", help="analyze 时忽略分析结果缓存，强制重新调用模型")
     parser.add_argument("--model", type=str, default=os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-pro"))
     args = parser.parse_args()
 
@@ -35,7 +36,7 @@ def main() -> None:
         if not args.id:
             raise SystemExit("请提供 --id 来指定要分析的帖子 ID")
         analyzer = AnalysisService()
-        out = analyzer.analyze_post(args.id)
+        out = analyzer.analyze_post(args.id, force=args.force)
         print(json.dumps(out, ensure_ascii=False, indent=2))
 
 
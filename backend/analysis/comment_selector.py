@@ -0,0 +1,201 @@
+"""
+分析 prompt 的评论选择：在 token 预算内挑选信息量最高的评论
+
+候选集为互动量最高的 ANALYSIS_COMMENT_TOP_CANDIDATES 条 + 最新的 ANALYSIS_COMMENT_RECENT_CANDIDATES 条（按 id 去重）：
+- 排序：log(1+like) + 0.5*log(1+reply)，同分按发布时间倒序（高赞投诉不会因不够新被漏掉，新事件仍有机会入选）
+- 去重：规范化文本（去表情码、标点、空白，小写）完全相同为精确重复；字符二元组 Jaccard
+  >= ANALYSIS_COMMENT_NEAR_DUP 为近似重复。重复评论只保留排序最高的一条，并累计 dup 次数（刷屏本身也是信号）
+- 截断：单条评论超过 ANALYSIS_COMMENT_MAX_CHARS 字符截断
+- 预算：按排序依次放入，估算 token 超出 ANALYSIS_COMMENT_TOKEN_BUDGET 的跳过，最多 max_comments 条
+- 紧凑格式：列式 JSON（fields + rows，无缩进），不再逐条重复键名，去掉作者名
+
+token 为本地估算（CJK 字符约 1 token，其余约 4 字符 1 token），仅用于预算与节省统计。
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import json
+import math
+import os
+import re
+
+TOKEN_BUDGET = int(os.getenv("ANALYSIS_COMMENT_TOKEN_BUDGET", "6000"))
+TOP_CANDIDATES = int(os.getenv("ANALYSIS_COMMENT_TOP_CANDIDATES", "200"))
+RECENT_CANDIDATES = int(os.getenv("ANALYSIS_COMMENT_RECENT_CANDIDATES", "100"))
+MAX_CHARS = int(os.getenv("ANALYSIS_COMMENT_MAX_CHARS", "300"))
+NEAR_DUP = float(os.getenv("ANALYSIS_COMMENT_NEAR_DUP", "0.8"))
+
+FIELDS = ["id", "like", "reply", "dup", "date", "text"]
+
+# 抖音/小红书表情码（如 [捂脸]、[赞R]），以及规范化时去掉的非文字字符
+_EMOTE_RE = re.compile(r"\[[^\[\]\s]{1,8}\]")
+_NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+_CJK_RE = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+@dataclass
+class SelectionStats:
+    candidates: int = 0
+    exact_dups: int = 0
+    near_dups: int = 0
+    empty: int = 0
+    truncated: int = 0
+    over_budget: int = 0
+    selected: int = 0
+    tokens_before: int = 0  # 旧做法（最新 max_comments 条、逐条 JSON）的估算 token
+    tokens_after: int = 0
+
+    def as_log(self, post_id: int) -> Dict[str, Any]:
+        return {"comment_selection": {
+            "post_id": post_id, **self.__dict__, "tokens_saved": self.tokens_before - self.tokens_after,
+        }}
+
+
+@dataclass
+class _Item:
+    comment: Any
+    norm: str
+    dup: int = 1
+    grams: Set[str] = field(default_factory=set)
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def merge_candidates(*groups: Sequence[Any]) -> List[Any]:
+    """合并多组候选评论（按 id / platform_comment_id 去重，保留首次出现）。"""
+    seen: Set[Any] = set()
+    merged: List[Any] = []
+    for group in groups:
+        for c in group:
+            key = getattr(c, "id", None) or getattr(c, "platform_comment_id", None)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(c)
+    return merged
+
+
+def select(comments: Sequence[Any], max_comments: int = 100,
+           token_budget: int = TOKEN_BUDGET) -> Tuple[Optional[str], SelectionStats]:
+    """挑选评论并序列化为紧凑 JSON；无可用评论时返回 (None, stats)。"""
+    stats = SelectionStats(candidates=len(comments))
+    stats.tokens_before = estimate_tokens(_legacy_payload(sorted(comments, key=_recency_key)[:max_comments]))
+
+    kept: List[_Item] = []
+    by_norm: Dict[str, _Item] = {}
+    for c in sorted(comments, key=_rank_key):
+        norm = _normalize(getattr(c, "content", None))
+        if not norm:
+            stats.empty += 1
+            continue
+        exact = by_norm.get(norm)
+        if exact is not None:
+            exact.dup += 1
+            stats.exact_dups += 1
+            continue
+        item = _Item(c, norm, grams=_bigrams(norm))
+        near = _find_near(item, kept) if NEAR_DUP < 1 and len(norm) >= 4 else None
+        if near is not None:
+            near.dup += 1
+            stats.near_dups += 1
+            continue
+        by_norm[norm] = item
+        kept.append(item)
+
+    rows: List[List[Any]] = []
+    used = estimate_tokens(_serialize([]))
+    for item in kept:
+        if len(rows) >= max_comments:
+            break
+        row = _row(item, stats)
+        cost = estimate_tokens(json.dumps(row, ensure_ascii=False, separators=(",", ":"))) + 1
+        if used + cost > token_budget:
+            stats.over_budget += 1
+            continue
+        rows.append(row)
+        used += cost
+
+    stats.selected = len(rows)
+    if not rows:
+        return None, stats
+    payload = _serialize(rows)
+    stats.tokens_after = estimate_tokens(payload)
+    return payload, stats
+
+
+def _rank_key(c: Any):
+    return (-_score(c), _recency_key(c))
+
+
+def _recency_key(c: Any) -> float:
+    published = getattr(c, "published_at", None)
+    return -published.timestamp() if isinstance(published, datetime) else 0.0
+
+
+def _score(c: Any) -> float:
+    like = max(0, int(getattr(c, "like_count", 0) or 0))
+    reply = max(0, int(getattr(c, "reply_count", 0) or 0))
+    return math.log1p(like) + 0.5 * math.log1p(reply)
+
+
+def _normalize(text: Optional[str]) -> str:
+    if not text:
+        return ""
+    return _NON_WORD_RE.sub("", _EMOTE_RE.sub("", str(text))).lower()
+
+
+def _bigrams(norm: str) -> Set[str]:
+    return {norm[i:i + 2] for i in range(len(norm) - 1)} or {norm}
+
+
+def _find_near(item: _Item, kept: List[_Item]) -> Optional[_Item]:
+    size = len(item.grams)
+    for other in kept:
+        other_size = len(other.grams)
+        # 集合大小相差过大时 Jaccard 不可能达到阈值，跳过求交集
+        if min(size, other_size) < NEAR_DUP * max(size, other_size):
+            continue
+        inter = len(item.grams & other.grams)
+        if inter / (size + other_size - inter) >= NEAR_DUP:
+            return other
+    return None
+
+
+def _row(item: _Item, stats: SelectionStats) -> List[Any]:
+    c = item.comment
+    text = " ".join(str(c.content).split())
+    if MAX_CHARS > 0 and len(text) > MAX_CHARS:
+        text = text[:MAX_CHARS] + "…"
+        stats.truncated += 1
+    published = getattr(c, "published_at", None)
+    return [
+        str(c.platform_comment_id),
+        int(getattr(c, "like_count", 0) or 0),
+        int(getattr(c, "reply_count", 0) or 0),
+        item.dup,
+        published.strftime("%Y-%m-%d") if isinstance(published, datetime) else None,
+        text,
+    ]
+
+
+def _serialize(rows: List[List[Any]]) -> str:
+    return json.dumps({"fields": FIELDS, "rows": rows}, ensure_ascii=False, separators=(",", ":"))
+
+
+def _legacy_payload(comments: Sequence[Any]) -> str:
+    """旧格式（逐条对象 + 作者/ISO 时间）的序列化结果，仅用于估算节省的 token。"""
+    items = []
+    for c in comments:
+        item: Dict[str, Any] = {"id": str(getattr(c, "platform_comment_id", "")), "text": str(getattr(c, "content", ""))}
+        if getattr(c, "author_name", None):
+            item["author"] = str(c.author_name)
+        if getattr(c, "like_count", None) is not None:
+            item["like_count"] = int(c.like_count)
+        if isinstance(getattr(c, "published_at", None), datetime):
+            item["published_at"] = c.published_at.isoformat()
+        items.append(item)
+    return json.dumps({"items": items}, ensure_ascii=False)
@@ -0,0 +1,122 @@
+"""
+Gemini 上下文缓存（Context Caching）：长 system prompt 按 (模型, prompt 版本, project_id) 复用
+
+分析 / 初筛的 system prompt 由 DB 模板渲染并注入项目变量，同一项目下成千上万次调用完全相同。
+首次使用时以 caches.create 把 system_instruction 存为 CachedContent，之后的 generate_content 只引用
+cached_content 名称，输入 token 按缓存价计费、首包延迟更低。
+
+- prompt 版本取渲染后文本的 sha1：模板换版本或项目变量变化后自然使用新缓存，旧缓存到 TTL 后由服务端回收
+- 剩余有效期不足 GEMINI_CONTEXT_CACHE_REFRESH_SEC 时先 caches.update 续期，续期失败再重建
+- 创建失败（prompt 低于模型的最小缓存 token 数、模型不支持等）时在 GEMINI_CONTEXT_CACHE_NEGATIVE_TTL_SEC 内
+  不再尝试；调用方回落为直接传 system_instruction
+- 同一键并发首次使用时只创建一次
+
+配置（环境变量）：
+- GEMINI_CONTEXT_CACHE：on（默认）| off
+- GEMINI_CONTEXT_CACHE_TTL_SEC：缓存有效期（默认 3600）
+- GEMINI_CONTEXT_CACHE_REFRESH_SEC：到期前多久续期（默认 300）
+- GEMINI_CONTEXT_CACHE_MIN_CHARS：短于该字符数的 prompt 不缓存（默认 2000）
+- GEMINI_CONTEXT_CACHE_NEGATIVE_TTL_SEC：创建失败后的冷却时间（默认 3600）
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import os
+import threading
+import time
+
+from jobs.logger import get_logger
+from tikhub_api.utils.ttl_cache import TTLCache
+
+log = get_logger(__name__)
+
+ENABLED = (os.getenv("GEMINI_CONTEXT_CACHE", "on") or "on").strip().lower() not in ("off", "0", "false")
+TTL_SEC = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SEC", "3600"))
+REFRESH_SEC = int(os.getenv("GEMINI_CONTEXT_CACHE_REFRESH_SEC", "300"))
+MIN_CHARS = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_CHARS", "2000"))
+NEGATIVE_TTL_SEC = float(os.getenv("GEMINI_CONTEXT_CACHE_NEGATIVE_TTL_SEC", "3600"))
+
+CacheKey = Tuple[str, str, str, str]  # (api key 指纹, model, prompt sha1, project_id)
+
+# key -> (cached_content 名称, 过期时刻 monotonic)
+_entries: Dict[CacheKey, Tuple[str, float]] = {}
+_failed: TTLCache[bool] = TTLCache(default_ttl=NEGATIVE_TTL_SEC, max_size=1024)
+_locks: Dict[CacheKey, threading.Lock] = {}
+_guard = threading.Lock()
+
+
+def make_key(api_key: str, model: str, system_prompt: str, project_id: Optional[str]) -> CacheKey:
+    return (
+        hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:12],
+        model,
+        hashlib.sha1(system_prompt.encode("utf-8")).hexdigest(),
+        str(project_id or "-"),
+    )
+
+
+def get_cached_content(client: Any, key: CacheKey, system_prompt: str) -> Optional[str]:
+    """返回可用的 cached_content 名称；不启用、prompt 过短或创建失败时返回 None（调用方直接传 system_instruction）。"""
+    if not ENABLED or len(system_prompt) < MIN_CHARS or _failed.get(key):
+        return None
+    entry = _entries.get(key)
+    if entry and entry[1] - time.monotonic() > REFRESH_SEC:
+        return entry[0]
+    with _lock_for(key):
+        entry = _entries.get(key)
+        remaining = entry[1] - time.monotonic() if entry else 0.0
+        if entry and remaining > REFRESH_SEC:
+            return entry[0]
+        if entry and remaining > 0 and _extend(client, entry[0], key):
+            return entry[0]
+        return _create(client, key, system_prompt)
+
+
+def invalidate(key: CacheKey) -> None:
+    """调用方使用缓存失败（已被删除/过期等）时清除，下次重新创建。"""
+    _entries.pop(key, None)
+
+
+def _create(client: Any, key: CacheKey, system_prompt: str) -> Optional[str]:
+    from google.genai import types  # type: ignore
+
+    _, model, digest, project_id = key
+    try:
+        cache = client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=system_prompt,
+                ttl=f"{TTL_SEC}s",
+                display_name=f"gg:{project_id}:{digest[:10]}",
+            ),
+        )
+    except Exception as e:
+        _entries.pop(key, None)
+        _failed.set(key, True)
+        log.info(f"创建 Gemini 上下文缓存失败，{int(NEGATIVE_TTL_SEC)}s 内直接传 system_instruction：model={model}，err={e}")
+        return None
+    name = getattr(cache, "name", None)
+    if not name:
+        return None
+    _entries[key] = (name, time.monotonic() + TTL_SEC)
+    log.info(f"已创建 Gemini 上下文缓存：name={name}，model={model}，project_id={project_id}，prompt={digest[:10]}")
+    return name
+
+
+def _extend(client: Any, name: str, key: CacheKey) -> bool:
+    from google.genai import types  # type: ignore
+
+    try:
+        client.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{TTL_SEC}s"))
+    except Exception as e:
+        log.info(f"续期 Gemini 上下文缓存失败，重新创建：name={name}，err={e}")
+        return False
+    _entries[key] = (name, time.monotonic() + TTL_SEC)
+    return True
+
+
+def _lock_for(key: CacheKey) -> threading.Lock:
+    with _guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
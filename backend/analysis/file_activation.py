@@ -0,0 +1,156 @@
+"""
+Gemini 文件 ACTIVE 等待：共享轮询器 + 自适应退避
+
+上传后的文件需处理到 ACTIVE 才能用于生成。每个 API Key 一个后台轮询线程，集中跟踪所有待就绪文件：
+- 首次查询很快（GEMINI_FILE_POLL_FIRST_SEC，默认 0.5 秒），小文件通常首轮即就绪
+- 未就绪则按 2 倍指数退避，间隔上限 GEMINI_FILE_POLL_MAX_SEC（默认 8 秒），大视频不再每 2 秒查询一次
+- 同一轮到期文件较多（>= GEMINI_FILE_POLL_LIST_THRESHOLD，默认 8）时改用一次 files.list 取最近文件的状态，
+  列表中没有的再逐个 files.get
+- 文件 ACTIVE / FAILED / 超时后唤醒对应的等待方；同一文件被多方等待时只查询一次
+- files.get 返回非暂时性错误（404 不存在、403 无权限等 4xx，429 除外）时视为终态，立即按未 ACTIVE 结束
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional
+import os
+import threading
+import time
+
+from jobs.logger import get_logger
+
+log = get_logger(__name__)
+
+FIRST_POLL_SEC = float(os.getenv("GEMINI_FILE_POLL_FIRST_SEC", "0.5"))
+MAX_POLL_SEC = float(os.getenv("GEMINI_FILE_POLL_MAX_SEC", "8"))
+LIST_THRESHOLD = int(os.getenv("GEMINI_FILE_POLL_LIST_THRESHOLD", "8"))
+# files.list 只取第一页（最近上传的文件），足以覆盖刚上传的待就绪文件
+LIST_PAGE_SIZE = 100
+# files.get 的终态错误（文件不存在、无权限等）记为该状态，立即结束等待；限流/服务端错误仍按退避重查
+_ERROR_STATE = "GET_ERROR"
+
+
+class _Pending:
+    __slots__ = ("name", "deadline", "interval", "next_poll", "active", "done")
+
+    def __init__(self, name: str, deadline: float) -> None:
+        self.name = name
+        self.deadline = deadline
+        self.interval = FIRST_POLL_SEC
+        self.next_poll = time.monotonic() + FIRST_POLL_SEC
+        self.active = False
+        self.done = threading.Event()
+
+
+class FileActivationPoller:
+    """单个 API Key 的共享轮询器；wait 可被任意线程并发调用。"""
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self._pending: Dict[str, _Pending] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.polls = 0
+
+    def wait(self, names: Iterable[str], timeout_sec: float = 120) -> Dict[str, bool]:
+        """阻塞直到各文件 ACTIVE / FAILED / 超时，返回 {name: 是否 ACTIVE}。"""
+        deadline = time.monotonic() + float(timeout_sec)
+        entries: List[_Pending] = []
+        with self._cond:
+            for name in dict.fromkeys(n for n in names if n):
+                entry = self._pending.get(name)
+                if entry is None:
+                    entry = self._pending[name] = _Pending(name, deadline)
+                else:
+                    entry.deadline = max(entry.deadline, deadline)
+                entries.append(entry)
+            self._ensure_started()
+            self._cond.notify()
+        for entry in entries:
+            entry.done.wait(max(0.0, deadline - time.monotonic()) + MAX_POLL_SEC)
+        return {e.name: e.active for e in entries}
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="gemini-file-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                now = time.monotonic()
+                wake_at = min(min(e.next_poll, e.deadline) for e in self._pending.values())
+                if wake_at > now:
+                    self._cond.wait(wake_at - now)
+                    continue
+                due = [e for e in self._pending.values() if e.next_poll <= now or e.deadline <= now]
+            try:
+                states = self._fetch_states([e.name for e in due if e.deadline > now])
+            except Exception as e:  # 轮询线程不能退出
+                log.warning(f"查询 Gemini 文件状态失败：{e}")
+                states = {}
+            self._settle(due, states)
+
+    def _fetch_states(self, names: List[str]) -> Dict[str, str]:
+        states: Dict[str, str] = {}
+        if len(names) >= LIST_THRESHOLD:
+            wanted = set(names)
+            self.polls += 1
+            for i, f in enumerate(self.client.files.list(config={"page_size": LIST_PAGE_SIZE})):
+                if i >= LIST_PAGE_SIZE:
+                    break
+                name = getattr(f, "name", None)
+                if name in wanted:
+                    states[name] = str(getattr(f, "state", None))
+        for name in names:
+            if name in states:
+                continue
+            self.polls += 1
+            try:
+                states[name] = str(getattr(self.client.files.get(name=name), "state", None))
+            except Exception as e:
+                if _is_terminal_error(e):
+                    log.warning(f"Gemini 文件不可用，停止等待：name={name}，err={e}")
+                    states[name] = _ERROR_STATE
+                else:
+                    log.info(f"查询 Gemini 文件状态失败：name={name}，err={e}")
+        return states
+
+    def _settle(self, due: List[_Pending], states: Dict[str, str]) -> None:
+        now = time.monotonic()
+        with self._cond:
+            for entry in due:
+                state = states.get(entry.name, "")
+                if state.endswith("ACTIVE"):
+                    entry.active = True
+                elif state.endswith("FAILED"):
+                    log.warning(f"Gemini 文件处理失败：name={entry.name}")
+                elif state == _ERROR_STATE:
+                    pass  # 已在查询时记录
+                elif entry.deadline > now:
+                    entry.interval = min(entry.interval * 2, MAX_POLL_SEC)
+                    entry.next_poll = now + entry.interval
+                    continue
+                else:
+                    log.warning(f"等待 Gemini 文件 ACTIVE 超时：name={entry.name}，state={state or None}")
+                self._pending.pop(entry.name, None)
+                entry.done.set()
+
+
+def _is_terminal_error(err: Exception) -> bool:
+    """4xx（429 限流除外）为终态错误；无状态码的网络异常与 5xx 视为暂时性。"""
+    code = getattr(err, "code", None)
+    return isinstance(code, int) and 400 <= code < 500 and code != 429
+
+
+_pollers: Dict[str, FileActivationPoller] = {}
+_pollers_lock = threading.Lock()
+
+
+def get_poller(api_key: str, client: Any) -> FileActivationPoller:
+    """按 API Key 复用轮询器（文件只对上传所用的 Key 可见）；首个注册的 client 用于查询。"""
+    with _pollers_lock:
+        poller = _pollers.get(api_key)
+        if poller is None:
+            poller = _pollers[api_key] = FileActivationPoller(client)
+        return poller
@@ -0,0 +1,193 @@
+"""
+Gemini Files 上传缓存（按内容哈希 / 帖子去重）
+
+同一帖子重新分析（如 prompt 调整后重跑）或同一视频出现在多条帖子下时，复用仍有效的 Gemini 文件，
+跳过 下载 → 上传 → 等待 ACTIVE 的整个流程。
+
+缓存键：
+- item:<platform>:<platform_item_id>:<kind>：帖子级，下载前查询，命中即跳过下载
+- sha256:<内容哈希>：内容级，下载后、上传前查询，命中即跳过上传（跨帖子复用同一文件）
+
+命中后会以 files.get 确认文件仍为 ACTIVE（已被删除/失效则清除该条目并重新上传）。
+Gemini 文件在上传约 48 小时后过期；条目过期时间优先取 SDK 返回的 expiration_time，扣除安全余量。
+
+配置（环境变量）：
+- GEMINI_FILE_CACHE：db（默认，进程内缓存 + gg_gemini_file_cache 表，跨进程共享）| memory（仅进程内）| off
+- GEMINI_FILE_TTL_SEC：SDK 未返回过期时间时的条目有效期（默认 46 小时）
+- GEMINI_FILE_EXPIRY_MARGIN_SEC：过期安全余量，剩余有效期不足时视为过期（默认 1800 秒）
+- GEMINI_FILE_PURGE_INTERVAL_SEC：清理表中过期条目的最小间隔（默认 3600 秒）
+"""
+from __future__ import annotations
+from typing import IO, Any, Dict, Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+import threading
+import time
+
+from jobs.logger import get_logger
+from tikhub_api.utils.ttl_cache import TTLCache
+
+log = get_logger(__name__)
+
+CACHE_MODE = (os.getenv("GEMINI_FILE_CACHE", "db") or "db").strip().lower()
+FILE_TTL_SEC = float(os.getenv("GEMINI_FILE_TTL_SEC", str(46 * 3600)))
+EXPIRY_MARGIN_SEC = float(os.getenv("GEMINI_FILE_EXPIRY_MARGIN_SEC", "1800"))
+PURGE_INTERVAL_SEC = float(os.getenv("GEMINI_FILE_PURGE_INTERVAL_SEC", "3600"))
+
+# 文件引用：{"name", "uri", "mime_type", "content_hash"}
+FileRef = Dict[str, Any]
+
+_memory: TTLCache[List[FileRef]] = TTLCache(default_ttl=FILE_TTL_SEC, max_size=4096)
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+_db_disabled = False
+
+
+def item_key(platform: Optional[str], platform_item_id: Optional[str], kind: str) -> Optional[str]:
+    if not platform or not platform_item_id:
+        return None
+    return f"item:{platform}:{platform_item_id}:{kind}"
+
+
+def content_key(digest: str) -> str:
+    return f"sha256:{digest}"
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_stream(fh: IO[bytes], chunk_size: int = 1024 * 1024) -> str:
+    """分块计算文件句柄内容的 sha256（内存占用为 chunk_size），结束后句柄回到开头。"""
+    digest = hashlib.sha256()
+    fh.seek(0)
+    for chunk in iter(lambda: fh.read(chunk_size), b""):
+        digest.update(chunk)
+    fh.seek(0)
+    return digest.hexdigest()
+
+
+def lookup(gemini, key: Optional[str]) -> Optional[List[FileRef]]:
+    """查询缓存并确认文件仍为 ACTIVE；未命中、已过期或文件失效时返回 None。"""
+    if CACHE_MODE == "off" or not key:
+        return None
+    owner = _owner(gemini)
+    files = _memory.get((owner, key))
+    if files is None and _use_db():
+        files = _load(owner, key)
+    if not files:
+        return None
+    if not all(gemini.is_file_active(f.get("name")) for f in files):
+        log.info(f"Gemini 文件缓存已失效，清除：key={key}")
+        forget(gemini, key)
+        return None
+    return files
+
+
+def remember(gemini, keys: Iterable[Optional[str]], files: List[FileRef],
+             expires_at: Optional[Any] = None) -> None:
+    """以多个键登记同一组文件引用；expires_at（datetime 或 ISO 字符串）为空时按 GEMINI_FILE_TTL_SEC 计算。"""
+    if CACHE_MODE == "off" or not files:
+        return
+    now = datetime.now(timezone.utc)
+    expires_at = _parse_ts(expires_at) or (now + timedelta(seconds=FILE_TTL_SEC))
+    ttl = (expires_at - now).total_seconds() - EXPIRY_MARGIN_SEC
+    if ttl <= 0:
+        return
+    owner = _owner(gemini)
+    for key in keys:
+        if not key:
+            continue
+        _memory.set((owner, key), files, ttl=ttl)
+        if _use_db():
+            try:
+                from tikhub_api.orm.gemini_file_repository import GeminiFileRepository
+                GeminiFileRepository.save(key, owner, files, expires_at - timedelta(seconds=EXPIRY_MARGIN_SEC))
+            except Exception as e:
+                _disable_db(e)
+    purge_expired()
+
+
+def forget(gemini, key: str) -> None:
+    owner = _owner(gemini)
+    _memory.pop((owner, key))
+    if _use_db():
+        try:
+            from tikhub_api.orm.gemini_file_repository import GeminiFileRepository
+            GeminiFileRepository.delete(key, owner)
+        except Exception as e:
+            log.warning(f"删除 Gemini 文件缓存失败：key={key}，err={e}")
+
+
+def purge_expired(force: bool = False) -> None:
+    """清理表中已过期的条目（进程内缓存由 TTL 自动淘汰）；默认按 GEMINI_FILE_PURGE_INTERVAL_SEC 节流。"""
+    global _last_purge
+    if not _use_db():
+        return
+    with _purge_lock:
+        if not force and time.monotonic() - _last_purge < PURGE_INTERVAL_SEC:
+            return
+        _last_purge = time.monotonic()
+    try:
+        from tikhub_api.orm.gemini_file_repository import GeminiFileRepository
+        GeminiFileRepository.purge_expired()
+    except Exception as e:
+        log.warning(f"清理过期 Gemini 文件缓存失败：{e}")
+
+
+def file_ref(upload: Dict[str, Any], content_hash: Optional[str] = None) -> FileRef:
+    """由 GeminiClient.upload_file 的返回值构造文件引用。"""
+    return {
+        "name": upload.get("name"),
+        "uri": upload.get("uri"),
+        "mime_type": upload.get("mime_type"),
+        "content_hash": content_hash,
+    }
+
+
+def _load(owner: str, key: str) -> Optional[List[FileRef]]:
+    try:
+        from tikhub_api.orm.gemini_file_repository import GeminiFileRepository
+        row = GeminiFileRepository.get(key, owner)
+    except Exception as e:
+        _disable_db(e)
+        return None
+    if not row or not row.get("files"):
+        return None
+    expires_at = _parse_ts(row.get("expires_at"))
+    ttl = (expires_at - datetime.now(timezone.utc)).total_seconds() if expires_at else 0
+    if ttl <= 0:
+        return None
+    files = list(row["files"])
+    _memory.set((owner, key), files, ttl=ttl)
+    return files
+
+
+def _owner(gemini) -> str:
+    """Gemini 文件只对上传所用的 API Key 可见，缓存按 Key 指纹隔离。"""
+    return hashlib.sha1(str(getattr(gemini, "api_key", "")).encode("utf-8")).hexdigest()[:12]
+
+
+def _use_db() -> bool:
+    return CACHE_MODE == "db" and not _db_disabled
+
+
+def _disable_db(err: Exception) -> None:
+    """表不存在等错误时本进程降级为仅进程内缓存（只告警一次）。"""
+    global _db_disabled
+    if not _db_disabled:
+        _db_disabled = True
+        log.warning(f"Gemini 文件缓存表不可用，本进程降级为仅进程内缓存：{err}")
+
+
+def _parse_ts(val: Any) -> Optional[datetime]:
+    if isinstance(val, datetime):
+        return val if val.tzinfo else val.replace(tzinfo=timezone.utc)
+    if not val:
+        return None
+    try:
+        ts = datetime.fromisoformat(str(val).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
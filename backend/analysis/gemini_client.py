@@ -1,11 +1,14 @@
 from __future__ import annotations
-from typing import Dict, Any, Optional, BinaryIO, IO, Union
+from typing import Dict, Any, List, Optional, BinaryIO, IO, Tuple, Union
 import os
 import json
 import time
 import io
 
 from jobs.logger import get_logger
+from common.request_context import get_project_id
+from . import context_cache
+from .file_activation import get_poller
 
 log = get_logger(__name__)
 
@@ -21,6 +24,17 @@ except Exception as e:  # pragma: no cover
 ANALYSIS_MODEL_NAME = "gemini-2.5-flash"
 SCREENING_MODEL_NAME = "gemini-2.5-flash"
 
+# 引用的上下文缓存已不存在 / 已过期 / 无权访问时的错误码（其余错误与缓存无关，不触发缓存失效）
+_CACHE_GONE_CODES = {400, 403, 404}
+
+
+def _is_cache_gone(err: Exception) -> bool:
+    """错误是否表示引用的 cached_content 不存在、已过期或无权访问。"""
+    if getattr(err, "code", None) not in _CACHE_GONE_CODES:
+        return False
+    msg = str(err).lower().replace("_", "").replace(" ", "")
+    return "cachedcontent" in msg or ("cache" in msg and "expired" in msg)
+
 def _normalize_model_name(model: str | None) -> str:
     """兼容传入类似 "google/gemini-2.5-pro" 的名字，转为 SDK 需要的 "gemini-2.5-pro"。
     若未提供按默认值处理。
@@ -32,6 +46,12 @@ def _normalize_model_name(model: str | None) -> str:
     return name
 
 
+def _meta_key(metadata: Optional[Dict[str, Any]]) -> Optional[Tuple[Tuple[str, str], ...]]:
+    if not metadata:
+        return None
+    return tuple(sorted((str(k), str(v)) for k, v in metadata.items()))
+
+
 class GeminiClient:
     """
     与 OpenRouterClient 对齐的最小封装：
@@ -54,16 +74,27 @@ class GeminiClient:
         self.client = genai.Client(api_key=self.api_key)
 
     def _wait_file_active(self, name: str, timeout_sec: int = 120) -> None:
-        """轮询文件状态，直到 ACTIVE 或超时。"""
-        start = time.time()
-        while True:
+        """等待文件 ACTIVE（共享轮询器，自适应退避），FAILED 或超时抛出 TimeoutError。"""
+        if not self.wait_files_active([name], timeout_sec=timeout_sec).get(name):
+            raise TimeoutError(f"File {name} not ACTIVE after {timeout_sec}s")
+
+    def wait_files_active(self, names: List[str], timeout_sec: int = 120) -> Dict[str, bool]:
+        """并发等待多个文件 ACTIVE，返回 {name: 是否 ACTIVE}（FAILED、超时为 False）。
+
+        由按 API Key 共享的后台轮询器统一查询（见 analysis.file_activation），首轮快速查询、之后指数退避。
+        """
+        return get_poller(self.api_key, self.client).wait(names, timeout_sec=timeout_sec)
+
+    def is_file_active(self, name: Optional[str]) -> bool:
+        """文件是否仍存在且为 ACTIVE（查询失败、已删除或已过期均返回 False）。"""
+        if not name:
+            return False
+        try:
             info = self.client.files.get(name=name)
-            state = getattr(info, "state", None)
-            if str(state).endswith("ACTIVE") or str(state) == "ACTIVE":
-                return
-            if time.time() - start > timeout_sec:
-                raise TimeoutError(f"File {name} not ACTIVE after {timeout_sec}s (state={state})")
-            time.sleep(2)
+        except Exception as e:
+            log.info(f"查询 Gemini 文件状态失败：name={name}，err={e}")
+            return False
+        return str(getattr(info, "state", None)).endswith("ACTIVE")
 
     def upload_file(
         self,
@@ -77,11 +108,16 @@ class GeminiClient:
 
         - 若传入的是 IO 流，SDK 要求必须提供 config.mime_type；本方法通过 mime_type 参数传入。
         - 若传入的是 bytes/bytearray，会封装为 io.BytesIO（可 seek）。
+        - 大文件优先传入文件句柄（如 VideoDownloader.download_video_to_tempfile 的返回值），
+          SDK 按块读取上传，内存占用与文件大小无关；句柄由调用方关闭。
         - display_name 仅用于传递给 UploadFileConfig 以便在控制台/日志中展示。
         """
         # 统一构造 IOBase，确保可 seek
         if isinstance(file_stream, (bytes, bytearray)):
-            upload_io: IO[bytes] = io.BytesIO(bytes(file_stream))
+            upload_io: IO[bytes] = io.BytesIO(file_stream)
+        elif not isinstance(file_stream, io.IOBase) and isinstance(getattr(file_stream, "file", None), io.IOBase):
+            # tempfile 在部分平台返回包装对象（非 IOBase），SDK 需要底层文件对象
+            upload_io = file_stream.file  # type: ignore[union-attr]
         else:
             upload_io = file_stream  # BinaryIO / IO[bytes]
 
@@ -106,35 +142,135 @@ class GeminiClient:
             "uri": file_uri,
             "raw": file_obj,
             "display_name": display_name,
+            "expiration_time": getattr(file_obj, "expiration_time", None),
         }
         log.info({"uploaded_file": {k: v for k, v in result.items() if k != "raw"}})
         return result
 
+    def generate_content(
+        self,
+        model: str,
+        contents: Any,
+        system_prompt: str,
+        project_id: Optional[str] = None,
+        **config_kwargs: Any,
+    ) -> Any:
+        """generate_content 的封装：system prompt 按 (model, prompt 版本, project_id) 走上下文缓存
+        （见 analysis.context_cache），缓存不可用或引用的缓存已不存在/过期时透明回落为直接传 system_instruction。
+
+        config_kwargs 透传给 GenerateContentConfig（temperature、response_mime_type 等）。
+        project_id 为空时取当前上下文的 project_id。
+        """
+        key = context_cache.make_key(self.api_key, model, system_prompt, project_id or get_project_id())
+        cache_name = context_cache.get_cached_content(self.client, key, system_prompt)
+        if cache_name:
+            try:
+                return self.client.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=types.GenerateContentConfig(cached_content=cache_name, **config_kwargs),
+                )
+            except Exception as e:
+                # 只有缓存不存在/过期才失效并回落；限流、服务端错误、请求本身的错误等交由调用方处理
+                if not _is_cache_gone(e):
+                    raise
+                context_cache.invalidate(key)
+                log.warning(f"引用上下文缓存调用失败，回落为直接传 system_instruction：cache={cache_name}，err={e}")
+        return self.client.models.generate_content(
+            model=model,
+            contents=contents,
+            config=types.GenerateContentConfig(system_instruction=system_prompt, **config_kwargs),
+        )
+
+    def run_batch(
+        self,
+        model: str,
+        requests: List[Any],
+        display_name: Optional[str] = None,
+        poll_sec: float = 30,
+        timeout_sec: float = 86400,
+    ) -> List[Tuple[Any, Optional[str]]]:
+        """提交 inline batch job（requests 为 types.InlinedRequest 列表）并阻塞轮询至终态。
+
+        按提交顺序返回 [(response, error)]：结果按各请求的 metadata 对应（各请求的 metadata 需唯一），
+        单条失败或缺失时 response 为 None、error 为错误描述。
+        job 整体失败/取消/过期抛 RuntimeError；超过 timeout_sec 时尝试取消 job 并抛 TimeoutError。
+        """
+        job = self.client.batches.create(
+            model=model,
+            src=requests,
+            config=types.CreateBatchJobConfig(display_name=display_name),
+        )
+        name = job.name
+        log.info({"batch_job": {"name": name, "requests": len(requests), "display_name": display_name}})
+        start = time.time()
+        interval = min(5.0, float(poll_sec))
+        while True:
+            state = str(getattr(job, "state", ""))
+            if state.endswith("SUCCEEDED"):  # 含 PARTIALLY_SUCCEEDED
+                break
+            if state.endswith(("FAILED", "CANCELLED", "EXPIRED")):
+                raise RuntimeError(f"batch job {name} ended with {state}: {getattr(job, 'error', None)}")
+            if time.time() - start > timeout_sec:
+                try:
+                    self.client.batches.cancel(name=name)
+                except Exception as e:
+                    log.warning(f"取消超时的 batch job 失败：name={name}，err={e}")
+                raise TimeoutError(f"batch job {name} not finished in {timeout_sec}s, state={state}")
+            time.sleep(interval)
+            interval = min(interval * 2, float(poll_sec))
+            try:
+                job = self.client.batches.get(name=name)
+            except Exception as e:  # 查询失败不影响 job 本身，下一轮再查
+                log.warning(f"查询 batch job 状态失败：name={name}，err={e}")
+
+        responses = list(getattr(getattr(job, "dest", None), "inlined_responses", None) or [])
+        log.info({"batch_job": {"name": name, "state": state, "responses": len(responses),
+                                "elapsed_s": round(time.time() - start, 1)}})
+        # 按请求的 metadata 对应结果（响应顺序不保证与提交顺序一致）；响应均不带 metadata 时才按位置对应
+        by_meta = {_meta_key(getattr(item, "metadata", None)): item for item in responses
+                   if getattr(item, "metadata", None)}
+        results: List[Tuple[Any, Optional[str]]] = []
+        for i, req in enumerate(requests):
+            if by_meta:
+                item = by_meta.get(_meta_key(getattr(req, "metadata", None)))
+            else:
+                item = responses[i] if i < len(responses) else None
+            if item is None:
+                results.append((None, "missing response"))
+            elif getattr(item, "error", None) is not None:
+                results.append((None, str(item.error)))
+            else:
+                results.append((item.response, None))
+        return results
+
     def classify_value(
         self,
         system_prompt: str,
         user_text: str,
         max_tokens: int = 3000,
         temperature: float = 0.2,
+        project_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         # 兼容 OpenRouterClient：尽量让模型仅输出 JSON 对象
-        config = types.GenerateContentConfig(
+        config_kwargs = dict(
             temperature=temperature,
             max_output_tokens=max(32, int(max_tokens)),
             response_mime_type="application/json",
-            system_instruction=system_prompt,
         )
 
-        # 最简 inputs：只传用户文本，由 system_instruction 提供角色与格式约束
+        # 最简 inputs：只传用户文本，由 system_instruction（或其上下文缓存）提供角色与格式约束
         contents = [user_text]
 
         last_err: Optional[str] = None
         for i in range(3):
             try:
-                resp = self.client.models.generate_content(
-                    model=self.screening_model,
-                    contents=contents,
-                    config=config,
+                resp = self.generate_content(
+                    self.screening_model,
+                    contents,
+                    system_prompt,
+                    project_id=project_id,
+                    **config_kwargs,
                 )
                 log.info({"response": resp})
                 text = getattr(resp, "text", None) or getattr(resp, "output_text", None) or ""
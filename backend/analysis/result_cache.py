@@ -0,0 +1,88 @@
+"""
+分析结果缓存：相同输入不重复调用模型
+
+帖子被重新排队（状态重置、人工重跑、重复帖子行）时，若分析输入与已有结果完全相同，直接复用
+gg_video_analysis 中的结果，跳过 generate_content。
+
+输入指纹 = sha256(媒体内容哈希, 规范化标题, 规范化正文, 评论集合哈希, system prompt 哈希, 模型)：
+- 媒体内容哈希取源文件 sha256（图文按图片顺序；视频另含预处理配置指纹），与 Gemini 文件 URI 无关，文件过期重传不影响命中
+- 标题/正文去首尾空白、合并连续空白
+- 评论集合哈希取实际送入模型的评论文本（新增评论、挑选策略变化都会使指纹变化）
+- system prompt 已含项目变量，模板或变量变化后自然不命中；查询按 project_id 限定
+媒体哈希未知（如旧缓存条目）时不生成指纹，照常调用模型。
+
+配置（环境变量）：
+- ANALYSIS_RESULT_CACHE：on（默认）| off；单次强制重跑用 analyze_post(force=True) / cli analyze --force
+需要 gg_video_analysis.input_fingerprint 列（DDL 见 video_analysis_repository）；列不存在时自动停用。
+"""
+from __future__ import annotations
+from typing import Any, Iterable, List, Optional
+import hashlib
+import json
+import os
+
+from jobs.logger import get_logger
+
+log = get_logger(__name__)
+
+ENABLED = (os.getenv("ANALYSIS_RESULT_CACHE", "on") or "on").strip().lower() not in ("off", "0", "false")
+
+_disabled = False
+
+
+def enabled() -> bool:
+    return ENABLED and not _disabled
+
+
+def media_hash(content_hashes: Iterable[Optional[str]]) -> Optional[str]:
+    """多个媒体文件内容哈希合成一个（保持顺序）；任一未知返回 None。"""
+    hashes = list(content_hashes)
+    if not hashes or any(not h for h in hashes):
+        return None
+    return hashlib.sha256("|".join(hashes).encode("utf-8")).hexdigest()
+
+
+def fingerprint(
+    media: Optional[str],
+    title: Optional[str],
+    content: Optional[str],
+    comment_texts: List[str],
+    system_prompt: str,
+    model: str,
+) -> Optional[str]:
+    if not enabled() or not media:
+        return None
+    comments = hashlib.sha256("\n".join(comment_texts).encode("utf-8")).hexdigest()
+    prompt = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    raw = json.dumps([media, _normalize(title), _normalize(content), comments, prompt, model],
+                     ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def lookup(project_id: Optional[str], fp: Optional[str]) -> Optional[Any]:
+    """按指纹查已有分析结果（VideoAnalysis）；未命中、未启用或查询失败返回 None。"""
+    if not enabled() or not fp or not project_id:
+        return None
+    from tikhub_api.orm.video_analysis_repository import VideoAnalysisRepository
+
+    try:
+        return VideoAnalysisRepository.get_by_fingerprint(str(project_id), fp)
+    except Exception as e:
+        if not column_missing(e):
+            log.warning(f"查询分析结果缓存失败：err={e}")
+        return None
+
+
+def column_missing(err: Exception) -> bool:
+    """错误是否因 input_fingerprint 列不存在；是则停用结果缓存（调用方去掉该字段后重试写入）。"""
+    global _disabled
+    if "input_fingerprint" not in str(err):
+        return False
+    if not _disabled:
+        _disabled = True
+        log.warning("gg_video_analysis 缺少 input_fingerprint 列，分析结果缓存已停用（DDL 见 video_analysis_repository）")
+    return True
+
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join(str(text or "").split())
@@ -2,11 +2,11 @@ from __future__ import annotations
 from typing import List, Dict, Any, Optional
 
 
-from tikhub_api.orm.post_repository import PostRepository
+from tikhub_api.orm.post_repository import PostRepository, SCREENING_COLUMNS, StatusTransition
 from tikhub_api.orm.enums import RelevantStatus, AnalysisStatus, PromptName
 from .gemini_client import GeminiClient
 from .text_builder import build_user_msg, SYSTEM_PROMPT as DEFAULT_SYSTEM_PROMPT
-from tikhub_api.orm.prompt_template_repository import PromptTemplateRepository
+from tikhub_api.orm import prompt_cache
 from .text_builder import build_user_msg, SYSTEM_PROMPT
 from common.prompt_renderer import render_prompt
 
@@ -25,7 +25,9 @@ class ScreeningService:
 
     def fetch_candidates(self, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
         # 仅挑选 relevant_status='unknown' 的内容；当前需求固定只取 1 条（硬编码）
-        posts = PostRepository.list_by_relevant_status(RelevantStatus.UNKNOWN.value, limit=limit, offset=offset)
+        posts = PostRepository.list_by_relevant_status(
+            RelevantStatus.UNKNOWN.value, limit=limit, offset=offset, columns=SCREENING_COLUMNS
+        )
         # 转字典便于模板格式化
         return [p.model_dump(mode="json", exclude_none=True) for p in posts]  # type: ignore
 
@@ -41,10 +43,10 @@ class ScreeningService:
         # 调用 LLM：现约定模型直接返回英文相关性枚举（yes/no/maybe），不再做本地映射
         user_msg = build_user_msg(row)
 
-        tpl = PromptTemplateRepository.get_active_by_name(PromptName.PRELIMINARY_SCREENING.value)
+        tpl = prompt_cache.get_active_template(PromptName.PRELIMINARY_SCREENING.value)
         prompt_text = render_prompt(str(getattr(tpl, "content", "") or ""))
 
-        result = self.client.classify_value(prompt_text, user_msg)
+        result = self.client.classify_value(prompt_text, user_msg, project_id=row.get("project_id"))
         log.info({"post_id": row.get("id"),
                   "event":"llm 返回结果如下",
                   "llm_result": result})
@@ -60,13 +62,18 @@ class ScreeningService:
         status = status if status in allowed else RelevantStatus.UNKNOWN.value
         return {"status": status, "result": result}
 
-    def process_batch(self, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    def process_batch(self, rows: List[Dict[str, Any]],
+                      expected_status: Optional[str] = RelevantStatus.UNKNOWN.value) -> Dict[str, int]:
         """
         处理一批待判定的帖子，rows 由外部传入（不在此函数内做候选查询）。
         约定 row 至少包含 id、title 等用于判定的字段。
+        判定结果在批末一次性批量回写：relevant_status 以 expected_status 为期望当前状态（乐观并发），
+        已被其他进程改写的帖子不会被覆盖，计入 conflict；expected_status=None 时不做校验。
         返回计数器便于观测。
         """
-        counters = {"yes": 0, "maybe": 0, "no": 0, "skipped": 0}
+        counters = {"yes": 0, "maybe": 0, "no": 0, "skipped": 0, "conflict": 0}
+        decided: List[StatusTransition] = []
+        failed: List[StatusTransition] = []
         for row in rows:
             post_id = int(row.get("id") or 0)
             if not post_id:
@@ -81,45 +88,59 @@ class ScreeningService:
                 if relevant_status not in allowed:
                     log.error({"post_id": post_id, "error": f"invalid relevant_status: {relevant_status}"})
                     # 执行失败，标记为 SCREENING_FAILED
-                    try:
-                        PostRepository.update_analysis_status(post_id, AnalysisStatus.SCREENING_FAILED.value)
-                    except Exception as ue:
-                        log.exception("更新 SCREENING_FAILED 状态失败：post_id=%s, err=%s", post_id, ue)
+                    failed.append((post_id, AnalysisStatus.SCREENING_FAILED.value, None))
                     counters["skipped"] += 1
                     continue
-                # 回写 relevant_status + relevant_result
-                PostRepository.update_relevant_status(post_id, relevant_status, relevant_result)
+                # 待回写 relevant_status + relevant_result
+                decided.append((post_id, relevant_status, relevant_result))
                 # 临时处理，跳过评论获取，如果要跳过评论获取，则打开注释
                 # if relevant_status in [RelevantStatus.YES.value, RelevantStatus.MAYBE.value]:
                 #     PostRepository.update_analysis_status(post_id, AnalysisStatus.PENDING.value)
+            except Exception as e:
+                # 任一执行步骤失败则直接标记为 SCREENING_FAILED
+                log.exception("筛选执行失败，将标记为 SCREENING_FAILED：post_id=%s, err=%s", post_id, e)
+                failed.append((post_id, AnalysisStatus.SCREENING_FAILED.value, None))
+                counters["skipped"] += 1
+                continue
+
+        if decided:
+            try:
+                applied = set(PostRepository.transition_relevant_status(decided, expected=expected_status))
+            except Exception as e:
+                log.exception("批量回写 relevant_status 失败，将标记为 SCREENING_FAILED：err=%s", e)
+                applied = set()
+                failed.extend((post_id, AnalysisStatus.SCREENING_FAILED.value, None) for post_id, _, _ in decided)
+                counters["skipped"] += len(decided)
+                decided = []
+            for post_id, relevant_status, _ in decided:
+                if post_id not in applied:
+                    counters["conflict"] += 1
+                    log.warning({"post_id": post_id, "event": "relevant_status 已被并发修改，跳过回写"})
+                    continue
                 # 计数
                 if relevant_status in counters:
                     counters[relevant_status] += 1
                 else:
                     counters["skipped"] += 1
                 log.info({"post_id": post_id, "updated_relevant_status": relevant_status})
-            except Exception as e:
-                # 任一执行步骤失败则直接标记为 SCREENING_FAILED
-                log.exception("筛选执行失败，将标记为 SCREENING_FAILED：post_id=%s, err=%s", post_id, e)
-                try:
-                    PostRepository.update_analysis_status(post_id, AnalysisStatus.SCREENING_FAILED.value)
-                except Exception as ue:
-                    log.exception("更新 SCREENING_FAILED 状态失败：post_id=%s, err=%s", post_id, ue)
-                counters["skipped"] += 1
-                continue
+        if failed:
+            try:
+                PostRepository.transition_analysis_status(failed)
+            except Exception as ue:
+                log.exception("更新 SCREENING_FAILED 状态失败：post_ids=%s, err=%s", [f[0] for f in failed], ue)
         return counters
 
     def process_one_by_id(self, post_id: int) -> Dict[str, Any]:
         """按 ID 执行一次初筛：读取 DB→组装 row→复用 process_batch 处理一条
         返回与批处理一致的计数器摘要，以及该 id 的最终状态
         """
-        post = PostRepository.get_by_id(post_id)
+        post = PostRepository.get_by_id(post_id, columns=SCREENING_COLUMNS)
         if not post:
             raise ValueError(f"post not found: id={post_id}")
         row = post.model_dump(mode="json", exclude_none=True)  # type: ignore
-        counters = self.process_batch([row])
+        counters = self.process_batch([row], expected_status=None)
         # 读取刚写回的状态（也可直接返回 process_batch 内部的决策）
-        updated = PostRepository.get_by_id(post_id)
+        updated = PostRepository.get_ref(post_id)
         final_status = getattr(updated, "relevant_status", None) or "unknown"
         return {"post_id": post_id, "relevant_status": final_status, "counters": counters}
 
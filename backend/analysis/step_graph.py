@@ -0,0 +1,73 @@
+"""
+单任务内的小型步骤 DAG：依赖满足的步骤并发执行，并记录每步耗时
+
+用法：
+    graph = StepGraph(executor)
+    graph.add("media", lambda r: ..., deps=("details",))
+    graph.add("comments", lambda r: ...)
+    results, timings = graph.run()
+
+- 步骤函数接收已完成步骤的结果字典（只读），返回值以步骤名存入结果
+- 步骤在线程池中以调用方的 contextvars 副本执行（project_id 等日志上下文随之传递）
+- 任一步骤失败时不再提交新步骤，等待已在运行的步骤结束后抛出首个异常（避免失败后仍有步骤写库）
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+import contextvars
+import time
+
+StepFn = Callable[[Dict[str, Any]], Any]
+
+
+class StepGraph:
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        self._steps: Dict[str, Tuple[StepFn, Tuple[str, ...]]] = {}
+
+    def add(self, name: str, fn: StepFn, deps: Iterable[str] = ()) -> "StepGraph":
+        deps = tuple(deps)
+        unknown = [d for d in deps if d not in self._steps]
+        if unknown:
+            raise ValueError(f"步骤 {name} 依赖未定义的步骤：{unknown}（需先 add 依赖步骤）")
+        self._steps[name] = (fn, deps)
+        return self
+
+    def run(self) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """执行全部步骤，返回 (结果, 各步骤耗时毫秒)；耗时另含 total。"""
+        start = time.perf_counter()
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        waiting = dict(self._steps)
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+
+        while waiting or running:
+            if error is None:
+                for name in [n for n, (_, deps) in waiting.items() if all(d in results for d in deps)]:
+                    fn, _ = waiting.pop(name)
+                    ctx = contextvars.copy_context()
+                    running[self.executor.submit(ctx.run, _timed, fn, dict(results))] = name
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    value, elapsed = fut.result()
+                except BaseException as e:
+                    error = error or e
+                    continue
+                results[name] = value
+                timings[name] = elapsed
+
+        timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+        if error is not None:
+            raise error
+        return results, timings
+
+
+def _timed(fn: StepFn, results: Dict[str, Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    value = fn(results)
+    return value, round((time.perf_counter() - start) * 1000, 1)
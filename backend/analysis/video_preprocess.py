@@ -0,0 +1,246 @@
+"""
+视频上传前的本地预处理（ffmpeg）
+
+模型按 VideoMetadata(fps=1) 采样视频，并不需要原始分辨率与全部帧；上传字节数与 Gemini 处理耗时
+随分辨率、时长线性增长。预处理按策略在本地转码后再上传：
+- downscale：缩放到不超过 VIDEO_PREPROCESS_MAX_HEIGHT（默认 480p），可选降帧率，音频转单声道低码率
+- 时长上限：VIDEO_PREPROCESS_MAX_DURATION_SEC（默认 0 不截断）
+- 长视频（时长 >= VIDEO_PREPROCESS_KEYFRAMES_AFTER_SEC，默认 300 秒）：只保留音频 + 关键帧
+  （-skip_frame nokey 仅解码关键帧，按可变帧率输出，时间轴不变）
+
+结果按 (源内容 sha256, 配置指纹) 缓存到 VIDEO_PREPROCESS_CACHE_DIR，超过 VIDEO_PREPROCESS_CACHE_MAX_MB
+时按最近访问时间淘汰（最近 EVICT_GRACE_SEC 秒内写入/命中的文件可能正在上传，不淘汰）；
+转码结果不小于源文件、ffmpeg 不可用或失败时直接上传源文件。
+
+配置指纹（fingerprint()）覆盖全部策略参数：同一源内容在同一配置下选出的策略确定，
+因此 Gemini 文件缓存键、分析结果指纹只需 (源内容, 配置指纹)，无需先 ffprobe 探测时长。
+
+配置（环境变量）：
+- VIDEO_PREPROCESS：auto（默认，按上述策略）| off
+- VIDEO_PREPROCESS_MAX_HEIGHT / VIDEO_PREPROCESS_FPS（0 为保持原帧率）/ VIDEO_PREPROCESS_CRF
+- VIDEO_PREPROCESS_MAX_DURATION_SEC / VIDEO_PREPROCESS_KEYFRAMES_AFTER_SEC / VIDEO_PREPROCESS_TIMEOUT_SEC
+- VIDEO_PREPROCESS_CACHE_DIR / VIDEO_PREPROCESS_CACHE_MAX_MB
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import IO, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from jobs.logger import get_logger
+from tikhub_api.utils.ttl_cache import TTLCache
+
+log = get_logger(__name__)
+
+MODE = (os.getenv("VIDEO_PREPROCESS", "auto") or "auto").strip().lower()
+MAX_HEIGHT = int(os.getenv("VIDEO_PREPROCESS_MAX_HEIGHT", "480"))
+FPS = float(os.getenv("VIDEO_PREPROCESS_FPS", "0"))
+CRF = int(os.getenv("VIDEO_PREPROCESS_CRF", "28"))
+MAX_DURATION_SEC = float(os.getenv("VIDEO_PREPROCESS_MAX_DURATION_SEC", "0"))
+KEYFRAMES_AFTER_SEC = float(os.getenv("VIDEO_PREPROCESS_KEYFRAMES_AFTER_SEC", "300"))
+TIMEOUT_SEC = float(os.getenv("VIDEO_PREPROCESS_TIMEOUT_SEC", "300"))
+CACHE_DIR = os.getenv("VIDEO_PREPROCESS_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "gg_video_preprocess")
+CACHE_MAX_BYTES = int(float(os.getenv("VIDEO_PREPROCESS_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+FFMPEG = shutil.which("ffmpeg")
+FFPROBE = shutil.which("ffprobe")
+
+# 转码无收益（结果不小于源文件）的源内容，避免重复转码
+# 最近写入/命中的转码结果视为可能正在上传，淘汰时跳过
+EVICT_GRACE_SEC = 300
+
+_passthrough: TTLCache[bool] = TTLCache(default_ttl=24 * 3600, max_size=4096)
+_locks: dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+_warned = False
+
+
+@dataclass
+class PreprocessPlan:
+    src_path: str
+    src_size: int
+    duration_sec: Optional[float]
+    policy: str  # downscale / keyframes
+    fingerprint: str  # 配置指纹（见 fingerprint()）
+
+
+@dataclass
+class PreprocessedVideo:
+    plan: PreprocessPlan
+    path: str
+    size: int
+    elapsed_ms: float  # 本次转码耗时（缓存命中为 0）
+    cached: bool
+
+    def open(self) -> IO[bytes]:
+        return open(self.path, "rb")
+
+
+def fingerprint() -> Optional[str]:
+    """当前预处理配置的指纹；不预处理（关闭或 ffmpeg 不可用）时返回 None。
+    参数变化后缓存自然失效（不会复用按旧参数转码的结果、Gemini 文件或分析结果）。
+    """
+    if not _enabled():
+        return None
+    raw = json.dumps([MAX_HEIGHT, FPS, CRF, MAX_DURATION_SEC, KEYFRAMES_AFTER_SEC], separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:10]
+
+
+def plan(src: IO[bytes]) -> Optional[PreprocessPlan]:
+    """为 src（需为带 name 路径的文件句柄，如 download_video_to_tempfile 的返回值）选择策略；
+    返回 None 表示不预处理（关闭、ffmpeg 不可用或句柄无路径）。会调用 ffprobe 探测时长，
+    调用方应先按 fingerprint() 查缓存，未命中需要转码时再调用。
+    """
+    fp = fingerprint()
+    if fp is None:
+        return None
+    src_path = getattr(src, "name", None)
+    if not isinstance(src_path, str) or not os.path.exists(src_path):
+        return None
+    duration = _probe_duration(src_path)
+    policy = "keyframes" if duration and KEYFRAMES_AFTER_SEC > 0 and duration >= KEYFRAMES_AFTER_SEC else "downscale"
+    return PreprocessPlan(src_path, os.path.getsize(src_path), duration, policy, fp)
+
+
+def run(p: PreprocessPlan, digest: str) -> Optional[PreprocessedVideo]:
+    """按计划转码（结果按 源内容 sha256 + 配置指纹 缓存）；返回 None 表示直接上传源文件（无收益或失败）。"""
+    policy, src_path, src_size = p.policy, p.src_path, p.src_size
+    key = f"{digest}_{p.fingerprint}"
+    if _passthrough.get(key):
+        return None
+
+    out_path = os.path.join(CACHE_DIR, f"{key}.mp4")
+    with _lock_for(key):
+        if os.path.exists(out_path):
+            os.utime(out_path)
+            return PreprocessedVideo(p, out_path, os.path.getsize(out_path), 0.0, True)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp.mp4"
+        start = time.perf_counter()
+        try:
+            proc = subprocess.run(_command(src_path, tmp_path, policy), capture_output=True, timeout=TIMEOUT_SEC)
+            ok = proc.returncode == 0 and os.path.exists(tmp_path)
+            if not ok:
+                err = proc.stderr.decode("utf-8", "replace")[-500:]
+                log.warning(f"视频预处理失败，直接上传源文件：policy={policy}，rc={proc.returncode}，err={err}")
+        except subprocess.TimeoutExpired:
+            ok = False
+            log.warning(f"视频预处理超时（{TIMEOUT_SEC}s），直接上传源文件：policy={policy}")
+        except Exception as e:
+            ok = False
+            log.warning(f"视频预处理异常，直接上传源文件：policy={policy}，err={e}")
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        if not ok:
+            _remove(tmp_path)
+            return None
+
+        size = os.path.getsize(tmp_path)
+        if size >= src_size:
+            os.remove(tmp_path)
+            _passthrough.set(key, True)
+            log.info(f"视频预处理无收益，直接上传源文件：policy={policy}，源={src_size}，结果={size} 字节")
+            return None
+        os.replace(tmp_path, out_path)
+
+    _evict()
+    return PreprocessedVideo(p, out_path, size, elapsed_ms, False)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _enabled() -> bool:
+    global _warned
+    if MODE == "off":
+        return False
+    if FFMPEG is None:
+        if not _warned:
+            _warned = True
+            log.warning("未找到 ffmpeg，跳过视频预处理（直接上传源文件）")
+        return False
+    return True
+
+
+def _command(src: str, dst: str, policy: str) -> List[str]:
+    scale = f"scale=-2:'trunc(min({MAX_HEIGHT},ih)/2)*2'" if MAX_HEIGHT > 0 else "null"
+    cmd: List[str] = [FFMPEG or "ffmpeg", "-hide_banner", "-loglevel", "error", "-y"]
+    if policy == "keyframes":
+        # 只解码关键帧，可变帧率输出：画面为关键帧序列，音频完整保留
+        cmd += ["-skip_frame", "nokey", "-i", src]
+        vf = scale
+        cmd += ["-vsync", "vfr"]
+        crf = CRF + 2
+    else:
+        cmd += ["-i", src]
+        vf = f"{scale},fps={FPS:g}" if FPS > 0 else scale
+        crf = CRF
+    if MAX_DURATION_SEC > 0:
+        cmd += ["-t", f"{MAX_DURATION_SEC:g}"]
+    cmd += [
+        "-map", "0:v:0?", "-map", "0:a:0?",
+        "-vf", vf,
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "48k", "-ac", "1",
+        "-movflags", "+faststart",
+        dst,
+    ]
+    return cmd
+
+
+def _probe_duration(path: str) -> Optional[float]:
+    if FFPROBE is None:
+        return None
+    try:
+        proc = subprocess.run(
+            [FFPROBE, "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+            capture_output=True, timeout=30,
+        )
+        return float(json.loads(proc.stdout or b"{}").get("format", {}).get("duration"))
+    except Exception:
+        return None
+
+
+def _lock_for(key: str) -> threading.Lock:
+    """同一源内容 + 策略只转码一次（并发分析同一视频时后到者等待并命中缓存）。"""
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            if len(_locks) > 1024:
+                _locks.clear()
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def _evict() -> None:
+    """缓存目录超过上限时按最近访问（mtime）从旧到新删除；EVICT_GRACE_SEC 内访问过的文件跳过。"""
+    try:
+        entries = [e for e in os.scandir(CACHE_DIR) if e.is_file() and not e.name.endswith(".tmp.mp4")]
+    except OSError:
+        return
+    total = sum(e.stat().st_size for e in entries)
+    if total <= CACHE_MAX_BYTES:
+        return
+    cutoff = time.time() - EVICT_GRACE_SEC
+    for e in sorted(entries, key=lambda x: x.stat().st_mtime):
+        try:
+            st = e.stat()
+            if st.st_mtime >= cutoff:
+                break  # 其余更新，均可能正在使用
+            size = st.st_size
+            os.remove(e.path)
+            total -= size
+        except OSError:
+            continue
+        if total <= CACHE_MAX_BYTES:
+            break
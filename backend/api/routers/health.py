@@ -7,8 +7,10 @@
 import time
 from datetime import datetime
 from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
 from jobs.config import Settings
 from jobs.logger import get_logger
+from tikhub_api.orm.supabase_client import check_health as check_db_health
 from ..dependencies import get_settings
 from ..schemas import BaseResponse
 
@@ -76,6 +78,11 @@ async def detailed_health_check(settings: Settings = Depends(get_settings)):
         },
     }
 
+    # 数据库连通性（同步客户端，放到线程池执行）
+    health_info["components"]["database"] = await run_in_threadpool(check_db_health)
+    if not health_info["components"]["database"]["ok"]:
+        health_info["status"] = "degraded"
+
     # 计算检查耗时
     health_info["uptime_check_duration_ms"] = round((time.time() - start_time) * 1000, 2)
 
@@ -90,6 +97,9 @@ async def readiness_check(settings: Settings = Depends(get_settings)):
     # 检查关键组件是否启用
     ready = True
     components = []
+    database = await run_in_threadpool(check_db_health)
+    if not database["ok"]:
+        ready = False
 
     if settings.ENABLE_SCHEDULER:
         components.append("scheduler")
@@ -101,6 +111,7 @@ async def readiness_check(settings: Settings = Depends(get_settings)):
     data = {
         "ready": ready,
         "components": components,
+        "database": database,
         "timestamp": datetime.utcnow().isoformat(),
     }
     return BaseResponse.ok(data)
@@ -1,11 +1,12 @@
 from __future__ import annotations
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any
 import re
 import json
+import hashlib
 
 from jobs.logger import get_logger
 from common.request_context import get_project_id
-from tikhub_api.orm.prompt_variable_repository import PromptVariableRepository
+from tikhub_api.orm import prompt_cache
 
 log = get_logger(__name__)
 
@@ -24,21 +25,10 @@ def _to_str(val: Any) -> str:
 
 
 def _load_project_vars(project_id: str) -> Dict[str, Any]:
-    """读取指定项目的所有变量，返回 {variable_name: variable_value}。
+    """读取指定项目的所有变量，返回 {variable_name: variable_value}（经进程内缓存）。
     若查询失败，抛出异常给上层处理。
     """
-    rows: List[Any] = PromptVariableRepository.list_by_project(project_id, limit=500)
-    result: Dict[str, Any] = {}
-    for r in rows:
-        try:
-            name = getattr(r, "variable_name", None)
-            if not name:
-                continue
-            result[str(name)] = getattr(r, "variable_value", None)
-        except Exception:
-            # 跳过异常行
-            continue
-    return result
+    return prompt_cache.get_project_vars(project_id)[1]
 
 
 def render_prompt(template: str, project_id: Optional[str] = None) -> str:
@@ -47,6 +37,7 @@ def render_prompt(template: str, project_id: Optional[str] = None) -> str:
     - project_id 缺省时，会通过 request 上下文 get_project_id() 获取。
     - 未找到变量时保留原占位符（便于排查与容错）。
     - dict/list 值会以 JSON 字符串注入，其他类型用 str()。
+    - 渲染结果按 (模板内容指纹, project_id, 变量版本) 记忆化。
     """
     if not template:
         return template or ""
@@ -57,11 +48,16 @@ def render_prompt(template: str, project_id: Optional[str] = None) -> str:
         return template
 
     try:
-        var_map = _load_project_vars(pid)
+        vars_version, var_map = prompt_cache.get_project_vars(pid)
     except Exception:
         log.exception("读取项目变量失败：project_id=%s", pid)
         return template
 
+    memo_key = (hashlib.sha1(template.encode("utf-8")).hexdigest(), pid, vars_version)
+    cached = prompt_cache.get_rendered(memo_key)
+    if cached is not None:
+        return cached
+
     def _repl(m: re.Match[str]) -> str:
         key = m.group(1)
         if key in var_map:
@@ -70,8 +66,9 @@ def render_prompt(template: str, project_id: Optional[str] = None) -> str:
         return m.group(0)
 
     try:
-        return _VAR_PATTERN.sub(_repl, template)
+        rendered = _VAR_PATTERN.sub(_repl, template)
     except Exception:
         log.exception("渲染 prompt 模板失败")
         return template
-
+    prompt_cache.set_rendered(memo_key, rendered)
+    return rendered
@@ -45,6 +45,15 @@ class Settings:
     WORKER_AUTHOR_CONCURRENCY: int = 1
     MAX_ATTEMPTS: int = 5
     RUNNING_TIMEOUT_MIN: int = 15
+    # 评论车道是否同步楼中楼回复
+    COMMENTS_SYNC_REPLIES: bool = False
+    # 分析车道批量模式（Gemini batch job）：非标记的待分析帖子积压达到 MIN_BACKLOG 时，
+    # 一次认领至多 BATCH_SIZE 条合并为一个 batch job 提交（成本约为交互调用的一半，时延以小时计）
+    ANALYZE_BATCH_ENABLED: bool = False
+    ANALYZE_BATCH_MIN_BACKLOG: int = 50
+    ANALYZE_BATCH_SIZE: int = 100
+    ANALYZE_BATCH_POLL_SEC: int = 30
+    ANALYZE_BATCH_TIMEOUT_SEC: int = 86400
 
     # API Server
     API_HOST: str = "0.0.0.0"
@@ -77,6 +86,12 @@ class Settings:
             WORKER_AUTHOR_CONCURRENCY=_getenv_int("WORKER_AUTHOR_CONCURRENCY",1),
             MAX_ATTEMPTS=_getenv_int("MAX_ATTEMPTS", 5),
             RUNNING_TIMEOUT_MIN=_getenv_int("RUNNING_TIMEOUT_MIN", 15),
+            COMMENTS_SYNC_REPLIES=_getenv_bool("COMMENTS_SYNC_REPLIES", False),
+            ANALYZE_BATCH_ENABLED=_getenv_bool("ANALYZE_BATCH_ENABLED", False),
+            ANALYZE_BATCH_MIN_BACKLOG=_getenv_int("ANALYZE_BATCH_MIN_BACKLOG", 50),
+            ANALYZE_BATCH_SIZE=_getenv_int("ANALYZE_BATCH_SIZE", 100),
+            ANALYZE_BATCH_POLL_SEC=_getenv_int("ANALYZE_BATCH_POLL_SEC", 30),
+            ANALYZE_BATCH_TIMEOUT_SEC=_getenv_int("ANALYZE_BATCH_TIMEOUT_SEC", 86400),
             API_HOST=_getenv_str("API_HOST", "0.0.0.0"),
             API_PORT=_getenv_int("API_PORT", 8000),
             API_WORKERS=_getenv_int("API_WORKERS", 1),
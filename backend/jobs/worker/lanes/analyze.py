@@ -1,38 +1,149 @@
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from jobs.worker.lanes.base import BaseLane
 from jobs.logger import get_logger
 from common.request_context import set_project_id, reset_project_id
 
 log = get_logger(__name__)
 from tikhub_api.orm import PostRepository, AnalysisStatus
+from tikhub_api.orm.models import PostRef
 from analysis.analysis_service import AnalysisService
 
 
 
 class AnalyzeLane(BaseLane):
+    """分析车道：两种模式
+
+    - 交互模式：每轮取一条 pending 帖子同步调用 generate_content；人工标记/导入（is_marked）的帖子优先且只走该模式
+    - 批量模式（ANALYZE_BATCH_ENABLED）：非标记的 pending 帖子积压 >= ANALYZE_BATCH_MIN_BACKLOG 时，
+      认领至多 ANALYZE_BATCH_SIZE 条置为 batch_queued，在独立线程中合并提交一个 Gemini batch job；
+      同一时间最多一个 batch 在途，交互模式不受影响；batch 结束后仍为 batch_queued 的帖子（job 失败/超时/异常）
+      退回 pending，同一帖子连续 MAX_ATTEMPTS 次随 job 失败后置为 analysis_failed
+    """
     name = "analyze"
 
     def __init__(self, settings, executor):
         super().__init__(settings, executor)
         self._busy = False
+        self._batch_busy = False
         self._lock = threading.Lock()
+        self._batch_executor = None
+        self._batch_failures: Dict[int, int] = {}  # post_id -> 连续随 batch job 失败的次数（仅批量线程读写）
+        if getattr(settings, "ANALYZE_BATCH_ENABLED", False):
+            self._batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analyze-batch")
+            self._requeue_stale_batch()
 
     def claim_and_submit_batch(self) -> int:
         with self._lock:
+            submitted = self._maybe_submit_batch()
             if self._busy:
                 log.debug("[AnalyzeLane] busy, skipping this round")
-                return 0
-            # 查询一条待分析的帖子（analysis_status='pending'）
-            posts = PostRepository.list_by_analysis_status(AnalysisStatus.PENDING.value, limit=1)
+                return submitted
+            # 查询一条待分析的帖子（analysis_status='pending'），人工标记/导入的优先
+            posts = PostRepository.list_refs_by_analysis_status(AnalysisStatus.PENDING.value, limit=1, is_marked=True)
+            if not posts:
+                posts = PostRepository.list_refs_by_analysis_status(AnalysisStatus.PENDING.value, limit=1)
             if not posts:
-                return 0
+                return submitted
             post = posts[0]
             if not getattr(post, "id", None):
-                return 0
+                return submitted
             self._busy = True
             self.executor.submit(self._run_one_wrapper, int(post.id))
             log.info("[AnalyzeLane] submitted 1 task, marked as busy: post_id=%s", post.id)
-            return 1
+            return submitted + 1
+
+    def _maybe_submit_batch(self) -> int:
+        """积压足够时认领一批非标记帖子并提交批量分析（调用方持有 _lock）。"""
+        if self._batch_executor is None or self._batch_busy:
+            return 0
+        s = self.settings
+        size = max(1, int(s.ANALYZE_BATCH_SIZE))
+        refs = PostRepository.list_refs_by_analysis_status(
+            AnalysisStatus.PENDING.value, limit=max(size, int(s.ANALYZE_BATCH_MIN_BACKLOG)), is_marked=False
+        )
+        if len(refs) < s.ANALYZE_BATCH_MIN_BACKLOG:
+            return 0
+        refs = refs[:size]
+        # 乐观认领：仍为 pending 的才进入批次（与交互模式、其他 worker 不重复处理）
+        claimed = set(PostRepository.transition_analysis_status(
+            [(r.id, AnalysisStatus.BATCH_QUEUED.value, None) for r in refs],
+            expected=AnalysisStatus.PENDING.value,
+        ))
+        refs = [r for r in refs if r.id in claimed]
+        if not refs:
+            return 0
+        self._batch_busy = True
+        self._batch_executor.submit(self._run_batch_wrapper, refs)
+        log.info("[AnalyzeLane] submitted batch job with %s posts", len(refs))
+        return len(refs)
+
+    def _run_batch_wrapper(self, refs: List[PostRef]) -> None:
+        try:
+            svc = AnalysisService()
+            counts = svc.analyze_posts_batch(
+                refs,
+                poll_sec=self.settings.ANALYZE_BATCH_POLL_SEC,
+                timeout_sec=self.settings.ANALYZE_BATCH_TIMEOUT_SEC,
+            )
+            if counts.get("unfinished"):
+                self._release_unfinished(refs)
+            else:
+                for r in refs:
+                    self._batch_failures.pop(r.id, None)
+        except Exception as e:
+            log.exception("[AnalyzeLane] batch failed: %s", e)
+            self._release_unfinished(refs)
+        finally:
+            with self._lock:
+                self._batch_busy = False
+                log.info("[AnalyzeLane] batch completed")
+
+    def _release_unfinished(self, refs: List[PostRef]) -> None:
+        """把本批仍为 batch_queued 的帖子退回 pending；连续 MAX_ATTEMPTS 次随 job 失败的置为 analysis_failed。"""
+        limit = max(1, int(self.settings.MAX_ATTEMPTS))
+        retry: List[int] = []
+        give_up: List[int] = []
+        for r in refs:
+            (give_up if self._batch_failures.get(r.id, 0) + 1 >= limit else retry).append(r.id)
+        try:
+            failed = PostRepository.transition_analysis_status(
+                [(i, AnalysisStatus.ANALYSIS_FAILED.value, None) for i in give_up],
+                expected=AnalysisStatus.BATCH_QUEUED.value,
+            )
+            requeued = set(PostRepository.transition_analysis_status(
+                [(i, AnalysisStatus.PENDING.value, None) for i in retry],
+                expected=AnalysisStatus.BATCH_QUEUED.value,
+            ))
+        except Exception as e:
+            # 留在 batch_queued 的帖子由下次启动时的 _requeue_stale_batch 退回
+            log.warning("[AnalyzeLane] release unfinished batch posts failed: %s", e)
+            return
+        for r in refs:
+            if r.id in requeued:
+                self._batch_failures[r.id] = self._batch_failures.get(r.id, 0) + 1
+            else:
+                self._batch_failures.pop(r.id, None)
+        log.info("[AnalyzeLane] batch unfinished: requeued=%s, failed after %s attempts=%s",
+                 len(requeued), limit, len(failed))
+
+    def _requeue_stale_batch(self) -> None:
+        """启动时把上次进程退出前未完成的 batch_queued 帖子退回 pending。
+
+        假定同一时间只有一个启用批量模式的分析 worker；多实例部署时只应在其中一个实例开启批量模式。
+        """
+        try:
+            refs = PostRepository.list_refs_by_analysis_status(AnalysisStatus.BATCH_QUEUED.value, limit=1000)
+            if not refs:
+                return
+            moved = PostRepository.transition_analysis_status(
+                [(r.id, AnalysisStatus.PENDING.value, None) for r in refs],
+                expected=AnalysisStatus.BATCH_QUEUED.value,
+            )
+            log.info("[AnalyzeLane] requeued %s stale batch_queued posts", len(moved))
+        except Exception as e:
+            log.warning("[AnalyzeLane] requeue stale batch_queued posts failed: %s", e)
 
     def _run_one_wrapper(self, item) -> None:
         try:
@@ -47,7 +158,7 @@ class AnalyzeLane(BaseLane):
         try:
             log.info("[AnalyzeLane] processing post_id: %s", post_id)
             # 注入上下文：读取该帖的 project_id 作为本次任务生命周期内的固定值
-            post = PostRepository.get_by_id(int(post_id))
+            post = PostRepository.get_ref(int(post_id))
             pid = getattr(post, "project_id", None) if post else None
             if pid:
                 token = set_project_id(str(pid))
@@ -71,7 +71,7 @@ class AuthorLane(BaseLane):
         try:
             log.info("[AuthorLane] processing post_id: %s", post_id)
             # 注入项目上下文（若存在）
-            post = PostRepository.get_by_id(int(post_id))
+            post = PostRepository.get_ref(int(post_id))
             pid = getattr(post, "project_id", None) if post else None
             if pid:
                 token = set_project_id(str(pid))
@@ -21,7 +21,7 @@ class CommentsLane(BaseLane):
                 log.debug("[CommentsLane] busy, skipping this round")
                 return 0
             # 获取一条 analysis_status=init 且 relevant_status in (yes, maybe) 的帖子
-            candidates = PostRepository.list_by_analysis_and_relevance(
+            candidates = PostRepository.list_refs_by_analysis_and_relevance(
                 [AnalysisStatus.INIT.value],
                 [RelevantStatus.YES.value, RelevantStatus.MAYBE.value],
                 limit=1,
@@ -46,14 +46,17 @@ class CommentsLane(BaseLane):
 
     def _run_one(self, item) -> None:
         try:
-            # item 期望为 PlatformPost
+            # item 期望为 PostRef
             post_id = getattr(item, "id", None)
             if not post_id:
                 log.warning("[CommentsLane] invalid item: missing id")
                 return
 
             # 调用工作流公开方法封装的评论同步逻辑
-            res = sync_comments_for_post_id(int(post_id), page_size=20)
+            res = sync_comments_for_post_id(
+                int(post_id), page_size=20,
+                sync_replies=self.settings.COMMENTS_SYNC_REPLIES,
+            )
             log.info(
                 "[CommentsLane] comments step finished: ok=%s skipped=%s err=%s",
                 getattr(res, "ok", False), getattr(res, "skipped", False), getattr(res, "error", None)
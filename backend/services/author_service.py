@@ -10,7 +10,7 @@ from typing import Optional
 
 from jobs.logger import get_logger
 
-from tikhub_api.orm import PostRepository, AuthorRepository, AuthorFetchStatus, Author, RelevantStatus
+from tikhub_api.orm import PostRepository, AuthorRepository, AuthorFetchStatus, Author, RelevantStatus, PostRef
 from tikhub_api.fetchers import FetcherFactory
 
 log = get_logger(__name__)
@@ -19,7 +19,7 @@ log = get_logger(__name__)
 def fetch_and_save_author_by_post_id(post_id: int) -> Optional["Author"]:
     """
     传入 post_id：
-    1) 从 ORM 读取 PlatformPost
+    1) 从 ORM 读取帖子引用（PostRef）
     2) 读取 post.author_id，选择平台对应的 fetcher
     3) 调用 fetcher.get_author(author_id) 获取 Author
     4) 使用 AuthorRepository.upsert_author 保存并返回保存后的 Author
@@ -31,7 +31,7 @@ def fetch_and_save_author_by_post_id(post_id: int) -> Optional["Author"]:
         if not isinstance(post_id, int) or post_id <= 0:
             raise ValueError("post_id 必须为正整数")
 
-        post = PostRepository.get_by_id(post_id)
+        post = PostRepository.get_ref(post_id)
         if not post:
             log.warning("未找到帖子：post_id=%s", post_id)
             return None
@@ -77,18 +77,18 @@ def fetch_and_save_author_by_post_id(post_id: int) -> Optional["Author"]:
 
 
 
-def list_posts_with_author_not_fetched(limit: int = 50) -> list["PlatformPost"]:
+def list_posts_with_author_not_fetched(limit: int = 50) -> list[PostRef]:
     """
     按作者获取状态=未获取(not_fetched) 且相关性状态为 YES 或 MAYBE 查询帖子列表。
     Args:
         limit: 需要的条数
     Returns:
-        PlatformPost 列表
+        PostRef 列表（仅 id/platform/author_id 等候选选择所需列）
     """
     try:
         if not isinstance(limit, int) or limit <= 0:
             limit = 50
-        return PostRepository.list_by_author_fetch_status(
+        return PostRepository.list_refs_by_author_fetch_status(
             status=AuthorFetchStatus.NOT_FETCHED.value,
             limit=limit,
             offset=0,
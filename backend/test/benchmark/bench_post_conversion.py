@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+PlatformPost 转换微基准：对比 DB 行 -> PlatformPost 的完整校验路径与免校验快速路径
+
+测量项（单条耗时，微秒）：
+1. adapter.to_post：平台原始报文 -> PlatformPost（边界处完整校验，跳过网络 URL 校验）
+2. _row_to_model_validated：DB 行 -> PlatformPost（旧路径，Pydantic 完整校验）
+3. _row_to_model：DB 行 -> PlatformPost（新路径，跳过校验直接构造）
+4. model_dump(mode="json")：落库前序列化
+5. 入库内层循环：逐条 to_post（旧）与批量 to_posts（新），按页大小分批；评论 to_comment 逐条与 to_comment_list 批量
+
+使用方法:
+    cd backend
+    python test/benchmark/bench_post_conversion.py [--n 2000]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import timeit
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from tikhub_api.adapters import DouyinVideoAdapter, DouyinCommentAdapter  # noqa: E402
+from tikhub_api.orm.post_repository import PostRepository  # noqa: E402
+from jobs.logger import get_logger  # noqa: E402
+
+
+def make_douyin_details(i: int) -> dict:
+    """构造一条接近真实体量的抖音详情报文（含较大的 raw 结构）。"""
+    aweme_id = str(7400000000000000000 + i)
+    urls = [f"https://v{k}-web.douyinvod.com/{'a' * 32}/68f3a1b2/video/tos/cn/{aweme_id}.mp4" for k in range(3)]
+    return {
+        "aweme_detail": {
+            "aweme_id": aweme_id,
+            "desc": f"测试视频标题 #{i} " + "描述" * 40,
+            "create_time": int(time.time()) - i * 60,
+            "share_url": f"https://www.douyin.com/video/{aweme_id}",
+            "author": {"sec_uid": f"MS4wLjABAAAA{i:08d}", "nickname": f"作者{i}"},
+            "statistics": {"play_count": 1000 + i, "digg_count": 100 + i, "comment_count": 10 + i, "share_count": i},
+            "video": {
+                "duration": 15000,
+                "cover": {"url_list": [f"https://p3-sign.douyinpic.com/cover/{aweme_id}.jpeg"]},
+                "download_addr": {"url_list": urls},
+                "bit_rate": [{"gear_name": f"gear_{g}", "play_addr": {"url_list": urls}} for g in range(6)],
+            },
+            "text_extra": [{"hashtag_name": f"tag{t}"} for t in range(10)],
+        }
+    }
+
+
+def make_db_row(post, i: int) -> dict:
+    """模拟 Supabase 返回的行：JSON 化字段、video_url 为 JSON 字符串、时间为 ISO 字符串。"""
+    row = post.model_dump(mode="json")
+    row["id"] = i + 1
+    row["video_url"] = json.dumps(row.get("video_url") or [])
+    row["created_at"] = "2025-01-01T00:00:00+00:00"
+    row["updated_at"] = "2025-01-01T00:00:00Z"
+    row["raw_details"] = make_douyin_details(i)
+    return row
+
+
+def make_douyin_comment(i: int) -> dict:
+    return {
+        "cid": str(7300000000000000000 + i),
+        "text": f"评论内容 {i} " + "好" * 20,
+        "create_time": int(time.time()) - i,
+        "digg_count": i % 97,
+        "reply_comment_total": i % 5,
+        "user": {"sec_uid": f"MS4wLjABAAAA{i:08d}", "nickname": f"用户{i}",
+                 "avatar_thumb": {"url_list": [f"https://p3.douyinpic.com/avatar/{i}.jpeg"]}},
+    }
+
+
+_DEVNULL = open(os.devnull, "w")
+
+
+def silence(logger: logging.Logger) -> logging.Logger:
+    """保留仓库日志的格式化/过滤开销，只把输出重定向到 /dev/null。"""
+    for h in logger.handlers:
+        if isinstance(h, logging.StreamHandler):
+            h.setStream(_DEVNULL)
+    return logger
+
+
+legacy_log = silence(get_logger("bench.legacy"))
+silence(get_logger("tikhub_api.adapters"))
+
+
+def legacy_page_loop(adapter, page):
+    """旧实现：逐条 to_post + 每条一条 INFO 日志。"""
+    out = []
+    for raw in page:
+        post = adapter.to_post(raw, valid_urls=DouyinVideoAdapter.video_url_candidates(raw))
+        legacy_log.info("[douyin] 正在转换条目:%s", post.platform_item_id)
+        out.append(post)
+    return out
+
+
+def per_item_us(fn, items, repeat: int = 3) -> float:
+    best = min(timeit.repeat(lambda: [fn(x) for x in items], number=1, repeat=repeat))
+    return best / max(len(items), 1) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PlatformPost 转换微基准")
+    parser.add_argument("--n", type=int, default=2000, help="样本条数")
+    args = parser.parse_args()
+
+    os.environ.setdefault("URL_VALIDATION_MODE", "lazy")
+    adapter = DouyinVideoAdapter()
+    details = [make_douyin_details(i) for i in range(args.n)]
+    posts = [adapter.to_post(d, valid_urls=DouyinVideoAdapter.video_url_candidates(d)) for d in details]
+    rows = [make_db_row(p, i) for i, p in enumerate(posts)]
+
+    to_post_us = per_item_us(lambda d: adapter.to_post(d, valid_urls=DouyinVideoAdapter.video_url_candidates(d)), details)
+    validated_us = per_item_us(lambda r: PostRepository._row_to_model_validated(r), rows)
+    fast_us = per_item_us(lambda r: PostRepository._row_to_model(r), rows)
+    fast_posts = [PostRepository._row_to_model(r) for r in rows]
+    dump_validated_us = per_item_us(lambda p: p.model_dump(mode="json", exclude_none=True), posts)
+    dump_fast_us = per_item_us(lambda p: p.model_dump(mode="json", exclude_none=True), fast_posts)
+
+    page_size = 20
+    pages = [details[i:i + page_size] for i in range(0, len(details), page_size)]
+    page_urls = [[DouyinVideoAdapter.video_url_candidates(d) for d in page] for page in pages]
+    legacy_us = per_item_us(lambda page: legacy_page_loop(adapter, page), pages) / page_size
+    batch_us = per_item_us(lambda ix: adapter.to_posts(pages[ix], valid_urls=page_urls[ix]), range(len(pages))) / page_size
+
+    comments = [make_douyin_comment(i) for i in range(args.n)]
+    comment_single_us = per_item_us(lambda c: DouyinCommentAdapter.to_comment(c, 1), comments)
+    comment_batch_us = per_item_us(lambda _: DouyinCommentAdapter.to_comment_list(comments, 1), [0]) / len(comments)
+
+    print(f"样本条数: {args.n}")
+    print(f"adapter.to_post（边界校验）         : {to_post_us:8.1f} us/条")
+    print(f"_row_to_model_validated（旧路径）   : {validated_us:8.1f} us/条")
+    print(f"_row_to_model（快速路径）           : {fast_us:8.1f} us/条  加速 {validated_us / max(fast_us, 1e-9):.1f}x")
+    print(f"model_dump(json)（校验模型）        : {dump_validated_us:8.1f} us/条")
+    print(f"model_dump(json)（快速路径模型）    : {dump_fast_us:8.1f} us/条")
+    print(f"入库内层循环 逐条 to_post（旧）     : {legacy_us:8.1f} us/条")
+    print(f"入库内层循环 批量 to_posts（新）    : {batch_us:8.1f} us/条  加速 {legacy_us / max(batch_us, 1e-9):.1f}x")
+    print(f"评论 逐条 to_comment                : {comment_single_us:8.1f} us/条")
+    print(f"评论 批量 to_comment_list           : {comment_batch_us:8.1f} us/条  加速 {comment_single_us / max(comment_batch_us, 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
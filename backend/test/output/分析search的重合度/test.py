@@ -35,10 +35,13 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 def extract_douyin_content_ids(response_data: Dict[str, Any]) -> List[str]:
     """
     从抖音平台的 response_data 中提取内容ID
-    路径: response_data.data.data[].aweme_info.aweme_id
+    路径: response_data.data.data[].aweme_info.aweme_id（摘要格式日志为 response_data.item_ids）
     """
     content_ids = []
     try:
+        summary_ids = _summary_item_ids(response_data)
+        if summary_ids is not None:
+            return summary_ids
         if not response_data or 'data' not in response_data:
             return content_ids
         
@@ -71,10 +74,13 @@ def extract_douyin_content_ids(response_data: Dict[str, Any]) -> List[str]:
 def extract_xiaohongshu_content_ids(response_data: Dict[str, Any]) -> List[str]:
     """
     从小红书平台的 response_data 中提取内容ID
-    路径: response_data.data.data.items[].note.id
+    路径: response_data.data.data.items[].note.id（摘要格式日志为 response_data.item_ids）
     """
     content_ids = []
     try:
+        summary_ids = _summary_item_ids(response_data)
+        if summary_ids is not None:
+            return summary_ids
         if not response_data or 'data' not in response_data:
             return content_ids
         
@@ -108,6 +114,14 @@ def extract_xiaohongshu_content_ids(response_data: Dict[str, Any]) -> List[str]:
     return content_ids
 
 
+def _summary_item_ids(response_data: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+    """摘要格式（SEARCH_LOG_MODE=summary，见 tikhub_api.orm.search_log_writer）直接记录了条目 id 列表；
+    非摘要格式返回 None。"""
+    if isinstance(response_data, dict) and isinstance(response_data.get('item_ids'), list):
+        return [str(i) for i in response_data['item_ids'] if i]
+    return None
+
+
 def extract_content_ids(platform: str, response_data: Optional[Dict[str, Any]]) -> List[str]:
     """根据平台类型提取内容ID"""
     if not response_data:
@@ -125,12 +139,14 @@ def extract_content_ids(platform: str, response_data: Optional[Dict[str, Any]])
 def extract_guide_search_words(response_data: Optional[Dict[str, Any]]) -> List[str]:
     """
     从 response_data 中提取推荐搜索词
-    路径: response_data.data.guide_search_words[].word
+    路径: response_data.data.guide_search_words[].word（摘要格式日志为 response_data.guide_search_words[]）
     
     注意：目前只有抖音平台有此字段
     """
     guide_words = []
     try:
+        if isinstance(response_data, dict) and isinstance(response_data.get('guide_search_words'), list):
+            return [str(w) for w in response_data['guide_search_words'] if w]
         if not response_data or 'data' not in response_data:
             return guide_words
         
@@ -7,7 +7,7 @@
 1. 读取 output/api_data/kol_xxx/all_data.json 文件
 2. 将10个API的数据导入到对应的8个数据库表
 3. 支持并发导入（默认10并发）
-4. 使用upsert避免重复
+4. 使用upsert避免重复（--backend postgres 时每个KOL单事务写入，明细表用 COPY 装载）
 5. 失败自动重试（最多3次）
 6. 实时进度显示
 7. 数据验证和完整性检查
@@ -80,9 +80,11 @@ class ImportStats:
 class ApiDataImporter:
     """API数据导入器"""
     
-    def __init__(self, concurrency: int = 10, max_retries: int = 3):
+    def __init__(self, concurrency: int = 10, max_retries: int = 3, backend: str = 'supabase'):
         self.concurrency = concurrency
         self.max_retries = max_retries
+        # supabase: PostgREST 逐表写入；postgres: 原生连接池 + 单事务 + COPY（需 DATABASE_URL）
+        self.backend = backend
         self.data_dir = Path(__file__).parent / "output" / "api_data"
         self.stats = ImportStats()
         self.start_time = None
@@ -415,85 +417,78 @@ class ApiDataImporter:
         
         return records
     
+    # (统计字段, 表名, 提取方法)；按 kol_id 先删后插
+    _REPLACE_TABLES = [
+        ('audience', 'gg_pgy_kol_audience', '_extract_audience'),
+        ('fans_summary', 'gg_pgy_kol_fans_summary', '_extract_fans_summary'),
+        ('fans_trend', 'gg_pgy_kol_fans_trend', '_extract_fans_trend'),
+        ('note_rate', 'gg_pgy_kol_note_rate', '_extract_note_rate'),
+        ('notes', 'gg_pgy_kol_notes', '_extract_notes'),
+        ('cost_effective', 'gg_pgy_kol_cost_effective', '_extract_cost_effective'),
+        ('core_data', 'gg_pgy_kol_core_data', '_extract_core_data'),
+    ]
+
     def _import_single_kol_internal(self, kol_data: Dict[str, Any]) -> Tuple[bool, str, Dict[str, int]]:
         """导入单个KOL的数据（内部方法）"""
         kol_id = kol_data.get('kol_id')
         kol_name = kol_data.get('kol_name', 'Unknown')
         apis = kol_data.get('apis', {})
         
-        client = self._get_client()
         local_stats = {
             'base_info': 0, 'audience': 0, 'fans_summary': 0,
             'fans_trend': 0, 'note_rate': 0, 'notes': 0,
             'cost_effective': 0, 'core_data': 0
         }
         
-        # 1. 更新基础信息
+        # 1. 基础信息；2~8. 画像/粉丝/笔记等明细表（单条记录统一为列表）
         base_info = self._extract_base_info(kol_id, apis)
+        replaces: List[Tuple[str, str, List[Dict[str, Any]]]] = []
+        for stat_key, table, extractor in self._REPLACE_TABLES:
+            records = getattr(self, extractor)(kol_id, apis)
+            if records:
+                replaces.append((stat_key, table, records if isinstance(records, list) else [records]))
+        
+        if self.backend == 'postgres':
+            self._write_kol_pg(kol_id, base_info, replaces)
+        else:
+            self._write_kol_supabase(kol_id, base_info, replaces)
+        
         if base_info:
-            client.table('gg_pgy_kol_base_info').upsert(base_info, on_conflict='kol_id').execute()
             local_stats['base_info'] = 1
-        
-        # 2. 插入粉丝画像
-        audience = self._extract_audience(kol_id, apis)
-        if audience:
-            client.table('gg_pgy_kol_audience').delete().eq('kol_id', kol_id).execute()
-            client.table('gg_pgy_kol_audience').insert(audience).execute()
-            local_stats['audience'] = 1
-        
-        # 3. 插入粉丝质量
-        fans_summary = self._extract_fans_summary(kol_id, apis)
-        if fans_summary:
-            client.table('gg_pgy_kol_fans_summary').delete().eq('kol_id', kol_id).execute()
-            client.table('gg_pgy_kol_fans_summary').insert(fans_summary).execute()
-            local_stats['fans_summary'] = 1
-        
-        # 4. 插入粉丝趋势
-        fans_trend = self._extract_fans_trend(kol_id, apis)
-        if fans_trend:
-            client.table('gg_pgy_kol_fans_trend').delete().eq('kol_id', kol_id).execute()
-            batch_size = 50
-            for i in range(0, len(fans_trend), batch_size):
-                batch = fans_trend[i:i+batch_size]
-                client.table('gg_pgy_kol_fans_trend').insert(batch).execute()
-            local_stats['fans_trend'] = len(fans_trend)
-        
-        # 5. 插入笔记数据率
-        note_rate = self._extract_note_rate(kol_id, apis)
-        if note_rate:
-            client.table('gg_pgy_kol_note_rate').delete().eq('kol_id', kol_id).execute()
-            client.table('gg_pgy_kol_note_rate').insert(note_rate).execute()
-            local_stats['note_rate'] = 1
-        
-        # 6. 插入笔记列表
-        notes = self._extract_notes(kol_id, apis)
-        if notes:
-            client.table('gg_pgy_kol_notes').delete().eq('kol_id', kol_id).execute()
-            batch_size = 50
-            for i in range(0, len(notes), batch_size):
-                batch = notes[i:i+batch_size]
-                client.table('gg_pgy_kol_notes').insert(batch).execute()
-            local_stats['notes'] = len(notes)
-        
-        # 7. 插入性价比
-        cost_effective = self._extract_cost_effective(kol_id, apis)
-        if cost_effective:
-            client.table('gg_pgy_kol_cost_effective').delete().eq('kol_id', kol_id).execute()
-            client.table('gg_pgy_kol_cost_effective').insert(cost_effective).execute()
-            local_stats['cost_effective'] = 1
-        
-        # 8. 插入核心数据
-        core_data = self._extract_core_data(kol_id, apis)
-        if core_data:
-            client.table('gg_pgy_kol_core_data').delete().eq('kol_id', kol_id).execute()
-            batch_size = 50
-            for i in range(0, len(core_data), batch_size):
-                batch = core_data[i:i+batch_size]
-                client.table('gg_pgy_kol_core_data').insert(batch).execute()
-            local_stats['core_data'] = len(core_data)
+        for stat_key, _, records in replaces:
+            local_stats[stat_key] = len(records)
         
         return True, f"成功导入 {kol_name} ({kol_id})", local_stats
     
+    def _write_kol_supabase(self, kol_id: str, base_info: Optional[Dict[str, Any]],
+                            replaces: List[Tuple[str, str, List[Dict[str, Any]]]]):
+        """经 PostgREST 逐表写入（非事务，先删后插之间失败会留下空表，依赖重试恢复）"""
+        client = self._get_client()
+        if base_info:
+            client.table('gg_pgy_kol_base_info').upsert(base_info, on_conflict='kol_id').execute()
+        batch_size = 50
+        for _, table, records in replaces:
+            client.table(table).delete().eq('kol_id', kol_id).execute()
+            for i in range(0, len(records), batch_size):
+                client.table(table).insert(records[i:i+batch_size]).execute()
+    
+    def _write_kol_pg(self, kol_id: str, base_info: Optional[Dict[str, Any]],
+                      replaces: List[Tuple[str, str, List[Dict[str, Any]]]]):
+        """经原生 Postgres 连接池在单个事务内写入：upsert 基础信息 + 各表先删后 COPY 装载"""
+        backend_dir = Path(__file__).parent.parent.parent.parent
+        if str(backend_dir) not in sys.path:
+            sys.path.insert(0, str(backend_dir))
+        if (backend_dir / '.env').exists():
+            load_dotenv(backend_dir / '.env')
+        from tikhub_api.orm import pg_backend
+        
+        with pg_backend.transaction() as conn:
+            if base_info:
+                pg_backend.copy_upsert(conn, 'gg_pgy_kol_base_info', [base_info], conflict=('kol_id',))
+            for _, table, records in replaces:
+                pg_backend.execute(f'DELETE FROM {table} WHERE kol_id = %s', (kol_id,), conn=conn)
+                pg_backend.copy_rows(conn, table, records)
+    
     def import_single_kol_with_retry(self, kol_dir: Path, index: int, total: int) -> Tuple[bool, str]:
         """导入单个KOL（带重试机制）"""
         kol_data = self.load_kol_data(kol_dir)
@@ -1036,7 +1031,14 @@ def main():
     parser.add_argument('--report', action='store_true', help='生成数据质量报告')
     parser.add_argument('--kol-id', type=str, help='指定单个KOL ID进行验证')
     parser.add_argument('--full', action='store_true', help='执行完整流程：导入+验证+报告')
+    parser.add_argument('--backend', choices=['supabase', 'postgres'], default=os.getenv('ORM_BACKEND_KOL_IMPORT', 'supabase'),
+                        help='写入后端：supabase(默认) 或 postgres(原生连接池+事务+COPY，需 DATABASE_URL 及 '
+                             'requirements.txt 中的 psycopg[binary]、psycopg-pool)')
     args = parser.parse_args()
+    if args.backend == 'postgres':
+        from tikhub_api.orm import pg_backend
+        if not pg_backend.is_available():
+            parser.error('--backend postgres 需要安装 psycopg[binary] 与 psycopg-pool（pip install -r requirements.txt）并配置 DATABASE_URL')
     
     if args.report:
         reporter = DataReporter()
@@ -1074,7 +1076,7 @@ def main():
         logger.info("🚀 开始完整流程：导入 → 验证 → 报告")
         
         # 1. 导入
-        importer = ApiDataImporter(concurrency=args.concurrency)
+        importer = ApiDataImporter(concurrency=args.concurrency, backend=args.backend)
         kol_dirs = importer.get_all_kol_dirs()
         importer.import_kols_concurrent(kol_dirs, limit=args.limit)
         
@@ -1104,7 +1106,7 @@ def main():
         
     else:
         # 仅导入
-        importer = ApiDataImporter(concurrency=args.concurrency)
+        importer = ApiDataImporter(concurrency=args.concurrency, backend=args.backend)
         kol_dirs = importer.get_all_kol_dirs()
         
         if args.limit:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 以 backend 为根导入（与 test/benchmark 脚本一致）
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
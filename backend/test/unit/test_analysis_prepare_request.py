@@ -0,0 +1,57 @@
+"""_prepare_request：视频下载完成后即查分析结果缓存，命中时不预处理、不上传。"""
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from analysis import analysis_service, result_cache
+from analysis.analysis_service import AnalysisService, MediaSource
+from tikhub_api.orm.enums import PostType
+from tikhub_api.orm.models import PlatformPost
+
+
+class _Download(io.BytesIO):
+    closed_calls = 0
+
+    def close(self):
+        type(self).closed_calls += 1
+        super().close()
+
+
+@pytest.fixture
+def svc(monkeypatch):
+    post = PlatformPost(id=7, project_id="p1", platform="douyin", platform_item_id="747",
+                        title="t", post_type=PostType.VIDEO, video_url=["https://v.example/a.mp4"])
+    s = AnalysisService.__new__(AnalysisService)
+    s.gemini = SimpleNamespace(analysis_model="gemini-2.5-flash")
+    s.uploads = []
+    monkeypatch.setattr(s, "_get_post", lambda post_id: post, raising=False)
+    monkeypatch.setattr(s, "_ensure_post_details_complete", lambda p, f: p, raising=False)
+    monkeypatch.setattr(s, "_safe_comment_parts", lambda post_id: [], raising=False)
+    monkeypatch.setattr(s, "_fetch_video_source", lambda p, f: MediaSource("hash-1", data=_Download(b"v"), digest="d"))
+    monkeypatch.setattr(s, "_upload_video_source", lambda p, src: s.uploads.append(src) or (["part"], "uri-1"))
+    monkeypatch.setattr(analysis_service, "create_fetcher", lambda platform: object())
+    monkeypatch.setattr(analysis_service, "get_system_prompt", lambda name, project_id: "prompt")
+    monkeypatch.setattr(result_cache, "enabled", lambda: True)
+    _Download.closed_calls = 0
+    return s
+
+
+def test_hit_skips_upload_and_closes_download(svc, monkeypatch):
+    hit = SimpleNamespace(id=1, post_id=3)
+    monkeypatch.setattr(result_cache, "lookup", lambda project_id, fp: hit)
+    req = svc._prepare_request(7)
+    assert req.hit is hit
+    assert req.fingerprint
+    assert svc.uploads == []
+    assert _Download.closed_calls >= 1
+
+
+def test_miss_and_force_upload(svc, monkeypatch):
+    monkeypatch.setattr(result_cache, "lookup", lambda project_id, fp: None)
+    req = svc._prepare_request(7)
+    assert req.hit is None and req.source_key == "uri-1" and len(svc.uploads) == 1
+
+    monkeypatch.setattr(result_cache, "lookup", lambda project_id, fp: pytest.fail("force 不应查缓存"))
+    req = svc._prepare_request(7, force=True)
+    assert req.hit is None and len(svc.uploads) == 2
@@ -0,0 +1,59 @@
+"""共用同一 Gemini 文件 URI 的两条帖子（内容级文件缓存 / 结果复用）各自保留一行分析结果。"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from analysis import analysis_service
+from analysis.analysis_service import AnalysisService, PreparedRequest
+from tikhub_api.orm.models import PlatformPost, VideoAnalysis
+
+URI = "https://generativelanguage.googleapis.com/v1beta/files/shared"
+RESULT = {"summary": "锅底太辣", "sentiment": "negative", "events": [], "key_points": [], "risk_type_total": []}
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """以 (project_id, source_path) 为冲突键的内存版 gg_video_analysis。"""
+    rows = {}
+
+    def upsert(payload):
+        key = (payload["project_id"], payload["source_path"])
+        row = rows.setdefault(key, {"id": len(rows) + 1})
+        row.update(payload)
+        return VideoAnalysis(**row)
+
+    monkeypatch.setattr(analysis_service.VideoAnalysisRepository, "upsert", staticmethod(upsert))
+    monkeypatch.setattr(analysis_service.PostRepository, "update_analysis_status", staticmethod(lambda *a, **k: None))
+    return rows
+
+
+def _req(post_id):
+    post = PlatformPost(id=post_id, project_id="p1", platform="douyin", platform_item_id=f"74{post_id}", title="t")
+    return PreparedRequest(post, [], "prompt", URI, "fp", {})
+
+
+def _service():
+    svc = AnalysisService.__new__(AnalysisService)
+    svc.gemini = SimpleNamespace(analysis_model="gemini-2.5-flash")
+    return svc
+
+
+def test_shared_uri_saved_as_separate_rows(table):
+    svc = _service()
+    svc._save_result(_req(1), SimpleNamespace(text=json.dumps(RESULT)))
+    svc._save_result(_req(2), SimpleNamespace(text=json.dumps(RESULT)))
+    assert sorted(r["post_id"] for r in table.values()) == [1, 2]
+
+
+def test_reused_result_does_not_overwrite_source_post(table):
+    svc = _service()
+    original = svc._save_result(_req(1), SimpleNamespace(text=json.dumps(RESULT)))
+    hit = VideoAnalysis(**next(iter(table.values())))
+    assert hit.post_id == 1 and original["post_id"] == 1
+
+    svc._reuse_result(_req(2), hit)
+    by_post = {r["post_id"]: r for r in table.values()}
+    assert set(by_post) == {1, 2}
+    assert by_post[1]["source_path"] != by_post[2]["source_path"]
+    assert by_post[2]["summary"] == "锅底太辣"
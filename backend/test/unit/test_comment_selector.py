@@ -0,0 +1,78 @@
+"""comment_selector.select：去重、token 预算与截断。"""
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from analysis import comment_selector
+
+
+def _comment(cid, content, like=0, reply=0, days_ago=0):
+    return SimpleNamespace(
+        id=cid,
+        platform_comment_id=f"c{cid}",
+        content=content,
+        like_count=like,
+        reply_count=reply,
+        author_name="作者",
+        published_at=datetime(2025, 9, 1) - timedelta(days=days_ago),
+    )
+
+
+def _rows(payload):
+    data = json.loads(payload)
+    assert data["fields"] == comment_selector.FIELDS
+    return [dict(zip(data["fields"], row)) for row in data["rows"]]
+
+
+def test_exact_and_near_duplicates_merged_into_top_ranked():
+    comments = [
+        _comment(1, "锅底太辣了吃不消", like=1),
+        _comment(2, "锅底太辣了，吃不消！[捂脸]", like=50),  # 规范化后与 1 相同
+        _comment(3, "锅底太辣了吃不消啊", like=2),            # 近似重复
+        _comment(4, "服务员态度很好", like=5),
+        _comment(5, "  [赞] ", like=100),                   # 只有表情，规范化后为空
+    ]
+    payload, stats = comment_selector.select(comments)
+    rows = _rows(payload)
+
+    assert [r["id"] for r in rows] == ["c2", "c4"]
+    assert rows[0]["dup"] == 3
+    assert rows[1]["dup"] == 1
+    assert (stats.exact_dups, stats.near_dups, stats.empty, stats.selected) == (1, 1, 1, 2)
+
+
+def test_rank_by_engagement_then_recency():
+    comments = [
+        _comment(1, "第一条评论内容", like=0, days_ago=0),
+        _comment(2, "第二条评论内容不同", like=10, days_ago=30),
+        _comment(3, "第三条也完全不一样", like=0, days_ago=5),
+    ]
+    payload, _ = comment_selector.select(comments)
+    assert [r["id"] for r in _rows(payload)] == ["c2", "c1", "c3"]
+
+
+def test_token_budget_and_max_comments():
+    words = "甲乙丙丁戊己庚辛壬癸子丑寅卯辰巳午未申酉"
+    comments = [_comment(i, words[i] * 30, like=100 - i) for i in range(20)]
+    payload, stats = comment_selector.select(comments, token_budget=120)
+    assert comment_selector.estimate_tokens(payload) <= 120
+    assert stats.selected == len(_rows(payload)) > 0
+    assert stats.over_budget == 20 - stats.selected
+
+    payload, stats = comment_selector.select(comments, max_comments=3)
+    assert [r["id"] for r in _rows(payload)] == ["c0", "c1", "c2"]
+    assert stats.over_budget == 0
+
+
+def test_long_comment_truncated():
+    long_text = "好" * (comment_selector.MAX_CHARS + 50)
+    payload, stats = comment_selector.select([_comment(1, long_text)])
+    text = _rows(payload)[0]["text"]
+    assert text == "好" * comment_selector.MAX_CHARS + "…"
+    assert stats.truncated == 1
+
+
+def test_no_usable_comments():
+    payload, stats = comment_selector.select([_comment(1, ""), _comment(2, "[捂脸]")])
+    assert payload is None
+    assert stats.empty == 2 and stats.selected == 0
@@ -0,0 +1,149 @@
+"""page_by_published_at：(published_at, id) 键集游标在升序/降序、NULL 发布时间与同一时间戳并列时不漏行、不重复。"""
+from datetime import datetime, timezone
+
+import pytest
+
+from tikhub_api.orm.pagination import page_by_published_at
+
+
+def _ts(day):
+    return datetime(2025, 9, day, tzinfo=timezone.utc)
+
+
+ROWS = [
+    {"id": 1, "published_at": _ts(1)},
+    {"id": 2, "published_at": _ts(2)},
+    {"id": 3, "published_at": _ts(2)},  # 与 id=2 同一时间戳
+    {"id": 4, "published_at": None},
+    {"id": 5, "published_at": _ts(2)},
+    {"id": 6, "published_at": None},
+    {"id": 7, "published_at": _ts(3)},
+    {"id": 8, "published_at": None},
+]
+
+
+def _split(expr):
+    """按顶层逗号拆分 PostgREST 逻辑表达式。"""
+    parts, depth, cur = [], 0, ""
+    for ch in expr:
+        if ch == "," and depth == 0:
+            parts.append(cur)
+            cur = ""
+            continue
+        depth += ch == "("
+        depth -= ch == ")"
+        cur += ch
+    return parts + [cur]
+
+
+def _value(col, raw):
+    raw = raw.strip('"')
+    return datetime.fromisoformat(raw) if col == "published_at" else int(raw)
+
+
+def _match(row, cond):
+    if cond.startswith("and(") and cond.endswith(")"):
+        return all(_match(row, c) for c in _split(cond[4:-1]))
+    col, rest = cond.split(".", 1)
+    if rest == "is.null":
+        return row[col] is None
+    if rest == "not.is.null":
+        return row[col] is not None
+    op, raw = rest.split(".", 1)
+    v = row[col]
+    if v is None:
+        return False  # SQL 比较遇 NULL 为假
+    target = _value(col, raw)
+    return {"lt": v < target, "gt": v > target, "eq": v == target}[op]
+
+
+class FakeQuery:
+    """只实现 page_by_published_at 用到的 PostgREST 构造器方法，按 Postgres 语义在内存中求值。"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.orders = []
+        self.filters = []
+        self.window = None
+
+    def order(self, col, desc=False):
+        self.orders.append((col, desc))
+        return self
+
+    def or_(self, expr):
+        self.filters.append(lambda r: any(_match(r, c) for c in _split(expr)))
+        return self
+
+    def is_(self, col, value):
+        assert value == "null"
+        self.filters.append(lambda r: r[col] is None)
+        return self
+
+    def gt(self, col, value):
+        self.filters.append(lambda r: r[col] is not None and r[col] > value)
+        return self
+
+    def lt(self, col, value):
+        self.filters.append(lambda r: r[col] is not None and r[col] < value)
+        return self
+
+    def limit(self, n):
+        self.window = (0, n)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end - start + 1)
+        return self
+
+    def execute(self):
+        rows = [r for r in self.rows if all(f(r) for f in self.filters)]
+        for col, desc in reversed(self.orders):
+            # Postgres 默认：升序 NULL 在最后，降序 NULL 在最前
+            present = sorted((r for r in rows if r[col] is not None), key=lambda r: r[col], reverse=desc)
+            nulls = [r for r in rows if r[col] is None]
+            rows = nulls + present if desc else present + nulls
+        start, n = self.window
+        return rows[start:start + n]
+
+
+def _expected(desc):
+    return [r["id"] for r in FakeQuery(ROWS).order("published_at", desc).order("id", desc).range(0, 99).execute()]
+
+
+@pytest.mark.parametrize("desc", [True, False])
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+def test_cursor_walks_all_rows_once(desc, page_size):
+    seen, cursor = [], {}
+    while True:
+        page = page_by_published_at(FakeQuery(ROWS), page_size, desc=desc, **cursor).execute()
+        seen.extend(r["id"] for r in page)
+        if len(page) < page_size:
+            break
+        last = page[-1]
+        cursor = {"after_id": last["id"], "after_published_at": last["published_at"]}
+    assert seen == _expected(desc)
+
+
+def test_expected_order_puts_nulls_per_postgres_default():
+    assert _expected(True) == [8, 6, 4, 7, 5, 3, 2, 1]
+    assert _expected(False) == [1, 2, 3, 5, 7, 4, 6, 8]
+
+
+def test_cursor_filters():
+    q = page_by_published_at(FakeQuery(ROWS), 2, after_id=3, after_published_at=_ts(2))
+    assert [r["id"] for r in q.execute()] == [2, 1]
+
+    q = page_by_published_at(FakeQuery(ROWS), 10, after_id=3, after_published_at=_ts(2), desc=False)
+    assert [r["id"] for r in q.execute()] == [5, 7, 4, 6, 8]
+
+    q = page_by_published_at(FakeQuery(ROWS), 10, after_id=6, after_published_at=None)
+    assert [r["id"] for r in q.execute()] == [4, 7, 5, 3, 2, 1]
+
+    q = page_by_published_at(FakeQuery(ROWS), 10, after_id=4, after_published_at=None, desc=False)
+    assert [r["id"] for r in q.execute()] == [6, 8]
+
+
+def test_offset_without_cursor():
+    page = page_by_published_at(FakeQuery(ROWS), 3, offset=3).execute()
+    assert [r["id"] for r in page] == [7, 5, 3]
+
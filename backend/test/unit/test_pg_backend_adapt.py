@@ -0,0 +1,24 @@
+"""pg_backend._adapt：COPY 写入时按目标列类型编码取值。"""
+import json
+
+from tikhub_api.orm import pg_backend
+from tikhub_api.orm.post_repository import PostRepository
+
+
+def test_video_url_round_trip_through_text_column():
+    urls = ["https://v1.douyinvod.com/a.mp4", "https://v2.douyinvod.com/b.mp4"]
+    stored = pg_backend._adapt(urls, pg_backend._KIND_SCALAR)
+    assert isinstance(stored, str)
+    assert PostRepository._row_fields({"video_url": stored})["video_url"] == urls
+
+
+def test_scalar_column_encodes_dict_and_tuple_as_json():
+    assert json.loads(pg_backend._adapt({"k": "值"}, pg_backend._KIND_SCALAR)) == {"k": "值"}
+    assert json.loads(pg_backend._adapt(("a", "b"), pg_backend._KIND_SCALAR)) == ["a", "b"]
+    assert pg_backend._adapt("text", pg_backend._KIND_SCALAR) == "text"
+    assert pg_backend._adapt(None, pg_backend._KIND_SCALAR) is None
+
+
+def test_array_column_keeps_list():
+    assert pg_backend._adapt(["a", "b"], pg_backend._KIND_ARRAY) == ["a", "b"]
+    assert pg_backend._adapt(("a", "b"), pg_backend._KIND_ARRAY) == ["a", "b"]
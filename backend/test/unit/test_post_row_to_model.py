@@ -0,0 +1,69 @@
+"""PostRepository._row_to_model（免校验快速路径）与 PlatformPost 完整校验路径的一致性。"""
+import json
+
+from tikhub_api.orm.enums import AnalysisStatus
+from tikhub_api.orm.post_repository import PostRepository
+
+
+def _row(**overrides):
+    row = {
+        "id": 42,
+        "project_id": "p1",
+        "platform": "douyin",
+        "platform_item_id": "7400000000000000001",
+        "title": "  海底捞 测试标题 ",
+        "content": "正文",
+        "post_type": "video",
+        "original_url": "https://www.douyin.com/video/7400000000000000001",
+        "author_id": "a1",
+        "author_name": "作者",
+        "share_count": 3,
+        "duration_ms": 15000,
+        "play_count": 1000,
+        "like_count": 20,
+        "comment_count": 5,
+        "cover_url": "https://p3.douyinpic.com/cover.jpeg",
+        "video_url": json.dumps(["https://v1.douyinvod.com/a.mp4", "https://v2.douyinvod.com/b.mp4"]),
+        "image_urls": None,
+        "analysis_status": "pending",
+        "relevant_status": "yes",
+        "author_fetch_status": "not_fetched",
+        "relevant_result": {"score": 0.9},
+        "is_marked": True,
+        "raw_details": {"aweme_id": "7400000000000000001"},
+        "published_at": "2025-09-01T08:00:00+00:00",
+        "created_at": "2025-09-01T09:00:00Z",
+        "updated_at": None,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_trusted_matches_validated():
+    row = _row()
+    fast = PostRepository._row_to_model(row)
+    full = PostRepository._row_to_model_validated(row)
+
+    assert fast.model_dump() == full.model_dump()
+    assert fast.model_dump(mode="json", exclude_none=True) == full.model_dump(mode="json", exclude_none=True)
+    assert fast.model_fields_set == full.model_fields_set
+    assert fast.__pydantic_extra__ == full.__pydantic_extra__
+    assert fast.__pydantic_private__ == full.__pydantic_private__
+
+
+def test_trusted_model_supports_copy_and_assignment():
+    fast = PostRepository._row_to_model(_row())
+    copied = fast.model_copy(update={"title": "新标题"})
+    assert copied.title == "新标题" and fast.title != "新标题"
+    fast.analysis_status = AnalysisStatus.ANALYZED
+    assert fast.analysis_status == AnalysisStatus.ANALYZED
+
+
+def test_missing_status_uses_default():
+    fast = PostRepository._row_to_model(_row(analysis_status=None))
+    assert fast.analysis_status == AnalysisStatus.INIT
+
+
+def test_unknown_status_is_kept():
+    fast = PostRepository._row_to_model(_row(analysis_status="some_new_status"))
+    assert fast.analysis_status == "some_new_status"
@@ -0,0 +1,88 @@
+"""StepGraph：依赖顺序、并发、异常传播与耗时记录。"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from analysis.step_graph import StepGraph
+from common.request_context import get_project_id, reset_project_id, set_project_id
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        yield ex
+
+
+def test_dependencies_see_upstream_results(executor):
+    order = []
+    lock = threading.Lock()
+
+    def step(name, value):
+        def fn(results):
+            with lock:
+                order.append(name)
+            return value(results)
+        return fn
+
+    graph = StepGraph(executor)
+    graph.add("details", step("details", lambda r: 1))
+    graph.add("comments", step("comments", lambda r: 10))
+    graph.add("media", step("media", lambda r: r["details"] + 1), deps=("details",))
+    graph.add("analyze", step("analyze", lambda r: r["media"] + r["comments"]), deps=("media", "comments"))
+    results, timings = graph.run()
+
+    assert results == {"details": 1, "comments": 10, "media": 2, "analyze": 12}
+    assert order.index("details") < order.index("media") < order.index("analyze")
+    assert order.index("comments") < order.index("analyze")
+    assert set(timings) == {"details", "comments", "media", "analyze", "total"}
+
+
+def test_independent_steps_run_concurrently(executor):
+    barrier = threading.Barrier(2, timeout=2)
+    graph = StepGraph(executor)
+    graph.add("a", lambda r: barrier.wait())
+    graph.add("b", lambda r: barrier.wait())
+    graph.run()  # 串行执行时 barrier 超时抛 BrokenBarrierError
+
+
+def test_unknown_dependency_rejected(executor):
+    with pytest.raises(ValueError):
+        StepGraph(executor).add("media", lambda r: None, deps=("details",))
+
+
+def test_error_stops_dependents_and_waits_for_running(executor):
+    finished = threading.Event()
+    dependent_ran = []
+
+    def slow(results):
+        time.sleep(0.1)
+        finished.set()
+
+    def boom(results):
+        raise RuntimeError("boom")
+
+    graph = StepGraph(executor)
+    graph.add("slow", slow)
+    graph.add("boom", boom)
+    graph.add("after_boom", lambda r: dependent_ran.append("after_boom"), deps=("boom",))
+    graph.add("after_slow", lambda r: dependent_ran.append("after_slow"), deps=("slow",))
+    with pytest.raises(RuntimeError, match="boom"):
+        graph.run()
+    assert finished.is_set()  # 抛出前已等待在运行的步骤结束
+    assert dependent_ran == []  # 失败后不再提交新步骤（即便其依赖已成功）
+
+
+def test_timings_and_context_propagation(executor):
+    token = set_project_id("p-42")
+    try:
+        graph = StepGraph(executor)
+        graph.add("sleep", lambda r: time.sleep(0.05) or get_project_id())
+        results, timings = graph.run()
+    finally:
+        reset_project_id(token)
+
+    assert results["sleep"] == "p-42"
+    assert timings["sleep"] >= 40
+    assert timings["total"] >= timings["sleep"]
@@ -0,0 +1,34 @@
+"""validate_url_groups：截止时未完成的校验结果未知，URL 保留；只有校验失败的才剔除。"""
+import threading
+
+from tikhub_api.utils import url_validator
+
+
+def test_unfinished_checks_are_kept_after_valid(monkeypatch):
+    release = threading.Event()
+
+    def check(url, timeout):
+        if "slow" in url:
+            release.wait(2)
+            return False
+        return "ok" in url
+
+    monkeypatch.setattr(url_validator, "_check_url", check)
+    try:
+        out = url_validator.validate_url_groups(
+            [["https://a/slow", "https://a/ok", "https://a/bad"], ["https://b/bad"]], deadline=0.3, need=2,
+        )
+    finally:
+        release.set()
+    assert out == [["https://a/ok", "https://a/slow"], []]
+
+
+def test_unfinished_expired_url_dropped(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(url_validator, "_check_url", lambda url, timeout: release.wait(2))
+    expired = "https://v.example/a.mp4?x-expires=1600000000"
+    try:
+        out = url_validator.validate_url_groups([[expired, "https://v.example/b.mp4"]], deadline=0.2)
+    finally:
+        release.set()
+    assert out == [["https://v.example/b.mp4"]]
@@ -1,18 +1,93 @@
 from __future__ import annotations
 from typing import Protocol, Optional, Dict, Any, runtime_checkable, List
 from datetime import datetime
+import time
+
+from pydantic import TypeAdapter, ValidationError
 
 from .orm.enums import Channel
 
 from .orm.models import PlatformPost, PlatformComment, Author
 from .orm import PostType
-from .utils.url_validator import filter_valid_video_urls
+from .utils.url_validator import ingest_video_urls, ingest_url_groups
 
 from common.request_context import get_project_id
 from jobs.logger import get_logger
 
 log = get_logger(__name__)
 
+# 批量校验：一次 pydantic-core 调用校验整批，失败时回落逐条校验以定位并跳过坏数据
+_POST_LIST_ADAPTER = TypeAdapter(List[PlatformPost])
+_COMMENT_LIST_ADAPTER = TypeAdapter(List[PlatformComment])
+
+
+def _validate_batch(list_adapter: TypeAdapter, model_cls, fields_list: List[Dict[str, Any]]) -> tuple[list, int]:
+    """批量构造模型，返回 (models, 校验失败条数)。"""
+    try:
+        return list_adapter.validate_python(fields_list), 0
+    except ValidationError:
+        out = []
+        failed = 0
+        for fields in fields_list:
+            try:
+                out.append(model_cls(**fields))
+            except Exception:
+                failed += 1
+        return out, failed
+
+
+def _batch_to_posts(adapter, raw_batch: List[Dict[str, Any]],
+                    valid_urls: Optional[List[List[str]]] = None) -> List[PlatformPost]:
+    """批量转换的公共实现：
+    - get_project_id() 每批只解析一次
+    - 整批候选直链一次提交校验（ingest_url_groups，lazy 模式仅离线过滤）
+    - 字段抽取单次遍历，模型整批校验，结束时输出一条汇总日志
+    """
+    start = time.monotonic()
+    name = type(adapter).__name__
+    raw_list = [r for r in (raw_batch or []) if isinstance(r, dict)]
+    project_id = get_project_id()
+
+    if valid_urls is None:
+        try:
+            valid_urls = ingest_url_groups([adapter.video_url_candidates(r) for r in raw_list])
+        except Exception as e:
+            log.error("[%s] 整批 URL 校验失败，回落逐条校验: %s", name, e)
+            valid_urls = [None] * len(raw_list)  # type: ignore[list-item]
+
+    fields_list: List[Dict[str, Any]] = []
+    failed = 0
+    for raw, urls in zip(raw_list, valid_urls):
+        try:
+            fields_list.append(adapter.post_fields(raw, valid_urls=urls, project_id=project_id))
+        except Exception as e:
+            failed += 1
+            log.warning("[%s] 抽取字段失败，跳过: %s", name, e)
+
+    posts, invalid = _validate_batch(_POST_LIST_ADAPTER, PlatformPost, fields_list)
+    failed += invalid
+    log.info(
+        "[%s] 批量转换完成：输入=%d，成功=%d，失败=%d，含有效直链=%d，耗时=%.3fs",
+        name, len(raw_list), len(posts), failed, sum(1 for p in posts if p.video_url), time.monotonic() - start,
+    )
+    return posts
+
+
+def _batch_to_comments(fields_fn, raw_list: List[Dict[str, Any]], post_id: int, name: str) -> List[PlatformComment]:
+    """评论批量转换的公共实现：单次遍历抽取字段 + 整批校验；大列表时输出一条汇总日志。"""
+    fields_list: List[Dict[str, Any]] = []
+    failed = 0
+    for raw in (raw_list or []):
+        try:
+            fields_list.append(fields_fn(raw, post_id))
+        except Exception:
+            failed += 1
+    comments, invalid = _validate_batch(_COMMENT_LIST_ADAPTER, PlatformComment, fields_list)
+    failed += invalid
+    if failed:
+        log.info("[%s] 评论批量转换：post_id=%s，成功=%d，跳过=%d", name, post_id, len(comments), failed)
+    return comments
+
 
 # ===== 评论适配器协议 =====
 
@@ -70,7 +145,7 @@ def to_posts_from_douyin_search(data: Dict[str, Any]) -> List[PlatformPost]:
     if not isinstance(items, list):
         return out
 
-    adapter = DouyinVideoAdapter()
+    details_list: List[Dict[str, Any]] = []
     for it in items:
         try:
             if not isinstance(it, dict):
@@ -80,21 +155,20 @@ def to_posts_from_douyin_search(data: Dict[str, Any]) -> List[PlatformPost]:
             aweme = it.get("aweme_info") or {}
             if not isinstance(aweme, dict):
                 continue
-            details_like = {"aweme_detail": aweme}
-            post = adapter.to_post(details_like)
-            # 保存原始以便弹幕/排查
-            post.raw_details = details_like
-            out.append(post)
+            # 原始报文随 raw_details 保存，以便弹幕/排查
+            details_list.append({"aweme_detail": aweme})
         except Exception:
             continue
-    return out
+    return DouyinVideoAdapter().to_posts(details_list)
 
 
 @runtime_checkable
 class VideoAdapter(Protocol):
     """将平台原始数据转换为统一领域模型 PlatformPost 的适配器协议。"""
 
-    def to_post(self, details: Dict[str, Any]) -> PlatformPost:  # type: ignore[name-defined]
+    def to_post(self, details: Dict[str, Any], valid_urls: Optional[List[str]] = None) -> PlatformPost:  # type: ignore[name-defined]
+        ...
+    def to_posts(self, raw_batch: List[Dict[str, Any]]) -> List[PlatformPost]:  # type: ignore[name-defined]
         ...
     def hi() -> str:
         ...
@@ -102,8 +176,29 @@ class VideoAdapter(Protocol):
 class DouyinVideoAdapter:
     """抖音视频数据 -> PlatformPost 适配器"""
 
-    def to_post(self, details: Dict[str, Any]) -> PlatformPost:
+    @staticmethod
+    def video_url_candidates(details: Dict[str, Any]) -> List[str]:
+        """提取待校验的视频直链候选（download_addr.url_list），供整页并发校验使用。"""
+        aweme_detail = (details or {}).get('aweme_detail', {}) or {}
+        video = aweme_detail.get('video', {}) or {}
+        download_addr = video.get('download_addr') or {}
+        url_list = download_addr.get('url_list') or []
+        return [u for u in url_list if isinstance(u, str) and u]
+
+    def to_post(self, details: Dict[str, Any], valid_urls: Optional[List[str]] = None) -> PlatformPost:
+        """
+        valid_urls: 调用方已完成校验的直链（如整页并发校验的结果）；为 None 时在此处自行校验。
+        """
+        return PlatformPost(**self.post_fields(details, valid_urls=valid_urls))
+
+    def to_posts(self, raw_batch: List[Dict[str, Any]],
+                 valid_urls: Optional[List[List[str]]] = None) -> List[PlatformPost]:
+        """批量转换（搜索入库的内层循环）：共享 project_id、整批校验直链、一条汇总日志；转换失败的条目跳过。"""
+        return _batch_to_posts(self, raw_batch, valid_urls=valid_urls)
 
+    def post_fields(self, details: Dict[str, Any], valid_urls: Optional[List[str]] = None,
+                    project_id: Optional[str] = None) -> Dict[str, Any]:
+        """抽取 PlatformPost 字段（未校验）。project_id 为 None 时从请求上下文读取。"""
         aweme_detail = details.get('aweme_detail', {}) or {}
 
         # 调试日志：检查 details 和 aweme_detail 的内容
@@ -138,11 +233,10 @@ class DouyinVideoAdapter:
                 cover_url = urls[0]
                 break
 
-        # 取下载直链，并校验可用性（某些链接可能无法实际下载）
-        # 现在存储所有有效的 URL，而不是只取第一个
-        download_addr = video.get('download_addr') or {}
-        url_list = download_addr.get('url_list') or []
-        valid_urls = filter_valid_video_urls(url_list)
+        # 取下载直链，并校验可用性（某些链接可能无法实际下载；lazy 模式下推迟到下载前校验）
+        # 存储有效的 URL（eager 模式每帖最多 URL_VALIDATE_NEED_PER_POST 个），而不是只取第一个
+        if valid_urls is None:
+            valid_urls = ingest_video_urls(self.video_url_candidates(details))
         video_url = valid_urls if valid_urls else None
 
         # 发布时间（抖音可能返回 create_time: epoch 秒）
@@ -163,8 +257,8 @@ class DouyinVideoAdapter:
         share_count = int((aweme_detail.get('statistics') or {}).get('share_count') or statistics.get('share_count') or 0)
         duration_ms = int(aweme_detail.get('duration') or 0)
 
-        return PlatformPost(
-            project_id=get_project_id(),
+        return dict(
+            project_id=project_id if project_id is not None else get_project_id(),
             platform="douyin",
             platform_item_id=platform_item_id,
             title=str(aweme_detail.get('desc', '') or '').strip() or '无标题',
@@ -194,7 +288,58 @@ class DouyinVideoAdapter:
 class XiaohongshuVideoAdapter:
     """小红书视频数据 -> PlatformPost 适配器（兼容 web_v2/fetch_feed_notes_v2 与 app/search_notes）"""
 
-    def to_post(self, details: Dict[str, Any]) -> PlatformPost:
+    @staticmethod
+    def video_url_candidates(details: Dict[str, Any]) -> List[str]:
+        """提取待校验的视频直链候选，供整页并发校验使用。
+        顺序：app/search_notes 的 video_info_v2（master_url 与 backup_urls，含多码率）在前，
+        web_v2 结构的 video.url_info_list / video.url 在后作为回落。
+        """
+        raw = details or {}
+        candidates: List[str] = []
+
+        video_info_v2 = raw.get("video_info_v2") or {}
+        if isinstance(video_info_v2, dict) and video_info_v2.get("media"):
+            media = video_info_v2.get("media") or {}
+            stream = media.get("stream") or {}
+            for key in ("h264", "h265", "av1", "h266"):
+                arr = stream.get(key) or []
+                if isinstance(arr, list):
+                    for it in arr:
+                        if not isinstance(it, dict):
+                            continue
+                        url = it.get("master_url") or it.get("main_url") or it.get("url")
+                        if isinstance(url, str) and url:
+                            candidates.append(url)
+                        backs = it.get("backup_urls") or []
+                        if isinstance(backs, list):
+                            for b in backs:
+                                if isinstance(b, str) and b:
+                                    candidates.append(b)
+
+        video = raw.get("video") or {}
+        url_info_list = video.get("url_info_list") or []
+        if isinstance(url_info_list, list) and url_info_list:
+            for it in url_info_list:
+                if isinstance(it, dict) and isinstance(it.get("url"), str) and it.get("url"):
+                    candidates.append(it.get("url"))
+        if isinstance(video.get("url"), str) and video.get("url"):
+            candidates.append(video.get("url"))
+        return candidates
+
+    def to_post(self, details: Dict[str, Any], valid_urls: Optional[List[str]] = None) -> PlatformPost:
+        """
+        valid_urls: 调用方已完成校验的直链（如整页并发校验的结果）；为 None 时在此处自行校验。
+        """
+        return PlatformPost(**self.post_fields(details, valid_urls=valid_urls))
+
+    def to_posts(self, raw_batch: List[Dict[str, Any]],
+                 valid_urls: Optional[List[List[str]]] = None) -> List[PlatformPost]:
+        """批量转换（搜索入库的内层循环）：共享 project_id、整批校验直链、一条汇总日志；转换失败的条目跳过。"""
+        return _batch_to_posts(self, raw_batch, valid_urls=valid_urls)
+
+    def post_fields(self, details: Dict[str, Any], valid_urls: Optional[List[str]] = None,
+                    project_id: Optional[str] = None) -> Dict[str, Any]:
+        """抽取 PlatformPost 字段（未校验）。project_id 为 None 时从请求上下文读取。"""
         # details 既可能是 web_v2 的 note_list[0]，也可能是 app/search_notes 的 note 对象
         raw = details or {}
 
@@ -232,7 +377,7 @@ class XiaohongshuVideoAdapter:
         video_url = None
         cover_url = None
 
-        # 优先从 app/search_notes 的 video_info_v2 中取（含多码率）
+        # 时长：app/search_notes 的 video_info_v2.media.video.duration（秒）
         if isinstance(video_info_v2, dict) and video_info_v2.get("media"):
             media = video_info_v2.get("media") or {}
             inner_video = media.get("video") or {}
@@ -240,40 +385,10 @@ class XiaohongshuVideoAdapter:
             if isinstance(duration_val, (int, float)):
                 duration_ms = int(duration_val * 1000)
 
-            # 组装候选直链（master_url 与 backup_urls）
-            candidates: List[str] = []
-            stream = media.get("stream") or {}
-            for key in ("h264", "h265", "av1", "h266"):
-                arr = stream.get(key) or []
-                if isinstance(arr, list):
-                    for it in arr:
-                        if not isinstance(it, dict):
-                            continue
-                        url = it.get("master_url") or it.get("main_url") or it.get("url")
-                        if isinstance(url, str) and url:
-                            candidates.append(url)
-                        backs = it.get("backup_urls") or []
-                        if isinstance(backs, list):
-                            for b in backs:
-                                if isinstance(b, str) and b:
-                                    candidates.append(b)
-            valid_urls = filter_valid_video_urls(candidates)
-            # 存储所有有效的 URL
-            video_url = valid_urls if valid_urls else None
-
-        # 回落到 web_v2 结构：video.url_info_list / video.url
-        if not video_url:
-            candidates: List[str] = []
-            url_info_list = video.get("url_info_list") or []
-            if isinstance(url_info_list, list) and url_info_list:
-                for it in url_info_list:
-                    if isinstance(it, dict) and isinstance(it.get("url"), str) and it.get("url"):
-                        candidates.append(it.get("url"))
-            if isinstance(video.get("url"), str) and video.get("url"):
-                candidates.append(video.get("url"))
-            valid_urls = filter_valid_video_urls(candidates)
-            # 存储所有有效的 URL
-            video_url = valid_urls if valid_urls else None
+        # 直链：video_info_v2 多码率优先，web_v2 的 video.url_info_list / video.url 回落；存储所有有效的 URL
+        if valid_urls is None:
+            valid_urls = ingest_video_urls(self.video_url_candidates(raw))
+        video_url = valid_urls if valid_urls else None
 
         # 提取图片列表（图文笔记）
         image_urls = None
@@ -330,8 +445,8 @@ class XiaohongshuVideoAdapter:
             if not video_url:
                 video_url = None
 
-        return PlatformPost(
-            project_id=get_project_id(),
+        return dict(
+            project_id=project_id if project_id is not None else get_project_id(),
             platform="xiaohongshu",
             platform_item_id=note_id,
             title=title,
@@ -431,7 +546,7 @@ class XiaohongshuVideoAdapter:
                 if isinstance(u, str) and u:
                     candidates.append(u)
 
-            valid_urls = filter_valid_video_urls(candidates)
+            valid_urls = ingest_video_urls(candidates)
             # 存储所有有效的 URL
             video_url = valid_urls if valid_urls else None
 
@@ -517,6 +632,11 @@ class DouyinCommentAdapter:
 
     @staticmethod
     def to_comment(raw: Dict[str, Any], post_id: int) -> PlatformComment:
+        return PlatformComment(**DouyinCommentAdapter.comment_fields(raw, post_id))
+
+    @staticmethod
+    def comment_fields(raw: Dict[str, Any], post_id: int) -> Dict[str, Any]:
+        """抽取 PlatformComment 字段（未校验）。"""
         user = (raw.get('user') or {})
         avatar = (user.get('avatar_thumb') or {})
         url_list = avatar.get('url_list') or []
@@ -530,7 +650,7 @@ class DouyinCommentAdapter:
             except Exception:
                 published_at = None
 
-        return PlatformComment(
+        return dict(
             post_id=post_id,
             platform="douyin",
             platform_comment_id=str(raw.get('cid', '')),
@@ -547,13 +667,7 @@ class DouyinCommentAdapter:
 
     @staticmethod
     def to_comment_list(raw_list: List[Dict[str, Any]], post_id: int) -> List[PlatformComment]:
-        out: List[PlatformComment] = []
-        for raw in (raw_list or []):
-            try:
-                out.append(DouyinCommentAdapter.to_comment(raw, post_id))
-            except Exception:
-                continue
-        return out
+        return _batch_to_comments(DouyinCommentAdapter.comment_fields, raw_list, post_id, "DouyinCommentAdapter")
 
     @staticmethod
     def to_reply_list(raw_list: List[Dict[str, Any]], post_id: int, top_cid: str,
@@ -883,6 +997,11 @@ class XiaohongshuCommentAdapter:
             "status": 0
         }
         """
+        return PlatformComment(**XiaohongshuCommentAdapter.comment_fields(raw, post_id))
+
+    @staticmethod
+    def comment_fields(raw: Dict[str, Any], post_id: int) -> Dict[str, Any]:
+        """抽取 PlatformComment 字段（未校验），结构见 to_comment。"""
         user = raw.get('user') or {}
 
         # 小红书时间戳是秒级
@@ -894,7 +1013,7 @@ class XiaohongshuCommentAdapter:
             except Exception:
                 published_at = None
 
-        return PlatformComment(
+        return dict(
             post_id=post_id,
             platform="xiaohongshu",
             platform_comment_id=str(raw.get('id', '')),
@@ -911,13 +1030,7 @@ class XiaohongshuCommentAdapter:
 
     @staticmethod
     def to_comment_list(raw_list: List[Dict[str, Any]], post_id: int) -> List[PlatformComment]:
-        out: List[PlatformComment] = []
-        for raw in (raw_list or []):
-            try:
-                out.append(XiaohongshuCommentAdapter.to_comment(raw, post_id))
-            except Exception:
-                continue
-        return out
+        return _batch_to_comments(XiaohongshuCommentAdapter.comment_fields, raw_list, post_id, "XiaohongshuCommentAdapter")
 
     @staticmethod
     def to_reply_list(raw_list: List[Dict[str, Any]], post_id: int, top_comment_id: str,
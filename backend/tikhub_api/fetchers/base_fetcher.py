@@ -4,23 +4,50 @@
 """
 
 from abc import ABC, abstractmethod
+import copy
 import json
 from typing import Dict, Any, Optional, List, Iterable
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from jobs.logger import get_logger
 
 # 仓储用于落库统一领域模型
 from ..orm.post_repository import PostRepository
+from ..utils.rate_limiter import RateLimiter
+from ..utils.ttl_cache import TTLCache, make_key
 
 # 加载环境变量
 load_dotenv()
 
 log = get_logger(__name__)
 
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+# HTTP 连接池与限流配置（fetcher 为进程内长生命周期单例，以下资源随实例共享）
+HTTP_POOL_SIZE = int(_env_float("TIKHUB_HTTP_POOL_SIZE", 16))
+HTTP_TIMEOUT_SEC = _env_float("TIKHUB_HTTP_TIMEOUT_SEC", 60)
+RATE_LIMIT_QPS = _env_float("TIKHUB_RATE_LIMIT_QPS", 0)  # <=0 表示不限流
+RATE_LIMIT_BURST = int(_env_float("TIKHUB_RATE_LIMIT_BURST", 5))
+DETAIL_CACHE_TTL_SEC = _env_float("TIKHUB_DETAIL_CACHE_TTL_SEC", 60)
+DETAIL_CACHE_MAX_SIZE = int(_env_float("TIKHUB_DETAIL_CACHE_MAX_SIZE", 512))
+
+
 class BaseFetcher(ABC):
-    """视频获取器基础抽象类"""
+    """视频获取器基础抽象类
+
+    实例由 FetcherFactory 按平台缓存为单例，在多个线程（lane 线程池、API、调度器）间共享：
+    - session: 带连接池的 requests.Session，复用 TCP/TLS 连接
+    - rate_limiter: 同一平台所有请求共享的令牌桶
+    - cache: 详情类 GET 请求的短 TTL 缓存（同一任务内多次读取详情只打一次接口）
+    """
 
     def __init__(self):
         """初始化基础配置"""
@@ -33,6 +60,26 @@ class BaseFetcher(ABC):
             'accept': 'application/json',
             'Authorization': f'Bearer {self.api_key}'
         }
+        self.timeout = HTTP_TIMEOUT_SEC
+        self.session = self._build_session()
+        self.rate_limiter = RateLimiter(RATE_LIMIT_QPS, burst=RATE_LIMIT_BURST)
+        self.cache: TTLCache[Dict[str, Any]] = TTLCache(default_ttl=DETAIL_CACHE_TTL_SEC, max_size=DETAIL_CACHE_MAX_SIZE)
+
+    def _build_session(self) -> requests.Session:
+        """构建带连接池的共享 Session（线程间共享，仅使用无状态的请求方法）。"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def close(self) -> None:
+        """释放连接池（一般无需调用，进程退出时自动回收）。"""
+        try:
+            self.session.close()
+        except Exception:
+            pass
 
     @property
     @abstractmethod
@@ -121,36 +168,43 @@ class BaseFetcher(ABC):
         """
         统一入口（流式）：按批查询→转换→批量落库，逐批 yield 已落库的 PlatformPost 列表。
         - 子类可重写 iter_fetch_search_pages(keyword) 以真正分页产生原始详情批次
-        - 这里统一调用 adapter.to_post 转为 PlatformPost
+        - 每页调用 adapter.to_posts 批量转换（整页并发校验直链、共享 project_id、一条汇总日志）
         - 批量 upsert 到仓库（PostRepository.upsert_posts）
         """
         adapter = self.get_adapter()
         buffer = []
         for raw_batch in self.iter_fetch_search_pages(keyword):
-            for raw in (raw_batch or []):
-                try:
-                    post = adapter.to_post(raw)
-                    log.info(f"[{self.platform_name}] 正在转换条目:%s",post.platform_item_id)
-                    # 尽力附带原始详情，便于后续弹幕/排查
-                    try:
-                        setattr(post, "raw_details", raw)
-                    except Exception:
-                        log.error(f"[{self.platform_name}] 附加 raw_details 失败: {post.platform_item_id}")
-                        pass
-                    buffer.append(post)
-                    if len(buffer) >= batch_size:
-                        saved = PostRepository.upsert_posts(buffer)
-                        log.info(f"[{self.platform_name}] 批量落库成功: {len(saved)} 条")
-                        yield saved
-                        buffer = []
-                except Exception as e:
-                    log.error(f"[{self.platform_name}] 转换条目失败，跳过: {e}", exc_info=True)
-                    continue
+            buffer.extend(self._convert_page(adapter, list(raw_batch or [])))
+            while len(buffer) >= batch_size:
+                saved = PostRepository.upsert_posts(buffer[:batch_size])
+                log.info(f"[{self.platform_name}] 批量落库成功: {len(saved)} 条")
+                yield saved
+                buffer = buffer[batch_size:]
         if buffer:
             saved = PostRepository.upsert_posts(buffer)
             log.info(f"[{self.platform_name}] 最后一批落库成功: {len(saved)} 条")
             yield saved
 
+    def _convert_page(self, adapter, raw_list: List[Dict[str, Any]]) -> List[Any]:
+        """
+        将一页原始详情转换为 PlatformPost 列表（raw_details 已由适配器附带）。
+        - 优先使用适配器的批量接口 to_posts
+        - 适配器未提供 to_posts 时回落逐条 to_post，转换失败的条目跳过
+        """
+        to_posts = getattr(adapter, "to_posts", None)
+        if callable(to_posts):
+            try:
+                return to_posts(raw_list)
+            except Exception as e:
+                log.error(f"[{self.platform_name}] 批量转换失败，回落逐条转换: {e}", exc_info=True)
+        posts = []
+        for raw in raw_list:
+            try:
+                posts.append(adapter.to_post(raw))
+            except Exception as e:
+                log.error(f"[{self.platform_name}] 转换条目失败，跳过: {e}", exc_info=True)
+        return posts
+
     def get_search_posts(self, keyword: str):
         """
         兼容入口：消费迭代批次并合并为列表返回。
@@ -256,7 +310,7 @@ class BaseFetcher(ABC):
             if not isinstance(post_id, int) or post_id <= 0:
                 raise ValueError("post_id 必须为正整数")
 
-            post = PostRepository.get_by_id(post_id)
+            post = PostRepository.get_ref(post_id)
             if not post:
                 return None
 
@@ -278,7 +332,7 @@ class BaseFetcher(ABC):
         try:
             if not isinstance(post_id, int) or post_id <= 0:
                 return []
-            post = PostRepository.get_by_id(post_id)
+            post = PostRepository.get_ref(post_id)
             if not post:
                 return []
             platform_item_id = getattr(post, "platform_item_id", None)
@@ -319,11 +373,12 @@ class BaseFetcher(ABC):
         try:
             log.info(f"正在请求 {self.platform_name} API: {url}, params={json.dumps(params, ensure_ascii=False, indent=2)})")
 
+            self.rate_limiter.acquire()
             method_upper = method.upper()
             if method_upper == "POST":
-                response = requests.post(url, headers=self.headers, json=params)
+                response = self.session.post(url, json=params, timeout=self.timeout)
             else:
-                response = requests.get(url, headers=self.headers, params=params)
+                response = self.session.get(url, params=params, timeout=self.timeout)
 
             # 尝试解析 JSON 响应
             try:
@@ -345,6 +400,22 @@ class BaseFetcher(ABC):
         except requests.RequestException as e:
             raise requests.RequestException(f"请求 {self.platform_name} API 失败: {str(e)}")
 
+    def _cached_request(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        带短 TTL 缓存的 GET 请求，适用于详情类接口（同一帖子在一次任务内会被多次读取详情）。
+        仅缓存业务成功（code=200）的响应，失败响应不缓存以便重试。
+        缓存中保存独立副本、命中时返回深拷贝：调用方（适配器、详情补全等）修改返回值不会污染缓存。
+        """
+        key = make_key(url, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            log.debug(f"命中 {self.platform_name} 详情缓存: {url}")
+            return copy.deepcopy(cached)
+        result = self._make_request(url, params)
+        if isinstance(result, dict) and self._check_api_response(result):
+            self.cache.set(key, copy.deepcopy(result))
+        return result
+
     def _validate_video_id(self, video_id: str) -> None:
         """
         验证视频 ID 的通用方法
@@ -382,6 +453,9 @@ class BaseFetcher(ABC):
         """
         记录搜索请求到数据库（gg_search_response_logs 表）
 
+        只在当前线程读取上下文并非阻塞入队，由后台线程批量写入（见 orm.search_log_writer），
+        不阻塞抓取循环；response_data 默认裁剪为摘要。
+
         Args:
             keyword: 搜索关键词
             page_number: 页码
@@ -391,7 +465,7 @@ class BaseFetcher(ABC):
         """
         try:
             from common.request_context import get_project_id, get_batch_id
-            from ..orm import SearchResponseLogRepository
+            from ..orm.search_log_writer import enqueue_search_log
 
             project_id = get_project_id()
             if not project_id:
@@ -399,20 +473,17 @@ class BaseFetcher(ABC):
                 return
 
             batch_id = get_batch_id()
-            status = "success" if response_data and not error_message else "error"
-
-            SearchResponseLogRepository.create({
-                "project_id": project_id,
-                "keyword": keyword,
-                "platform": self.platform_name.lower(),
-                "page_number": page_number,
-                "batch_id": batch_id,
-                "request_params": request_params,
-                "response_data": response_data,
-                "response_status": status,
-                "error_message": error_message
-            })
-            log.debug(f"[{self.platform_name}] 已记录搜索日志: keyword={keyword}, page={page_number}, batch_id={batch_id}, status={status}")
+            enqueue_search_log(
+                project_id=project_id,
+                keyword=keyword,
+                platform=self.platform_name.lower(),
+                page_number=page_number,
+                batch_id=batch_id,
+                request_params=request_params,
+                response_data=response_data,
+                error_message=error_message,
+            )
+            log.debug(f"[{self.platform_name}] 搜索日志已入队: keyword={keyword}, page={page_number}, batch_id={batch_id}")
         except Exception as e:
             log.error(f"[{self.platform_name}] 记录搜索日志失败: {e}", exc_info=True)
 
@@ -66,7 +66,7 @@ class DouyinVideoFetcher(BaseFetcher, VideoPostProvider, VideoDurationProvider,
         url = f"{self.base_url}{self.api_endpoint}"
         params = {'aweme_id': aweme_id}
 
-        return self._make_request(url, params)
+        return self._cached_request(url, params)
 
     def get_video_details(self, aweme_id: str) -> Optional[Dict[str, Any]]:
         """
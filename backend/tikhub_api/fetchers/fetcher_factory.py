@@ -1,10 +1,14 @@
 """
 视频获取器工厂类
 使用工厂模式创建不同平台的视频获取器
+
+获取器实例按平台缓存为进程内单例：构造时读取环境变量、组装请求头、创建连接池，
+这些开销只在首次使用时发生；之后各 lane 线程、API 与调度器共享同一实例。
 """
 
 from typing import Dict, Type, Optional
 from enum import Enum
+import threading
 from .base_fetcher import BaseFetcher
 from .douyin_video_fetcher import DouyinVideoFetcher
 from .xiaohongshu_fetcher import XiaohongshuFetcher
@@ -40,13 +44,19 @@ class FetcherFactory:
         Platform.XIAOHONGSHU: XiaohongshuFetcher,
     }
 
+    # 平台 -> 获取器单例（线程安全的懒加载）
+    _instances: Dict[Platform, BaseFetcher] = {}
+    _instances_lock = threading.Lock()
+
     @classmethod
-    def create_fetcher(cls, platform: str) -> BaseFetcher:
+    def create_fetcher(cls, platform: str, shared: bool = True) -> BaseFetcher:
         """
-        创建指定平台的视频获取器
+        获取指定平台的视频获取器
 
         Args:
             platform (str): 平台名称 (douyin, xiaohongshu)
+            shared (bool): 默认返回该平台的进程内单例（共享连接池/限流器/缓存）；
+                           传 False 时创建一个独立的新实例
 
         Returns:
             BaseFetcher: 对应平台的视频获取器实例
@@ -56,19 +66,43 @@ class FetcherFactory:
             Exception: 创建获取器失败
         """
         try:
-            platform_enum = Platform.from_string(platform)
+            platform_enum = Platform.from_string(getattr(platform, "value", str(platform)))
             fetcher_class = cls._fetcher_registry.get(platform_enum)
 
             if fetcher_class is None:
                 raise ValueError(f"平台 {platform} 的获取器未注册")
 
-            return fetcher_class()
+            if not shared:
+                return fetcher_class()
+
+            instance = cls._instances.get(platform_enum)
+            if instance is not None:
+                return instance
+            with cls._instances_lock:
+                # 双重检查：避免多个线程同时首次创建
+                instance = cls._instances.get(platform_enum)
+                if instance is None:
+                    instance = fetcher_class()
+                    cls._instances[platform_enum] = instance
+                return instance
 
         except ValueError as e:
             raise e
         except Exception as e:
             raise Exception(f"创建 {platform} 平台获取器失败: {str(e)}")
 
+    @classmethod
+    def reset_instances(cls) -> None:
+        """清空已缓存的获取器单例（如轮换 API Key 后需重建），并释放其连接池。"""
+        with cls._instances_lock:
+            instances = list(cls._instances.values())
+            cls._instances.clear()
+        for inst in instances:
+            try:
+                inst.close()
+            except Exception:
+                pass
+
     @classmethod
     def register_fetcher(cls, platform: Platform, fetcher_class: Type[BaseFetcher]) -> None:
         """
@@ -85,6 +119,9 @@ class FetcherFactory:
             raise TypeError(f"获取器类必须继承自 BaseFetcher")
 
         cls._fetcher_registry[platform] = fetcher_class
+        # 注册新实现后丢弃旧单例，下次获取时按新类重建
+        with cls._instances_lock:
+            cls._instances.pop(platform, None)
         print(f"已注册 {platform.value} 平台获取器: {fetcher_class.__name__}")
 
     @classmethod
@@ -131,7 +168,7 @@ class FetcherFactory:
 # 便捷函数
 def create_fetcher(platform: str) -> BaseFetcher:
     """
-    便捷函数：创建视频获取器
+    便捷函数：获取视频获取器（平台单例）
 
     Args:
         platform (str): 平台名称
@@ -67,7 +67,7 @@ class XiaohongshuFetcher(BaseFetcher, CommentsProvider):
 
         url = f"{self.base_url}{self.api_endpoint}"
         params = {"note_id": note_id}
-        return self._make_request(url, params)
+        return self._cached_request(url, params)
 
     def get_video_details(self, note_id: str) -> Optional[Dict[str, Any]]:
         """
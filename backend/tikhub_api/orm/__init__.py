@@ -1,4 +1,4 @@
-from .models import PlatformPost, PlatformComment, MerchantBrand, SearchKeyword, VideoAnalysis, PromptTemplate, PromptVariable, ProjectSettings, Author, SearchResponseLog
+from .models import PlatformPost, PostRef, PlatformComment, MerchantBrand, SearchKeyword, VideoAnalysis, PromptTemplate, PromptVariable, ProjectSettings, Author, SearchResponseLog
 from .post_repository import PostRepository
 from .comment_repository import CommentRepository
 from .merchant_brand_repository import MerchantBrandRepository
@@ -9,10 +9,12 @@ from .prompt_variable_repository import PromptVariableRepository
 from .project_settings_repository import ProjectSettingsRepository
 from .author_repository import AuthorRepository
 from .search_response_log_repository import SearchResponseLogRepository
+from .pagination import iter_pages
 from .enums import AnalysisStatus, RelevantStatus, PromptName, PostType, Channel, AuthorFetchStatus
 
 __all__ = [
     "PlatformPost",
+    "PostRef",
     "PlatformComment",
     "MerchantBrand",
     "SearchKeyword",
@@ -38,5 +40,6 @@ __all__ = [
     "PostType",
     "Channel",
     "AuthorFetchStatus",
+    "iter_pages",
 ]
 
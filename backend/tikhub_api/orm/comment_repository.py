@@ -3,10 +3,52 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 
 from .supabase_client import get_client
+from .pagination import page_by_published_at
+from . import pg_backend
 from .models import PlatformComment
+from jobs.logger import get_logger
+
+log = get_logger(__name__)
 
 TABLE = "gg_platform_post_comments"
 
+# 批量 upsert 每个请求的最大行数
+UPSERT_CHUNK_SIZE = 500
+
+# 父子关联集合式修正（Supabase SQL Editor 执行一次；未安装时 resolve_parent_links 回落到分组批量 update）：
+#
+#   create or replace function gg_resolve_comment_parent_links(p_post_id bigint)
+#   returns integer language sql as $$
+#     with updated as (
+#       update gg_platform_post_comments c
+#          set parent_comment_id = p.id
+#         from gg_platform_post_comments p
+#        where c.post_id = p_post_id
+#          and c.parent_platform_comment_id is not null
+#          and p.platform = c.platform
+#          and p.platform_comment_id = c.parent_platform_comment_id
+#          and c.parent_comment_id is distinct from p.id
+#       returning 1
+#     )
+#     select count(*)::int from updated;
+#   $$;
+RESOLVE_PARENT_LINKS_RPC = "gg_resolve_comment_parent_links"
+
+# 数据库函数未安装时置位，之后直接走回落路径，不再每次先发一次失败的 RPC
+_rpc_missing = False
+
+
+def _function_missing(err: Exception) -> bool:
+    """错误是否因数据库函数不存在（PostgREST PGRST202 / Postgres 42883）；是则记录一次并置位 _rpc_missing。"""
+    global _rpc_missing
+    msg = str(err)
+    if "PGRST202" not in msg and "42883" not in msg and "Could not find the function" not in msg:
+        return False
+    if not _rpc_missing:
+        _rpc_missing = True
+        log.warning(f"{RESOLVE_PARENT_LINKS_RPC} 未安装，父子关联修正回落为分组批量 update（DDL 见 comment_repository）")
+    return True
+
 
 class CommentRepository:
     """CRUD(light) for gg_platform_post_comments: add and query only."""
@@ -51,6 +93,51 @@ class CommentRepository:
         data = resp.data[0] if resp.data else None
         return CommentRepository._row_to_model(data) if data else model
 
+    @staticmethod
+    def upsert_comments(comments: List[PlatformComment], chunk_size: int = UPSERT_CHUNK_SIZE) -> Dict[str, int]:
+        """批量 Upsert 评论，按 (platform, platform_comment_id) 作为唯一键。
+        - 同一批内按唯一键去重（保留首次出现），避免 PG 21000 错误
+        - 按字段集合分组后分块提交：PostgREST 批量写入会把缺失字段置为 NULL，
+          分组保证与逐条 upsert（exclude_none）一致，不会覆盖已有的父子关联等字段
+        返回 {platform_comment_id: id} 映射（尽力而为，后端未返回的行不在其中）。
+        """
+        seen: set[tuple[str | None, str | None]] = set()
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for c in comments or []:
+            model = c if isinstance(c, PlatformComment) else PlatformComment(**c)  # type: ignore[arg-type]
+            row: Dict[str, Any] = model.model_dump(mode="json", exclude_none=True)
+            if row.get("id") is None:
+                row.pop("id", None)
+            key = (row.get("platform"), row.get("platform_comment_id"))
+            if key in seen:
+                continue
+            seen.add(key)
+            groups.setdefault(frozenset(row.keys()), []).append(row)
+
+        id_map: Dict[str, int] = {}
+        if not groups:
+            return id_map
+        if pg_backend.backend_for("comments") == pg_backend.BACKEND_POSTGRES:
+            # 原生后端：单事务内 COPY 装载 + ON CONFLICT 合并，不受 PostgREST 单请求行数限制
+            with pg_backend.transaction() as conn:
+                rows = pg_backend.copy_upsert(
+                    conn, TABLE, (r for rs in groups.values() for r in rs),
+                    conflict=("platform", "platform_comment_id"), returning=("id", "platform_comment_id"),
+                )
+            return {str(r["platform_comment_id"]): int(r["id"]) for r in rows if r.get("id")}
+        client = get_client()
+        size = max(1, int(chunk_size))
+        for rows in groups.values():
+            for i in range(0, len(rows), size):
+                query = client.table(TABLE).upsert(rows[i:i + size], on_conflict="platform,platform_comment_id")
+                # 较新的 supabase-py 支持在 upsert 后链式 select，只取回建立映射所需的列
+                select = getattr(query, "select", None)
+                resp = (select("id,platform_comment_id") if callable(select) else query).execute()
+                for r in (resp.data or []):
+                    if r.get("platform_comment_id") and r.get("id"):
+                        id_map[str(r["platform_comment_id"])] = int(r["id"])
+        return id_map
+
     @staticmethod
     def get_by_platform_comment(platform: str, platform_comment_id: str) -> Optional[PlatformComment]:
         client = get_client()
@@ -66,29 +153,43 @@ class CommentRepository:
         return CommentRepository._row_to_model(row) if row else None
 
     @staticmethod
-    def list_by_post(post_id: int, limit: int = 100, offset: int = 0) -> List[PlatformComment]:
+    def list_by_post(post_id: int, limit: int = 100, offset: int = 0,
+                     after_id: Optional[int] = None, after_published_at: Optional[Any] = None) -> List[PlatformComment]:
+        client = get_client()
+        query = (
+            client.table(TABLE)
+            .select("*")
+            .eq("post_id", post_id)
+        )
+        resp = page_by_published_at(query, limit, offset, after_id, after_published_at).execute()
+        return [CommentRepository._row_to_model(r) for r in (resp.data or [])]
+
+    @staticmethod
+    def list_top_by_post(post_id: int, limit: int = 200) -> List[PlatformComment]:
+        """按互动量（like_count、reply_count）倒序取帖子评论，用于分析时的评论候选集。"""
         client = get_client()
         resp = (
             client.table(TABLE)
             .select("*")
             .eq("post_id", post_id)
-            .order("published_at", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
+            .order("like_count", desc=True)
+            .order("reply_count", desc=True)
+            .order("id", desc=True)
+            .limit(limit)
             .execute()
         )
         return [CommentRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
-    def list_replies(parent_comment_id: int, limit: int = 100, offset: int = 0) -> List[PlatformComment]:
+    def list_replies(parent_comment_id: int, limit: int = 100, offset: int = 0,
+                     after_id: Optional[int] = None, after_published_at: Optional[Any] = None) -> List[PlatformComment]:
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
             .select("*")
             .eq("parent_comment_id", parent_comment_id)
-            .order("published_at", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_published_at(query, limit, offset, after_id, after_published_at).execute()
         return [CommentRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
@@ -111,6 +212,57 @@ class CommentRepository:
         row = resp.data[0] if resp.data else None
         return CommentRepository._row_to_model(row) if row else None
 
+    @staticmethod
+    def resolve_parent_links(post_id: int) -> int:
+        """按帖子集合式修正父子关联：将 parent_platform_comment_id 解析为 parent_comment_id。
+        优先调用数据库函数（一次往返）；函数未安装时回落为：读取该帖评论的 id 映射，
+        按父评论分组批量 update（每个父评论一次往返，而非每条回复一次）。
+        返回被修正的行数。
+        """
+        client = get_client()
+        if not _rpc_missing:
+            try:
+                resp = client.rpc(RESOLVE_PARENT_LINKS_RPC, {"p_post_id": int(post_id)}).execute()
+                data = resp.data
+                return int(data if isinstance(data, (int, float)) else 0)
+            except Exception as e:
+                if not _function_missing(e):
+                    log.warning(f"{RESOLVE_PARENT_LINKS_RPC} 调用失败，本次回落为分组批量 update：post_id={post_id}，err={e}")
+
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        page = 1000
+        while True:
+            resp = (
+                client.table(TABLE)
+                .select("id,platform,platform_comment_id,parent_comment_id,parent_platform_comment_id")
+                .eq("post_id", post_id)
+                .order("id")
+                .range(offset, offset + page - 1)
+                .execute()
+            )
+            batch = resp.data or []
+            rows.extend(batch)
+            if len(batch) < page:
+                break
+            offset += page
+
+        id_map = {(r.get("platform"), r.get("platform_comment_id")): r.get("id") for r in rows}
+        by_parent: Dict[int, List[int]] = {}
+        for r in rows:
+            parent_pcid = r.get("parent_platform_comment_id")
+            if not parent_pcid:
+                continue
+            parent_id = id_map.get((r.get("platform"), parent_pcid))
+            if parent_id and r.get("parent_comment_id") != parent_id:
+                by_parent.setdefault(int(parent_id), []).append(int(r["id"]))
+
+        fixed = 0
+        for parent_id, child_ids in by_parent.items():
+            client.table(TABLE).update({"parent_comment_id": parent_id}).in_("id", child_ids).execute()
+            fixed += len(child_ids)
+        return fixed
+
     @staticmethod
     def _row_to_model(row: Dict[str, Any]) -> PlatformComment:
         if not row:
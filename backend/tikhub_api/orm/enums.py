@@ -5,6 +5,7 @@ from enum import Enum
 class AnalysisStatus(str, Enum):
     INIT = "init"
     PENDING = "pending"
+    BATCH_QUEUED = "batch_queued"  # 已认领进 Gemini batch job，等待批量结果
     ANALYZED = "analyzed"
     SCREENING_FAILED = "screening_failed"
     COMMENTS_FAILED = "comments_failed"
@@ -0,0 +1,79 @@
+from __future__ import annotations
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timezone
+
+from postgrest.types import ReturnMethod
+
+from .supabase_client import get_client
+
+TABLE = "gg_gemini_file_cache"
+
+# 建表语句（Supabase SQL Editor 执行一次）：
+#
+#   create table if not exists gg_gemini_file_cache (
+#     cache_key   text        not null,              -- sha256:<内容哈希> / item:<platform>:<platform_item_id>:<kind>
+#     owner       text        not null,              -- API Key 指纹（Gemini 文件仅对上传所用的 Key 可见）
+#     files       jsonb       not null,              -- [{name, uri, mime_type, content_hash}]，图文按图片顺序
+#     expires_at  timestamptz not null,              -- Gemini 文件过期时间（已扣除安全余量）
+#     updated_at  timestamptz not null default now(),
+#     primary key (cache_key, owner)                  -- 多个 API Key 各自缓存同一内容，互不覆盖
+#   );
+#   create index if not exists idx_gg_gemini_file_cache_expires on gg_gemini_file_cache (expires_at);
+#
+# 旧表（cache_key 单列主键）迁移：
+#
+#   alter table gg_gemini_file_cache drop constraint gg_gemini_file_cache_pkey,
+#     add primary key (cache_key, owner);
+
+
+class GeminiFileRepository:
+    """gg_gemini_file_cache：已上传到 Gemini Files 的文件引用（按内容哈希 / 帖子去重）。"""
+
+    @staticmethod
+    def get(cache_key: str, owner: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存行（files 与 expires_at）；不存在或已过期返回 None。"""
+        client = get_client()
+        resp = (
+            client.table(TABLE)
+            .select("files,expires_at")
+            .eq("cache_key", cache_key)
+            .eq("owner", owner)
+            .gt("expires_at", datetime.now(timezone.utc).isoformat())
+            .limit(1)
+            .execute()
+        )
+        return resp.data[0] if resp.data else None
+
+    @staticmethod
+    def save(cache_key: str, owner: str, files: List[Dict[str, Any]], expires_at: datetime) -> None:
+        client = get_client()
+        client.table(TABLE).upsert({
+            "cache_key": cache_key,
+            "owner": owner,
+            "files": files,
+            "expires_at": expires_at.isoformat(),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }, on_conflict="cache_key,owner", returning=ReturnMethod.minimal).execute()
+
+    @staticmethod
+    def delete(cache_key: str, owner: str) -> None:
+        """只删除该 API Key 的缓存行，不影响其他 Key 对同一内容的缓存。"""
+        client = get_client()
+        (
+            client.table(TABLE)
+            .delete(returning=ReturnMethod.minimal)
+            .eq("cache_key", cache_key)
+            .eq("owner", owner)
+            .execute()
+        )
+
+    @staticmethod
+    def purge_expired() -> None:
+        """删除所有已过期的缓存行。"""
+        client = get_client()
+        (
+            client.table(TABLE)
+            .delete(returning=ReturnMethod.minimal)
+            .lt("expires_at", datetime.now(timezone.utc).isoformat())
+            .execute()
+        )
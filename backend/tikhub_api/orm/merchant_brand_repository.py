@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 from .supabase_client import get_client
+from .pagination import page_by_id
 from .models import MerchantBrand
 
 TABLE = "merchant_brands"
@@ -74,28 +75,24 @@ class MerchantBrandRepository:
         return MerchantBrandRepository._row_to_model(row) if row else None
 
     @staticmethod
-    def list_valid(limit: int = 100, offset: int = 0) -> List[MerchantBrand]:
+    def list_valid(limit: int = 100, offset: int = 0, after_id: Optional[int] = None) -> List[MerchantBrand]:
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
             .select("*")
             .eq("is_valid", True)
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [MerchantBrandRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
-    def list_all(limit: int = 100, offset: int = 0) -> List[MerchantBrand]:
+    def list_all(limit: int = 100, offset: int = 0, after_id: Optional[int] = None) -> List[MerchantBrand]:
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
             .select("*")
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [MerchantBrandRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
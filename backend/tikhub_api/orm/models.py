@@ -1,9 +1,10 @@
 from __future__ import annotations
 from typing import Optional, Dict, Any, Literal, List
+from dataclasses import dataclass
 from datetime import datetime
 
 from pydantic import BaseModel, Field, HttpUrl, constr
-from pydantic import field_validator
+from pydantic import field_validator, field_serializer
 from .enums import AnalysisStatus, RelevantStatus, PostType, Channel, AuthorFetchStatus
 
 
@@ -72,6 +73,34 @@ class PlatformPost(BaseModel):
     def title_trim(cls, v: str) -> str:
         return v.strip() if isinstance(v, str) else v
 
+    # 从 DB 读回的行走 model_construct 快速路径，URL 字段保留为 str；
+    # 统一序列化为 str，避免 model_dump 对未校验值发出序列化告警
+    @field_serializer("original_url", "cover_url")
+    def _dump_url(self, v: Any) -> Optional[str]:
+        return str(v) if v is not None else None
+
+    @field_serializer("video_url", "image_urls")
+    def _dump_url_list(self, v: Any) -> Optional[List[str]]:
+        return [str(u) for u in v] if v is not None else None
+
+
+@dataclass(frozen=True)
+class PostRef:
+    """gg_platform_post 的轻量行引用（不经 Pydantic 校验）。
+
+    车道候选选择、状态检查、项目上下文注入只需要这些列，
+    由 PostRepository.get_ref / list_refs_* 按 POST_REF_COLUMNS 投影查询得到。
+    """
+    id: int
+    project_id: Optional[str] = None
+    platform: Optional[str] = None
+    platform_item_id: Optional[str] = None
+    author_id: Optional[str] = None
+    analysis_status: Optional[str] = None
+    relevant_status: Optional[str] = None
+    author_fetch_status: Optional[str] = None
+    is_marked: Optional[bool] = None
+
 
 class PlatformComment(BaseModel):
     id: Optional[int] = Field(default=None, ge=1)
@@ -152,6 +181,8 @@ class VideoAnalysis(BaseModel):
     relevance_evidence: Optional[str] = None
     transcript_json: Optional[Dict[str, Any]] = None
     handling_suggestions: Optional[Dict[str, Any]] = None
+    # 分析输入指纹（媒体内容哈希、标题/正文、评论集合、system prompt、模型），用于复用相同输入的分析结果
+    input_fingerprint: Optional[str] = None
 
 
 
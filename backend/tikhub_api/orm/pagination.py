@@ -0,0 +1,86 @@
+from __future__ import annotations
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+from datetime import datetime
+import inspect
+
+T = TypeVar("T")
+
+# iter_pages 默认页大小
+DEFAULT_PAGE_SIZE = 500
+
+
+def page_by_id(query, limit: int, offset: int = 0, after_id: Optional[int] = None, desc: bool = True):
+    """按 id 排序分页。
+
+    传入 after_id 时走键集分页（id < after_id / id > after_id），忽略 offset；
+    否则沿用 offset 分页，兼容旧调用。
+    """
+    if after_id is not None:
+        query = query.lt("id", after_id) if desc else query.gt("id", after_id)
+        return query.order("id", desc=desc).limit(max(limit, 1))
+    return query.order("id", desc=desc).range(offset, offset + max(limit - 1, 0))
+
+
+def page_by_published_at(
+    query,
+    limit: int,
+    offset: int = 0,
+    after_id: Optional[int] = None,
+    after_published_at: Optional[Any] = None,
+    desc: bool = True,
+):
+    """按 (published_at, id) 排序分页。
+
+    游标为上一页最后一行的 (published_at, id)；id 作为同一时间戳内的决胜列。
+    published_at 可能为空（Postgres 默认：降序 NULL 在最前，升序 NULL 在最后）：
+    - 降序：游标行为 NULL 时先翻完剩余 NULL 行再进入非空区间；游标非空时只剩非空区间
+    - 升序：游标非空时先翻完剩余非空行再进入 NULL 区间；游标行为 NULL 时只剩 NULL 行
+    """
+    query = query.order("published_at", desc=desc).order("id", desc=desc)
+    if after_id is None:
+        return query.range(offset, offset + max(limit - 1, 0))
+    op = "lt" if desc else "gt"
+    after_id = int(after_id)
+    if after_published_at is None:
+        if not desc:
+            return query.is_("published_at", "null").gt("id", after_id).limit(max(limit, 1))
+        cond = f"and(published_at.is.null,id.lt.{after_id}),published_at.not.is.null"
+    else:
+        ts = _format_ts(after_published_at)
+        cond = f'published_at.{op}."{ts}",and(published_at.eq."{ts}",id.{op}.{after_id})'
+        if not desc:
+            cond += ",published_at.is.null"
+    return query.or_(cond).limit(max(limit, 1))
+
+
+def iter_pages(list_fn: Callable[..., List[T]], *args: Any, page_size: int = DEFAULT_PAGE_SIZE, **kwargs: Any) -> Iterator[T]:
+    """以固定页大小流式遍历 list_* 方法的完整结果集（键集分页）。
+
+    list_fn 需支持 limit/after_id 参数；若同时支持 after_published_at（按发布时间排序的方法），
+    游标一并取自上一页最后一条。结果行需带 id。
+
+    用法：
+        for post in iter_pages(PostRepository.list_by_analysis_status, "pending", page_size=200):
+            ...
+    """
+    by_published_at = "after_published_at" in inspect.signature(list_fn).parameters
+    cursor: dict = {}
+    while True:
+        page = list_fn(*args, limit=page_size, **cursor, **kwargs)
+        if not page:
+            return
+        yield from page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+        cursor = {"after_id": getattr(last, "id", None)}
+        if cursor["after_id"] is None:
+            raise ValueError(f"iter_pages: {getattr(list_fn, '__name__', list_fn)} 返回的行缺少 id，无法键集分页")
+        if by_published_at:
+            cursor["after_published_at"] = getattr(last, "published_at", None)
+
+
+def _format_ts(val: Any) -> str:
+    if isinstance(val, datetime):
+        return val.isoformat()
+    return str(val)
@@ -0,0 +1,231 @@
+"""
+原生 Postgres 连接池后端（可选）
+
+默认所有仓库经 supabase-py（PostgREST，HTTP+JSON）读写；重负载路径（搜索结果 upsert、评论批量入库、
+KOL 数据导入）可按仓库切换到原生驱动，获得：
+- 连接池（psycopg_pool.ConnectionPool）
+- 事务（transaction() 上下文，异常自动回滚）
+- 服务端预编译语句（psycopg3 对同一 SQL 执行达到 PG_PREPARE_THRESHOLD 次后自动 PREPARE）
+- COPY ... FROM STDIN 批量装载（copy_rows 直接装载；copy_upsert 先 COPY 到临时表再一条 INSERT ... ON CONFLICT 合并）
+
+配置（环境变量）：
+- DATABASE_URL：Postgres 直连串（Supabase 项目设置 -> Database -> Connection string）
+- ORM_BACKEND：全局默认后端 supabase|postgres（默认 supabase）
+- ORM_BACKEND_<REPO>：按仓库覆盖，如 ORM_BACKEND_POSTS=postgres、ORM_BACKEND_COMMENTS=postgres
+- PG_POOL_MIN_SIZE / PG_POOL_MAX_SIZE：连接池大小（默认 1 / 10）
+- PG_PREPARE_THRESHOLD：自动预编译阈值（默认 5；经 pgbouncer 事务模式连接时设为 -1 关闭）
+
+依赖 psycopg[binary] 与 psycopg-pool（已列入 requirements.txt；未安装或未配置 DATABASE_URL 时回落 supabase 后端）。
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import json
+import os
+import threading
+import uuid
+
+from jobs.logger import get_logger
+
+try:  # 可选依赖
+    import psycopg  # type: ignore
+    from psycopg import sql  # type: ignore
+    from psycopg.rows import dict_row  # type: ignore
+    from psycopg.types.json import Jsonb  # type: ignore
+    from psycopg_pool import ConnectionPool  # type: ignore
+except Exception:  # pragma: no cover
+    psycopg = None
+    sql = None
+    dict_row = None
+    Jsonb = None
+    ConnectionPool = None
+
+log = get_logger(__name__)
+
+BACKEND_SUPABASE = "supabase"
+BACKEND_POSTGRES = "postgres"
+
+# json / jsonb 类型 OID
+_JSON_OIDS = {114, 3802}
+# 列写入方式（由目标列类型决定）
+_KIND_JSON = "json"
+_KIND_ARRAY = "array"
+_KIND_SCALAR = "scalar"
+# 类型 OID -> 是否为数组类型（pg_type.typcategory = 'A'），进程内缓存
+_array_oids: Dict[int, bool] = {}
+
+_pool: Optional["ConnectionPool"] = None
+_pool_lock = threading.Lock()
+_warned: set[str] = set()
+
+
+def is_available() -> bool:
+    return psycopg is not None and ConnectionPool is not None and bool(os.getenv("DATABASE_URL"))
+
+
+def backend_for(repo: str) -> str:
+    """返回仓库使用的后端：ORM_BACKEND_<REPO> > ORM_BACKEND > supabase。
+    配置为 postgres 但驱动或 DATABASE_URL 缺失时回落 supabase（每个仓库只告警一次）。
+    """
+    name = (os.getenv(f"ORM_BACKEND_{repo.upper()}") or os.getenv("ORM_BACKEND") or BACKEND_SUPABASE).strip().lower()
+    if name != BACKEND_POSTGRES:
+        return BACKEND_SUPABASE
+    if not is_available():
+        if repo not in _warned:
+            _warned.add(repo)
+            log.warning("仓库 %s 配置为 postgres 后端，但 psycopg/psycopg_pool 未安装或缺少 DATABASE_URL，回落 supabase", repo)
+        return BACKEND_SUPABASE
+    return BACKEND_POSTGRES
+
+
+def get_pool() -> "ConnectionPool":
+    """进程级单例连接池（懒创建）。"""
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            if psycopg is None or ConnectionPool is None:
+                raise RuntimeError("psycopg / psycopg_pool 未安装，无法使用 postgres 后端")
+            dsn = os.getenv("DATABASE_URL")
+            if not dsn:
+                raise RuntimeError("Missing DATABASE_URL env var")
+            threshold = int(os.getenv("PG_PREPARE_THRESHOLD", "5"))
+            _pool = ConnectionPool(
+                dsn,
+                min_size=int(os.getenv("PG_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("PG_POOL_MAX_SIZE", "10")),
+                kwargs={"prepare_threshold": threshold if threshold >= 0 else None},
+                name="gg-orm",
+                open=True,
+            )
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@contextmanager
+def transaction() -> Iterator["psycopg.Connection"]:
+    """从连接池借出连接并开启事务；正常退出提交，异常回滚。可嵌套（内层为 SAVEPOINT）。"""
+    with get_pool().connection() as conn:
+        with conn.transaction():
+            yield conn
+
+
+def execute(query: str, params: Optional[Sequence[Any]] = None, conn: Optional["psycopg.Connection"] = None,
+            prepare: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """执行参数化 SQL 并以 dict 列表返回结果行（无结果集时返回空列表）。
+    prepare=True 强制服务端预编译；None 交由连接的 prepare_threshold 决定。
+    """
+    if conn is None:
+        with transaction() as c:
+            return execute(query, params, conn=c, prepare=prepare)
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(query, params, prepare=prepare)
+        return cur.fetchall() if cur.description else []
+
+
+def copy_rows(conn: "psycopg.Connection", table: str, rows: List[Dict[str, Any]]) -> int:
+    """COPY ... FROM STDIN 直接装载到目标表（不处理冲突），返回装载行数。列取所有行字段的并集，缺失填 NULL。"""
+    if not rows:
+        return 0
+    cols = list(dict.fromkeys(k for r in rows for k in r))
+    col_ids = sql.SQL(", ").join(sql.Identifier(c) for c in cols)
+    with conn.cursor() as cur:
+        kinds = _column_kinds(cur, table, col_ids)
+        with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(table), col_ids)) as cp:
+            for r in rows:
+                cp.write_row([_adapt(r.get(c), k) for c, k in zip(cols, kinds)])
+    return len(rows)
+
+
+def copy_upsert(
+    conn: "psycopg.Connection",
+    table: str,
+    rows: Iterable[Dict[str, Any]],
+    conflict: Sequence[str],
+    returning: Sequence[str] = (),
+    update: bool = True,
+) -> List[Dict[str, Any]]:
+    """COPY 批量装载并按唯一键合并，返回 returning 指定列的结果行。
+
+    - 行按字段集合分组：每组 COPY 到一张只含这些列的临时表（ON COMMIT DROP，无约束），
+      再 INSERT ... SELECT ... ON CONFLICT (conflict) DO UPDATE 只覆盖该组提供的列，
+      与 PostgREST 路径逐组 upsert（exclude_none）语义一致
+    - dict/list 写入 json/jsonb 列时按 JSON 编码，写入数组列时按数组编码，写入其他列（如 text）时按 JSON 文本编码
+    - 需在 transaction() 内调用
+    """
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for r in rows:
+        groups.setdefault(tuple(sorted(r)), []).append(r)
+    out: List[Dict[str, Any]] = []
+    for cols, group in groups.items():
+        out.extend(_copy_upsert_group(conn, table, list(cols), group, conflict, returning, update))
+    return out
+
+
+def _copy_upsert_group(conn, table: str, cols: List[str], rows: List[Dict[str, Any]], conflict: Sequence[str],
+                       returning: Sequence[str], update: bool) -> List[Dict[str, Any]]:
+    stage = f"_stage_{table}_{uuid.uuid4().hex[:8]}"
+    col_ids = sql.SQL(", ").join(sql.Identifier(c) for c in cols)
+    with conn.cursor(row_factory=dict_row) as cur:
+        # CREATE TABLE AS ... WITH NO DATA：只复制列类型，不带 NOT NULL/默认值/序列
+        cur.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+            sql.Identifier(stage), col_ids, sql.Identifier(table)))
+        kinds = _column_kinds(cur, stage, col_ids)
+        with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(stage), col_ids)) as cp:
+            for r in rows:
+                cp.write_row([_adapt(r.get(c), k) for c, k in zip(cols, kinds)])
+
+        update_cols = [c for c in cols if c not in conflict]
+        if update and update_cols:
+            action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in update_cols))
+        else:
+            action = sql.SQL("DO NOTHING")
+        stmt = sql.SQL("INSERT INTO {t} ({c}) SELECT {c} FROM {s} ON CONFLICT ({k}) {a}").format(
+            t=sql.Identifier(table), c=col_ids, s=sql.Identifier(stage),
+            k=sql.SQL(", ").join(sql.Identifier(c) for c in conflict), a=action)
+        if returning:
+            stmt = stmt + sql.SQL(" RETURNING {}").format(sql.SQL(", ").join(sql.Identifier(c) for c in returning))
+        cur.execute(stmt)
+        result = cur.fetchall() if returning else []
+        cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(stage)))
+        return result
+
+
+def _column_kinds(cur, table: str, col_ids) -> List[str]:
+    """按列返回写入方式：json/jsonb 列、数组列或普通列（由 LIMIT 0 查询的结果描述中的类型 OID 得到）。"""
+    cur.execute(sql.SQL("SELECT {} FROM {} LIMIT 0").format(col_ids, sql.Identifier(table)))
+    oids = [d.type_code for d in cur.description]
+    unknown = [o for o in set(oids) if o not in _JSON_OIDS and o not in _array_oids]
+    if unknown:
+        cur.execute("SELECT oid::int AS oid, typcategory = 'A' AS is_array FROM pg_type WHERE oid = ANY(%s)",
+                    (unknown,))
+        for row in cur.fetchall():
+            oid, is_array = (row["oid"], row["is_array"]) if isinstance(row, dict) else row
+            _array_oids[int(oid)] = bool(is_array)
+    return [
+        _KIND_JSON if o in _JSON_OIDS else _KIND_ARRAY if _array_oids.get(o) else _KIND_SCALAR
+        for o in oids
+    ]
+
+
+def _adapt(value: Any, kind: str) -> Any:
+    """按目标列类型编码：json/jsonb 列用 Jsonb；数组列保留列表（COPY 按数组编码）；
+    其余列中的 dict/list/tuple 按 JSON 文本写入（如 gg_platform_post.video_url，与 PostgREST 路径一致）。"""
+    if value is None:
+        return None
+    if kind == _KIND_JSON:
+        return Jsonb(value)
+    if kind == _KIND_ARRAY:
+        return list(value) if isinstance(value, tuple) else value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
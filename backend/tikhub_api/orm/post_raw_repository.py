@@ -0,0 +1,88 @@
+from __future__ import annotations
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from datetime import datetime, timezone
+
+from postgrest.types import ReturnMethod
+
+from .supabase_client import get_client
+from ..utils.compression import compress_json, decompress_json
+
+TABLE = "gg_platform_post_raw"
+
+# 建表语句（Supabase SQL Editor 执行一次）：
+#
+#   create table if not exists gg_platform_post_raw (
+#     platform          text        not null,
+#     platform_item_id  text        not null,
+#     codec             text        not null,          -- zstd / gzip
+#     payload           text        not null,          -- base64(压缩后的 JSON)
+#     raw_size          integer     not null default 0, -- 压缩前字节数
+#     stored_size       integer     not null default 0, -- 压缩后字节数
+#     updated_at        timestamptz not null default now(),
+#     primary key (platform, platform_item_id)
+#   );
+
+
+class PostRawRepository:
+    """gg_platform_post_raw：帖子原始报文（raw_details）的压缩冷存储。
+
+    按 (platform, platform_item_id) 存储，与热表 gg_platform_post 的唯一键一致，
+    因此写入时无需等待帖子 id；读取为按需懒加载（弹幕/排查等场景）。
+    """
+
+    @staticmethod
+    def save_many(items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+        """批量写入 (platform, platform_item_id, raw_details)，返回写入条数。"""
+        payload: List[Dict[str, Any]] = []
+        seen: set[tuple[str, str]] = set()
+        for platform, item_id, raw in items:
+            key = (str(platform), str(item_id))
+            if not raw or key in seen:
+                continue
+            seen.add(key)
+            codec, blob, raw_size = compress_json(raw)
+            payload.append({
+                "platform": key[0],
+                "platform_item_id": key[1],
+                "codec": codec,
+                "payload": blob,
+                "raw_size": raw_size,
+                "stored_size": len(blob),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            })
+        if not payload:
+            return 0
+        client = get_client()
+        client.table(TABLE).upsert(payload, on_conflict="platform,platform_item_id", returning=ReturnMethod.minimal).execute()
+        return len(payload)
+
+    @staticmethod
+    def get(platform: str, platform_item_id: str) -> Optional[Dict[str, Any]]:
+        client = get_client()
+        resp = (
+            client.table(TABLE)
+            .select("codec,payload")
+            .eq("platform", platform)
+            .eq("platform_item_id", platform_item_id)
+            .limit(1)
+            .execute()
+        )
+        row = resp.data[0] if resp.data else None
+        return decompress_json(row["codec"], row["payload"]) if row else None
+
+    @staticmethod
+    def get_many(platform: str, platform_item_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量读取同一平台的多条原始报文，返回 {platform_item_id: raw_details}。"""
+        ids = [str(i) for i in platform_item_ids if i]
+        if not ids:
+            return {}
+        client = get_client()
+        resp = (
+            client.table(TABLE)
+            .select("platform_item_id,codec,payload")
+            .eq("platform", platform)
+            .in_("platform_item_id", ids)
+            .execute()
+        )
+        return {r["platform_item_id"]: decompress_json(r["codec"], r["payload"]) for r in (resp.data or [])}
+
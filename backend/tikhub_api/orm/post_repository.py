@@ -1,23 +1,70 @@
 from __future__ import annotations
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import json
+import os
 
 from .supabase_client import get_client
-from .models import PlatformPost
+from .models import PlatformPost, PostRef
+from .enums import AnalysisStatus, RelevantStatus, PostType, AuthorFetchStatus
+from .post_raw_repository import PostRawRepository
+from .pagination import page_by_id, page_by_published_at
+from . import pg_backend
+from postgrest.types import ReturnMethod
+from jobs.logger import get_logger
+
+log = get_logger(__name__)
 
 TABLE = "gg_platform_post"
 
+# raw_details 存储方式：inline=沿用热表 raw_details 列（默认）；cold=压缩后写入冷存储表 gg_platform_post_raw，
+# 需先执行 post_raw_repository 中的建表语句再开启
+RAW_DETAILS_STORAGE = (os.getenv("RAW_DETAILS_STORAGE", "inline") or "inline").strip().lower()
+
+# 热表查询列：不含 raw_details（体积大，按需通过 get_raw_details 懒加载）
+POST_COLUMNS = ",".join(name for name in PlatformPost.model_fields if name != "raw_details")
+# 轻量引用列（PostRef）：车道候选选择、状态检查、上下文注入只需要这些
+POST_REF_COLUMNS = ",".join(PostRef.__dataclass_fields__)
+# 初筛文本构建所需列（analysis.text_builder.build_user_msg）
+SCREENING_COLUMNS = (
+    "id,project_id,platform,title,content,author_name,published_at,post_type,duration_ms,"
+    "play_count,like_count,comment_count,share_count"
+)
+
+# 批量状态迁移：(post_id, new_status, relevant_result 或 None)
+StatusTransition = Tuple[int, str, Optional[Any]]
+_TRANSITION_COLUMNS = ("analysis_status", "relevant_status", "author_fetch_status")
+
+# 批量状态迁移函数（Supabase SQL Editor 执行一次；未安装时 _transition 回落到分组条件 update）：
+#
+#   create or replace function gg_transition_post_status(p_column text, p_expected text, p_items jsonb)
+#   returns table(id bigint) language plpgsql as $$
+#   begin
+#     if p_column not in ('analysis_status', 'relevant_status', 'author_fetch_status') then
+#       raise exception 'unsupported column %', p_column;
+#     end if;
+#     return query execute format(
+#       'update gg_platform_post p
+#           set %1$I = i.status,
+#               relevant_result = case when i.result is null then p.relevant_result else i.result end
+#          from jsonb_to_recordset($1) as i(id bigint, status text, result jsonb)
+#         where p.id = i.id and ($2::text is null or p.%1$I = $2)
+#        returning p.id', p_column)
+#     using p_items, p_expected;
+#   end $$;
+TRANSITION_STATUS_RPC = "gg_transition_post_status"
+
 
 class PostRepository:
     """CRUD(light) for gg_platform_post: add and query only."""
 
     @staticmethod
-    def get_by_id(post_id: int) -> Optional[PlatformPost]:
+    def get_by_id(post_id: int, columns: str = POST_COLUMNS) -> Optional[PlatformPost]:
+        """columns 为查询列（投影），未查询的字段取模型默认值。"""
         client = get_client()
         resp = (
             client.table(TABLE)
-            .select("*")
+            .select(columns)
             .eq("id", post_id)
             .limit(1)
             .execute()
@@ -39,12 +86,17 @@ class PostRepository:
         # remove id if None to avoid conflict on upsert
         if payload.get("id") is None:
             payload.pop("id", None)
+        PostRepository._offload_raw_details([payload])
 
         # Upsert on the unique constraint (project_id, platform, platform_item_id)
         # 需要显式声明 on_conflict，才能命中该唯一索引而非按主键冲突
-        resp = client.table(TABLE).upsert(payload, on_conflict="platform,platform_item_id").execute()
+        resp = _select_hot(client.table(TABLE).upsert(payload, on_conflict="platform,platform_item_id")).execute()
         data = resp.data[0] if resp.data else None
-        return PostRepository._row_to_model(data) if data else model
+        if not data:
+            return model
+        saved = PostRepository._row_to_model(data)
+        saved.raw_details = model.raw_details
+        return saved
 
 
     @staticmethod
@@ -52,7 +104,6 @@ class PostRepository:
         """批量 Upsert 多条帖子，按 (platform, platform_item_id) 作为唯一键。
         返回 upsert 后的行（尽力而为，若后端不返回则回落为空列表）。
         """
-        client = get_client()
         raw_payload: List[Dict[str, Any]] = []
         for p in posts:
             model = p if isinstance(p, PlatformPost) else PlatformPost(**p)  # type: ignore[arg-type]
@@ -74,16 +125,74 @@ class PostRepository:
             payload.append(row)
         if not payload:
             return []
-        resp = client.table(TABLE).upsert(payload, on_conflict="platform,platform_item_id").execute()
-        data = resp.data or []
-        return [PostRepository._row_to_model(r) for r in data]
+        raw_by_key = PostRepository._offload_raw_details(payload)
+        if pg_backend.backend_for("posts") == pg_backend.BACKEND_POSTGRES:
+            # 原生后端：单事务内 COPY 装载 + ON CONFLICT 合并，RETURNING 热表列
+            with pg_backend.transaction() as conn:
+                data = pg_backend.copy_upsert(
+                    conn, TABLE, payload, conflict=("platform", "platform_item_id"), returning=POST_COLUMNS.split(","),
+                )
+        else:
+            client = get_client()
+            resp = _select_hot(client.table(TABLE).upsert(payload, on_conflict="platform,platform_item_id")).execute()
+            data = resp.data or []
+        saved = [PostRepository._row_to_model(r) for r in data]
+        # 回填内存中的原始报文，调用方（如弹幕）无需再读冷存储
+        for m in saved:
+            raw = raw_by_key.get((m.platform, m.platform_item_id))
+            if raw is not None:
+                m.raw_details = raw
+        return saved
+
+    @staticmethod
+    def _offload_raw_details(payload: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, Any]]:
+        """cold 模式下将 raw_details 从热表 payload 中移出，压缩写入冷存储表。
+        返回 {(platform, platform_item_id): raw_details}；冷存储写入失败时保留在 payload 中（回落 inline 写入）。
+        """
+        raw_by_key: Dict[tuple, Dict[str, Any]] = {}
+        for row in payload:
+            raw = row.get("raw_details")
+            if raw:
+                raw_by_key[(row.get("platform"), row.get("platform_item_id"))] = raw
+        if RAW_DETAILS_STORAGE != "cold" or not raw_by_key:
+            return raw_by_key
+        try:
+            PostRawRepository.save_many((k[0], k[1], v) for k, v in raw_by_key.items())
+        except Exception as e:
+            log.warning(f"raw_details 写入冷存储失败，回落写入热表：{e}")
+            return raw_by_key
+        # 显式置空热表列，历史行在重新 upsert 时随之瘦身
+        for row in payload:
+            row["raw_details"] = None
+        return raw_by_key
+
+    @staticmethod
+    def get_raw_details(post: PlatformPost) -> Optional[Dict[str, Any]]:
+        """懒加载帖子原始报文（弹幕/排查使用）：内存 -> 冷存储表（仅 cold 模式）-> 热表 raw_details 列。"""
+        if getattr(post, "raw_details", None):
+            return post.raw_details
+        raw: Optional[Dict[str, Any]] = None
+        if RAW_DETAILS_STORAGE == "cold":
+            try:
+                raw = PostRawRepository.get(post.platform, post.platform_item_id)
+            except Exception as e:
+                log.warning(f"读取冷存储 raw_details 失败：{post.platform}/{post.platform_item_id}，err={e}")
+        if raw is None and post.id:
+            try:
+                client = get_client()
+                resp = client.table(TABLE).select("raw_details").eq("id", post.id).limit(1).execute()
+                raw = (resp.data[0] or {}).get("raw_details") if resp.data else None
+            except Exception as e:
+                log.warning(f"读取热表 raw_details 失败：post_id={post.id}，err={e}")
+        post.raw_details = raw
+        return raw
 
     @staticmethod
     def get_by_platform_item(platform: str, platform_item_id: str) -> Optional[PlatformPost]:
         client = get_client()
         resp = (
             client.table(TABLE)
-            .select("*")
+            .select(POST_COLUMNS)
             .eq("platform", platform)
             .eq("platform_item_id", platform_item_id)
             .limit(1)
@@ -93,49 +202,42 @@ class PostRepository:
         return PostRepository._row_to_model(row) if row else None
 
     @staticmethod
-    def list_by_platform(platform: str, limit: int = 50, offset: int = 0) -> List[PlatformPost]:
+    def list_by_platform(platform: str, limit: int = 50, offset: int = 0, columns: str = POST_COLUMNS,
+                         after_id: Optional[int] = None, after_published_at: Optional[Any] = None) -> List[PlatformPost]:
         client = get_client()
-        resp = (
-            client.table(TABLE)
-            .select("*")
-            .eq("platform", platform)
-            .order("published_at", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
-        )
+        query = client.table(TABLE).select(columns).eq("platform", platform)
+        resp = page_by_published_at(query, limit, offset, after_id, after_published_at).execute()
         return [PostRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
-    def list_by_status(status: str, limit: int = 50, offset: int = 0) -> List[PlatformPost]:
+    def list_by_status(status: str, limit: int = 50, offset: int = 0, after_id: Optional[int] = None) -> List[PlatformPost]:
         """Deprecated: use list_by_analysis_status. Retained for backward compatibility."""
-        return PostRepository.list_by_analysis_status(status=status, limit=limit, offset=offset)
+        return PostRepository.list_by_analysis_status(status=status, limit=limit, offset=offset, after_id=after_id)
 
     @staticmethod
-    def list_by_analysis_status(status: str, limit: int = 50, offset: int = 0) -> List[PlatformPost]:
-        """List posts by analysis_status."""
+    def list_by_analysis_status(status: str, limit: int = 50, offset: int = 0,
+                                columns: str = POST_COLUMNS, after_id: Optional[int] = None) -> List[PlatformPost]:
+        """List posts by analysis_status. after_id 为键集分页游标（id 倒序，取 id < after_id）。"""
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
-            .select("*")
+            .select(columns)
             .eq("analysis_status", status)
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [PostRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
-    def list_by_relevant_status(status: str, limit: int = 50, offset: int = 0) -> List[PlatformPost]:
-        """List posts by relevant_status."""
+    def list_by_relevant_status(status: str, limit: int = 50, offset: int = 0,
+                                columns: str = POST_COLUMNS, after_id: Optional[int] = None) -> List[PlatformPost]:
+        """List posts by relevant_status. after_id 为键集分页游标。"""
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
-            .select("*")
+            .select(columns)
             .eq("relevant_status", status)
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [PostRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
@@ -144,18 +246,18 @@ class PostRepository:
         relevant_status: List[str],
         limit: int = 50,
         offset: int = 0,
+        columns: str = POST_COLUMNS,
+        after_id: Optional[int] = None,
     ) -> List[PlatformPost]:
-        """List posts matching analysis_status (IN) and relevant_status (IN)."""
+        """List posts matching analysis_status (IN) and relevant_status (IN). after_id 为键集分页游标。"""
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
-            .select("*")
+            .select(columns)
             .in_("analysis_status", analysis_status)
             .in_("relevant_status", relevant_status)
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [PostRepository._row_to_model(r) for r in (resp.data or [])]
 
 
@@ -171,7 +273,7 @@ class PostRepository:
             payload["relevant_result"] = relevant_result
         _ = (
             client.table(TABLE)
-            .update(payload)
+            .update(payload, returning=ReturnMethod.minimal)
             .eq("id", post_id)
             .execute()
         )
@@ -188,7 +290,7 @@ class PostRepository:
             payload["relevant_result"] = relevant_result
         _ = (
             client.table(TABLE)
-            .update(payload)
+            .update(payload, returning=ReturnMethod.minimal)
             .eq("id", post_id)
             .execute()
         )
@@ -209,18 +311,83 @@ class PostRepository:
         payload: Dict[str, Any] = {"author_fetch_status": status}
         _ = (
             client.table(TABLE)
-            .update(payload)
+            .update(payload, returning=ReturnMethod.minimal)
             .eq("id", post_id)
             .execute()
         )
         return None
 
+    # ------------------------ 批量状态迁移 ------------------------
+    @staticmethod
+    def transition_analysis_status(items: List[StatusTransition], expected: Optional[str] = None) -> List[int]:
+        """批量更新 analysis_status（可附带 relevant_result），返回实际迁移成功的 id 列表。
+        expected 为期望的当前状态（乐观并发）：当前状态不符的行不更新、不出现在返回值中。
+        """
+        return PostRepository._transition("analysis_status", items, expected)
+
+    @staticmethod
+    def transition_relevant_status(items: List[StatusTransition], expected: Optional[str] = None) -> List[int]:
+        """批量更新 relevant_status（可附带 relevant_result），语义同 transition_analysis_status。"""
+        return PostRepository._transition("relevant_status", items, expected)
+
+    @staticmethod
+    def transition_author_fetch_status(items: List[StatusTransition], expected: Optional[str] = None) -> List[int]:
+        """批量更新 author_fetch_status（result 忽略），语义同 transition_analysis_status。"""
+        return PostRepository._transition("author_fetch_status", [(i[0], i[1], None) for i in items], expected)
+
+    @staticmethod
+    def _transition(column: str, items: List[StatusTransition], expected: Optional[str]) -> List[int]:
+        """优先一次 RPC 完成整批迁移；函数未安装时回落为按相同 payload（新状态, result）分组的条件 update。"""
+        if column not in _TRANSITION_COLUMNS:
+            raise ValueError(f"unsupported status column: {column}")
+        latest: Dict[int, StatusTransition] = {}
+        for item in items or []:
+            post_id, status, result = (tuple(item) + (None,))[:3]
+            latest[int(post_id)] = (int(post_id), str(status), result)  # 同一 id 以最后一次为准
+        if not latest:
+            return []
+        client = get_client()
+        try:
+            resp = client.rpc(TRANSITION_STATUS_RPC, {
+                "p_column": column,
+                "p_expected": expected,
+                "p_items": [{"id": i, "status": st, "result": r} for i, st, r in latest.values()],
+            }).execute()
+            return [int(r["id"] if isinstance(r, dict) else r) for r in (resp.data or [])]
+        except Exception as e:
+            log.debug(f"{TRANSITION_STATUS_RPC} 不可用，回落分组 update：{e}")
+
+        # 按完全相同的 payload（新状态 + result）分组，每组一次条件 update；result 为空时不触碰 relevant_result
+        applied: List[int] = []
+        groups: Dict[Tuple[str, Optional[str]], List[int]] = {}
+        payloads: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        for post_id, status, result in latest.values():
+            key = (status, None if result is None else json.dumps(result, sort_keys=True, ensure_ascii=False, default=str))
+            if key not in payloads:
+                payloads[key] = {column: status} if result is None else {column: status, "relevant_result": result}
+            groups.setdefault(key, []).append(post_id)
+        for key, ids in groups.items():
+            applied.extend(PostRepository._guarded_update(client, payloads[key], ids, column, expected))
+        return applied
+
+    @staticmethod
+    def _guarded_update(client, payload: Dict[str, Any], ids: List[int], column: str,
+                        expected: Optional[str]) -> List[int]:
+        query = client.table(TABLE).update(payload).in_("id", ids)
+        if expected is not None:
+            query = query.eq(column, expected)
+        select = getattr(query, "select", None)
+        resp = (select("id") if callable(select) else query).execute()
+        return [int(r["id"]) for r in (resp.data or []) if r.get("id") is not None]
+
     @staticmethod
     def list_by_author_fetch_status(
         status: str,
         limit: int = 50,
         offset: int = 0,
-        relevant_status: Optional[List[str]] = None
+        relevant_status: Optional[List[str]] = None,
+        columns: str = POST_COLUMNS,
+        after_id: Optional[int] = None,
     ) -> List[PlatformPost]:
         """根据作者获取状态查询帖子列表，可选过滤相关性状态
 
@@ -229,6 +396,8 @@ class PostRepository:
             limit: 返回数量限制
             offset: 偏移量
             relevant_status: 可选的相关性状态列表，如 ["yes", "maybe"]。为 None 时不过滤
+            columns: 查询列（投影），未查询的字段取模型默认值
+            after_id: 键集分页游标（上一页最后一条的 id）；传入时忽略 offset
 
         Returns:
             帖子列表
@@ -236,7 +405,7 @@ class PostRepository:
         client = get_client()
         query = (
             client.table(TABLE)
-            .select("*")
+            .select(columns)
             .eq("author_fetch_status", status)
         )
 
@@ -244,26 +413,90 @@ class PostRepository:
         if relevant_status is not None and len(relevant_status) > 0:
             query = query.in_("relevant_status", relevant_status)
 
-        resp = (
-            query
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
-        )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [PostRepository._row_to_model(r) for r in (resp.data or [])]
 
+    # ------------------------ 轻量引用（PostRef） ------------------------
     @staticmethod
-    def _row_to_model(row: Dict[str, Any]) -> PlatformPost:
-        if not row:
-            return PlatformPost()
-        return PlatformPost(
+    def get_ref(post_id: int) -> Optional[PostRef]:
+        """按 id 读取 PostRef（只查 POST_REF_COLUMNS），用于状态检查与上下文注入。"""
+        client = get_client()
+        resp = client.table(TABLE).select(POST_REF_COLUMNS).eq("id", post_id).limit(1).execute()
+        row = resp.data[0] if resp.data else None
+        return PostRepository._row_to_ref(row) if row else None
+
+    @staticmethod
+    def list_refs_by_analysis_status(status: str, limit: int = 50, offset: int = 0,
+                                     after_id: Optional[int] = None,
+                                     is_marked: Optional[bool] = None) -> List[PostRef]:
+        """is_marked 不为 None 时只取人工标记/导入（True）或非标记（False）的帖子。"""
+        eq_filters: Dict[str, Any] = {"analysis_status": status}
+        if is_marked is not None:
+            eq_filters["is_marked"] = is_marked
+        rows = PostRepository._select_rows(POST_REF_COLUMNS, eq_filters, {}, limit, offset, after_id)
+        return [PostRepository._row_to_ref(r) for r in rows]
+
+    @staticmethod
+    def list_refs_by_analysis_and_relevance(
+        analysis_status: List[str],
+        relevant_status: List[str],
+        limit: int = 50,
+        offset: int = 0,
+        after_id: Optional[int] = None,
+    ) -> List[PostRef]:
+        rows = PostRepository._select_rows(
+            POST_REF_COLUMNS, {}, {"analysis_status": analysis_status, "relevant_status": relevant_status},
+            limit, offset, after_id,
+        )
+        return [PostRepository._row_to_ref(r) for r in rows]
+
+    @staticmethod
+    def list_refs_by_author_fetch_status(
+        status: str,
+        limit: int = 50,
+        offset: int = 0,
+        relevant_status: Optional[List[str]] = None,
+        after_id: Optional[int] = None,
+    ) -> List[PostRef]:
+        in_filters = {"relevant_status": relevant_status} if relevant_status else {}
+        rows = PostRepository._select_rows(
+            POST_REF_COLUMNS, {"author_fetch_status": status}, in_filters, limit, offset, after_id
+        )
+        return [PostRepository._row_to_ref(r) for r in rows]
+
+    @staticmethod
+    def _select_rows(columns: str, eq_filters: Dict[str, Any], in_filters: Dict[str, List[str]],
+                     limit: int, offset: int, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按 id 倒序的投影查询，返回原始行。"""
+        client = get_client()
+        query = client.table(TABLE).select(columns)
+        for k, v in eq_filters.items():
+            query = query.eq(k, v)
+        for k, v in in_filters.items():
+            query = query.in_(k, v)
+        resp = page_by_id(query, limit, offset, after_id).execute()
+        return resp.data or []
+
+    @staticmethod
+    def _row_to_ref(row: Dict[str, Any]) -> PostRef:
+        return PostRef(**{k: row.get(k) for k in PostRef.__dataclass_fields__})
+
+    @staticmethod
+    def _row_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+        """DB 行 -> PlatformPost 字段字典（补默认值、解析 JSON/时间字段）。"""
+        video_url = row.get("video_url")
+        if isinstance(video_url, str):
+            video_url = json.loads(video_url or "[]")
+        elif video_url is None:
+            video_url = []
+        return dict(
             id=row.get("id"),
             project_id=row.get("project_id", ""),
             platform=row.get("platform", ""),
             platform_item_id=row.get("platform_item_id", ""),
             title=row.get("title", ""),
             content=row.get("content"),
-            # 新增字段映射（若列暂不存在，Pydantic 使用默认值）
+            # 新增字段映射（若列暂不存在，使用默认值）
             post_type=row.get("post_type", "video"),
             original_url=row.get("original_url"),
             author_id=row.get("author_id"),
@@ -274,18 +507,66 @@ class PostRepository:
             like_count=row.get("like_count", 0),
             comment_count=row.get("comment_count", 0),
             cover_url=row.get("cover_url"),
-            video_url=json.loads(row.get("video_url") or "[]"),
+            video_url=video_url,
             image_urls=row.get("image_urls"),
             analysis_status=row.get("analysis_status", "init"),
             relevant_status=row.get("relevant_status", "unknown"),
             author_fetch_status=row.get("author_fetch_status", "not_fetched"),
             relevant_result=row.get("relevant_result"),
+            is_marked=bool(row.get("is_marked", False)),
             raw_details=row.get("raw_details"),
             published_at=_parse_dt(row.get("published_at")),
             created_at=_parse_dt(row.get("created_at")),
             updated_at=_parse_dt(row.get("updated_at")),
         )
 
+    @staticmethod
+    def _row_to_model(row: Dict[str, Any]) -> PlatformPost:
+        """受信任的快速路径：DB 行由本仓库写入（写入前已在适配器边界校验），
+        这里跳过 Pydantic 校验（model_construct），仅做枚举/数值的轻量规整。
+        需要完整校验时使用 _row_to_model_validated。
+        """
+        if not row:
+            return PlatformPost()
+        fields = PostRepository._row_fields(row)
+        fields["post_type"] = _coerce_enum(PostType, fields["post_type"], PostType.VIDEO)
+        fields["analysis_status"] = _coerce_enum(AnalysisStatus, fields["analysis_status"], AnalysisStatus.INIT)
+        fields["relevant_status"] = _coerce_enum(RelevantStatus, fields["relevant_status"], RelevantStatus.UNKNOWN)
+        fields["author_fetch_status"] = _coerce_enum(
+            AuthorFetchStatus, fields["author_fetch_status"], AuthorFetchStatus.NOT_FETCHED
+        )
+        for key in ("share_count", "duration_ms", "play_count", "like_count", "comment_count"):
+            fields[key] = int(fields[key] or 0)
+        if isinstance(fields["title"], str):
+            fields["title"] = fields["title"].strip()
+        return PlatformPost.model_construct(**fields)
+
+    @staticmethod
+    def _row_to_model_validated(row: Dict[str, Any]) -> PlatformPost:
+        """完整 Pydantic 校验路径（用于不受信任的数据源或排查）。"""
+        if not row:
+            return PlatformPost()
+        return PlatformPost(**PostRepository._row_fields(row))
+
+
+def _select_hot(query):
+    """写操作返回行时只取热表列（supabase-py 较新版本支持在 upsert 后链式 select）。"""
+    select = getattr(query, "select", None)
+    return select(POST_COLUMNS) if callable(select) else query
+
+
+def _coerce_enum(enum_cls, value: Any, default):
+    """空值取默认值；未知取值记录告警并保留原值（不替换为默认值，避免掩盖脏数据、后续写回覆盖真实状态）。"""
+    if isinstance(value, enum_cls):
+        return value
+    if value is None:
+        return default
+    try:
+        return enum_cls(value)
+    except Exception:
+        log.warning(f"{enum_cls.__name__} 未知取值，保留原值：{value!r}")
+        return value
+
 
 def _parse_dt(val: Any) -> Optional[datetime]:
     if not val:
@@ -0,0 +1,82 @@
+"""
+prompt 模板 / 项目变量的进程内读穿缓存
+
+- 激活模板按 name 缓存，项目变量按 project_id 缓存，均带 TTL（PROMPT_CACHE_TTL_SEC，默认 60 秒）
+- 项目变量附带版本指纹（各行 name/value/updated_at 的哈希），渲染结果按
+  (模板内容指纹, project_id, 变量版本) 记忆化，模板换版本或变量变化后旧渲染结果自然失效
+- 本进程内经 PromptTemplateRepository / PromptVariableRepository 写入时主动失效；
+  其他进程（如 Supabase 控制台）的修改在 TTL 内生效
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import os
+
+from ..utils.ttl_cache import TTLCache
+from .models import PromptTemplate
+
+CACHE_TTL_SEC = float(os.getenv("PROMPT_CACHE_TTL_SEC", "60"))
+
+_templates: TTLCache[Tuple[Optional[PromptTemplate]]] = TTLCache(default_ttl=CACHE_TTL_SEC, max_size=64)
+_project_vars: TTLCache[Tuple[str, Dict[str, Any]]] = TTLCache(default_ttl=CACHE_TTL_SEC, max_size=256)
+_rendered: TTLCache[str] = TTLCache(default_ttl=max(CACHE_TTL_SEC, 1.0) * 10, max_size=512)
+
+
+def get_active_template(name: str) -> Optional[PromptTemplate]:
+    """读穿缓存的 PromptTemplateRepository.get_active_by_name（未配置的模板同样缓存，避免反复查库）。"""
+    hit = _templates.get(name)
+    if hit is not None:
+        return hit[0]
+    from .prompt_template_repository import PromptTemplateRepository
+
+    tpl = PromptTemplateRepository.get_active_by_name(name)
+    _templates.set(name, (tpl,))
+    return tpl
+
+
+def get_project_vars(project_id: str) -> Tuple[str, Dict[str, Any]]:
+    """读穿缓存的项目变量，返回 (版本指纹, {variable_name: variable_value})。查询失败时抛出异常。"""
+    hit = _project_vars.get(project_id)
+    if hit is not None:
+        return hit
+    from .prompt_variable_repository import PromptVariableRepository
+
+    rows = PromptVariableRepository.list_by_project(project_id, limit=500)
+    var_map: Dict[str, Any] = {}
+    digest = hashlib.sha1()
+    for r in sorted(rows, key=lambda x: str(getattr(x, "variable_name", "") or "")):
+        name = getattr(r, "variable_name", None)
+        if not name:
+            continue
+        value = getattr(r, "variable_value", None)
+        var_map[str(name)] = value
+        digest.update(json.dumps([str(name), value, str(getattr(r, "updated_at", ""))],
+                                 ensure_ascii=False, default=str).encode("utf-8"))
+    entry = (digest.hexdigest()[:16], var_map)
+    _project_vars.set(project_id, entry)
+    return entry
+
+
+def get_rendered(key: Tuple[Any, ...]) -> Optional[str]:
+    return _rendered.get(key)
+
+
+def set_rendered(key: Tuple[Any, ...], text: str) -> None:
+    _rendered.set(key, text)
+
+
+def invalidate_template(name: Optional[str] = None) -> None:
+    """模板写入后调用；name 为空时清空全部模板缓存。"""
+    if name:
+        _templates.pop(name)
+    else:
+        _templates.clear()
+
+
+def invalidate_project_vars(project_id: Optional[str] = None) -> None:
+    """项目变量写入后调用；project_id 为空时清空全部变量缓存。"""
+    if project_id:
+        _project_vars.pop(project_id)
+    else:
+        _project_vars.clear()
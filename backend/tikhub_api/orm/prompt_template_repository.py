@@ -4,6 +4,7 @@ from datetime import datetime
 
 from .supabase_client import get_client
 from .models import PromptTemplate
+from . import prompt_cache
 
 TABLE = "prompt_templates"
 
@@ -109,6 +110,7 @@ class PromptTemplateRepository:
             payload.pop("id", None)
 
         resp = client.table(TABLE).upsert(payload, on_conflict="name,version").execute()
+        prompt_cache.invalidate_template(payload.get("name"))
         data = (resp.data or [None])[0]
         return PromptTemplateRepository._row_to_model(data) if data else (
             t if isinstance(t, PromptTemplate) else PromptTemplate(**payload)
@@ -134,6 +136,7 @@ class PromptTemplateRepository:
             .eq("version", version)
             .execute()
         )
+        prompt_cache.invalidate_template(name)
         return None
 
     # -------------------- Mappers/Utils --------------------
@@ -3,7 +3,9 @@ from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 from .supabase_client import get_client
+from .pagination import page_by_id
 from .models import PromptVariable
+from . import prompt_cache
 
 TABLE = "prompt_variables"
 
@@ -45,16 +47,14 @@ class PromptVariableRepository:
         return PromptVariableRepository._row_to_model(row) if row else None
 
     @staticmethod
-    def list_by_project(project_id: str, limit: int = 200, offset: int = 0) -> List[PromptVariable]:
+    def list_by_project(project_id: str, limit: int = 200, offset: int = 0, after_id: Optional[int] = None) -> List[PromptVariable]:
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
             .select("*")
             .eq("project_id", project_id)
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [PromptVariableRepository._row_to_model(r) for r in (resp.data or [])]
 
     # ----------------------- Writes ------------------------
@@ -76,6 +76,7 @@ class PromptVariableRepository:
             if payload.get("id") is None:
                 payload.pop("id", None)
             resp = client.table(TABLE).upsert(payload, on_conflict="project_id,variable_name").execute()
+            prompt_cache.invalidate_project_vars(payload.get("project_id"))
             data = (resp.data or [None])[0]
             return PromptVariableRepository._row_to_model(data) if data else PromptVariable(**payload)
 
@@ -92,6 +93,7 @@ class PromptVariableRepository:
             payload.pop("id", None)
 
         resp = client.table(TABLE).upsert(payload, on_conflict="project_id,variable_name").execute()
+        prompt_cache.invalidate_project_vars(payload.get("project_id"))
         data = (resp.data or [None])[0]
         return PromptVariableRepository._row_to_model(data) if data else model  # type: ignore[return-value]
 
@@ -105,6 +107,7 @@ class PromptVariableRepository:
             .eq("variable_name", variable_name)
             .execute()
         )
+        prompt_cache.invalidate_project_vars(project_id)
         return None
 
     # -------------------- Mappers/Utils --------------------
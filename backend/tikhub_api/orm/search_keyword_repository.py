@@ -3,6 +3,7 @@ from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 from .supabase_client import get_client
+from .pagination import page_by_id
 from .models import SearchKeyword
 
 TABLE = "search_keywords"
@@ -72,15 +73,13 @@ class SearchKeywordRepository:
         return SearchKeywordRepository._row_to_model(row) if row else None
 
     @staticmethod
-    def list_all(limit: int = 200, offset: int = 0) -> List[SearchKeyword]:
+    def list_all(limit: int = 200, offset: int = 0, after_id: Optional[int] = None) -> List[SearchKeyword]:
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
             .select("*")
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [SearchKeywordRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
@@ -0,0 +1,214 @@
+"""
+搜索响应日志的后台批量写入（write-behind）
+
+抓取循环只做一次非阻塞入队；后台守护线程按条数/时间间隔攒批，一次 insert 写入 gg_search_response_logs。
+队列满时丢弃并计数（审计日志不应反压搜索吞吐）。
+
+response_data 默认裁剪为摘要（状态码、翻页字段、条目数与条目 id 列表 item_ids、推荐搜索词 guide_search_words）；按 SEARCH_LOG_FULL_SAMPLE_RATE
+抽样保留完整报文，压缩后存入摘要的 full 字段（codec + base64，见 utils.compression）。
+
+配置（环境变量）：
+- SEARCH_LOG_MODE：summary（默认，裁剪）| full（保留完整报文，仍为异步写入）| off（不记录）
+- SEARCH_LOG_FULL_SAMPLE_RATE：summary 模式下保留完整报文的抽样比例（0~1，默认 0）
+- SEARCH_LOG_BATCH_SIZE / SEARCH_LOG_FLUSH_INTERVAL_SEC / SEARCH_LOG_QUEUE_SIZE：攒批条数、最长等待、队列上限
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+import atexit
+import os
+import queue
+import random
+import threading
+import time
+
+from jobs.logger import get_logger
+from ..utils.compression import compress_json
+
+log = get_logger(__name__)
+
+LOG_MODE = (os.getenv("SEARCH_LOG_MODE", "summary") or "summary").strip().lower()
+FULL_SAMPLE_RATE = float(os.getenv("SEARCH_LOG_FULL_SAMPLE_RATE", "0"))
+BATCH_SIZE = int(os.getenv("SEARCH_LOG_BATCH_SIZE", "50"))
+FLUSH_INTERVAL_SEC = float(os.getenv("SEARCH_LOG_FLUSH_INTERVAL_SEC", "2"))
+QUEUE_SIZE = int(os.getenv("SEARCH_LOG_QUEUE_SIZE", "1000"))
+
+# 摘要中保留的顶层/翻页元数据字段（按平台返回结构汇总）
+_META_KEYS = ("code", "message", "msg", "router", "request_id", "time", "cache_url")
+_PAGE_KEYS = ("cursor", "has_more", "searchId", "search_id", "sessionId", "session_id", "total")
+
+
+def summarize_response(response: Optional[Dict[str, Any]], keep_full: bool = False) -> Optional[Dict[str, Any]]:
+    """将搜索响应裁剪为摘要：元数据 + 翻页字段 + 条目 id 列表 + 推荐搜索词；keep_full 时附带压缩后的完整报文。"""
+    if not isinstance(response, dict):
+        return None
+    summary: Dict[str, Any] = {k: response[k] for k in _META_KEYS if k in response}
+    data = response.get("data") if isinstance(response.get("data"), dict) else {}
+    inner = data.get("data")
+    for container in (data, inner if isinstance(inner, dict) else {}):
+        for k in _PAGE_KEYS:
+            if k in container and k not in summary:
+                summary[k] = container[k]
+    extra = data.get("extra")
+    if isinstance(extra, dict) and extra.get("logid"):
+        summary["logid"] = extra["logid"]
+
+    items = _find_items(data)
+    summary["item_count"] = len(items)
+    summary["item_ids"] = [i for i in (_item_id(it) for it in items) if i]
+    # 抖音推荐搜索词（data.guide_search_words[].word），搜索重合度分析使用
+    guide = data.get("guide_search_words")
+    if isinstance(guide, list):
+        summary["guide_search_words"] = [
+            str(g["word"]) for g in guide if isinstance(g, dict) and g.get("word")
+        ]
+    if keep_full:
+        codec, payload, raw_size = compress_json(response)
+        summary["full"] = {"codec": codec, "payload": payload, "raw_size": raw_size}
+    return summary
+
+
+def _find_items(data: Dict[str, Any]) -> List[Any]:
+    """抖音：data.data 为列表；小红书：data.data.items 或 data.items。"""
+    inner = data.get("data")
+    if isinstance(inner, list):
+        return inner
+    if isinstance(inner, dict) and isinstance(inner.get("items"), list):
+        return inner["items"]
+    if isinstance(data.get("items"), list):
+        return data["items"]
+    return []
+
+
+def _item_id(item: Any) -> Optional[str]:
+    if not isinstance(item, dict):
+        return None
+    aweme = item.get("aweme_info")
+    if isinstance(aweme, dict) and aweme.get("aweme_id"):
+        return str(aweme["aweme_id"])
+    note = item.get("note")
+    if isinstance(note, dict) and note.get("id"):
+        return str(note["id"])
+    for k in ("aweme_id", "note_id", "id"):
+        if item.get(k):
+            return str(item[k])
+    return None
+
+
+class SearchLogWriter:
+    """进程内单例的后台批量写入器。submit 永不阻塞；flush 等待已入队日志写完（退出/测试时使用）。"""
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL_SEC,
+                 max_queue: int = QUEUE_SIZE) -> None:
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                log.warning("搜索日志队列已满，丢弃日志（累计 %d 条）", self.dropped)
+            return False
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待队列中的日志全部写完，超时返回 False。"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline or not (self._thread and self._thread.is_alive()):
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="search-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        from .search_response_log_repository import SearchResponseLogRepository
+
+        try:
+            SearchResponseLogRepository.create_many([_prepare(r) for r in batch])
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            log.error("批量写入搜索日志失败（%d 条）：%s", len(batch), e)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writer: Optional[SearchLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> SearchLogWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SearchLogWriter()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def enqueue_search_log(
+    project_id: str,
+    keyword: str,
+    platform: str,
+    page_number: int,
+    batch_id: Optional[str],
+    request_params: Dict[str, Any],
+    response_data: Optional[Dict[str, Any]] = None,
+    error_message: Optional[str] = None,
+) -> bool:
+    """组装日志行并非阻塞入队，返回是否入队成功。response_data 的裁剪/压缩在后台线程完成（见 _prepare）。"""
+    if LOG_MODE == "off":
+        return False
+    return get_writer().submit({
+        "project_id": project_id,
+        "keyword": keyword,
+        "platform": platform,
+        "page_number": page_number,
+        "batch_id": batch_id,
+        "request_params": dict(request_params or {}),
+        "response_data": response_data,
+        "response_status": "success" if response_data and not error_message else "error",
+        "error_message": error_message,
+        "request_timestamp": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+def _prepare(row: Dict[str, Any]) -> Dict[str, Any]:
+    """后台线程中按 SEARCH_LOG_MODE 裁剪 response_data。"""
+    if LOG_MODE != "full" and row.get("response_data") is not None:
+        keep_full = FULL_SAMPLE_RATE > 0 and random.random() < FULL_SAMPLE_RATE
+        row = dict(row, response_data=summarize_response(row["response_data"], keep_full=keep_full))
+    return row
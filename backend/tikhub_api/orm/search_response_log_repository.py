@@ -2,6 +2,8 @@ from __future__ import annotations
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
+from postgrest.types import ReturnMethod
+
 from .supabase_client import get_client
 from .models import SearchResponseLog
 
@@ -58,6 +60,23 @@ class SearchResponseLogRepository:
         data = resp.data[0] if resp.data else None
         return SearchResponseLogRepository._row_to_model(data) if data else model  # type: ignore[return-value]
 
+    @staticmethod
+    def create_many(rows: List[Dict[str, Any]]) -> int:
+        """批量插入日志行（不回读），返回插入条数。
+        与 create() 一致去掉值为 None 的字段（由列默认值生效）；PostgREST 批量插入会把缺失字段置为 NULL，
+        因此按字段集合分组，每组一次请求。
+        """
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for row in rows or []:
+            payload = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items() if v is not None}
+            groups.setdefault(frozenset(payload.keys()), []).append(payload)
+        if not groups:
+            return 0
+        client = get_client()
+        for group in groups.values():
+            client.table(TABLE).insert(group, returning=ReturnMethod.minimal).execute()
+        return sum(len(g) for g in groups.values())
+
     # ------------------------ Reads ------------------------
     @staticmethod
     def get_by_id(log_id: int) -> Optional[SearchResponseLog]:
@@ -1,30 +1,107 @@
 import os
-from typing import Optional
+import threading
+import time
+from typing import Optional, Dict, Any
 from supabase import create_client, Client
 from dotenv import load_dotenv, find_dotenv
 
+try:
+    import httpx
+    from supabase import ClientOptions
+except Exception:  # pragma: no cover
+    httpx = None
+    ClientOptions = None
+
 # 尝试自动加载离当前运行目录最近的 .env（向上查找）
 load_dotenv(find_dotenv())
 
+# 客户端策略：thread=每线程一个 Client（默认），shared=进程级单例（旧行为）
+CLIENT_MODE = (os.getenv("SUPABASE_CLIENT_MODE", "thread") or "thread").strip().lower()
+# 所有 Client 共享的 HTTP 连接池上限（车道线程池、调度器、API 共用）
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", str(MAX_CONNECTIONS)))
+# 单请求超时；连接池占满时等待空闲连接的超时
+TIMEOUT_SEC = float(os.getenv("SUPABASE_TIMEOUT_SEC", "120"))
+POOL_TIMEOUT_SEC = float(os.getenv("SUPABASE_POOL_TIMEOUT_SEC", "30"))
+
 _client: Optional[Client] = None
+_local = threading.local()
+_lock = threading.Lock()
+_http: Optional["httpx.Client"] = None
+_created = 0
 
 
 def get_client() -> Client:
-    """Get a singleton Supabase client using environment variables.
+    """Get a Supabase client using environment variables.
 
     Required envs:
       - SUPABASE_URL
       - SUPABASE_KEY  (anon/service role; use service role on server side)
+
+    默认每个线程持有独立的 Client（Client 内部的 postgrest/auth 子客户端为懒创建、非线程安全），
+    底层共享一个有上限的 httpx 连接池（SUPABASE_MAX_CONNECTIONS），提高车道并发不会串行在同一个 Client 上。
     """
     global _client
-    if _client is not None:
+    if CLIENT_MODE == "shared":
+        if _client is None:
+            with _lock:
+                if _client is None:
+                    _client = _create()
         return _client
 
+    client = getattr(_local, "client", None)
+    if client is None:
+        client = _create()
+        _local.client = client
+    return client
+
+
+def _create() -> Client:
+    global _created
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
     if not url or not key:
         raise RuntimeError("Missing SUPABASE_URL or SUPABASE_KEY env vars")
 
-    _client = create_client(url, key)
-    return _client
+    http = _shared_http()
+    if http is not None:
+        client = create_client(url, key, options=ClientOptions(httpx_client=http))
+    else:
+        client = create_client(url, key)
+    with _lock:
+        _created += 1
+    return client
+
+
+def _shared_http() -> Optional["httpx.Client"]:
+    """进程级共享的 httpx 连接池；supabase-py 不支持注入 httpx_client 时返回 None（各 Client 自带连接池）。"""
+    global _http
+    if httpx is None or ClientOptions is None or "httpx_client" not in getattr(ClientOptions, "__dataclass_fields__", {}):
+        return None
+    if _http is None:
+        with _lock:
+            if _http is None:
+                _http = httpx.Client(
+                    limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE),
+                    timeout=httpx.Timeout(TIMEOUT_SEC, pool=POOL_TIMEOUT_SEC),
+                    http2=False,
+                )
+    return _http
+
 
+def check_health(table: str = "gg_platform_post") -> Dict[str, Any]:
+    """数据库连通性检查：以当前线程的 Client 执行一次最小查询，返回状态、耗时与连接池配置。"""
+    start = time.time()
+    info: Dict[str, Any] = {
+        "mode": CLIENT_MODE,
+        "max_connections": MAX_CONNECTIONS if _shared_http() is not None else None,
+        "clients_created": _created,
+    }
+    try:
+        get_client().table(table).select("id").limit(1).execute()
+        info["ok"] = True
+    except Exception as e:
+        info["ok"] = False
+        info["error"] = str(e)
+    info["latency_ms"] = round((time.time() - start) * 1000, 2)
+    return info
@@ -3,10 +3,17 @@ from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 
 from .supabase_client import get_client
+from .pagination import page_by_id
 from .models import VideoAnalysis
 
 TABLE = "gg_video_analysis"
 
+# 分析结果缓存所需列（Supabase SQL Editor 执行一次）：
+#
+#   alter table gg_video_analysis add column if not exists input_fingerprint text;
+#   create index if not exists idx_gg_video_analysis_fingerprint
+#     on gg_video_analysis (project_id, input_fingerprint);
+
 
 class VideoAnalysisRepository:
     """CRUD helpers for gg_video_analysis.
@@ -83,28 +90,40 @@ class VideoAnalysisRepository:
         return VideoAnalysisRepository._row_to_model(row) if row else None
 
     @staticmethod
-    def list_by_post(post_id: int, limit: int = 50, offset: int = 0) -> List[VideoAnalysis]:
+    def get_by_fingerprint(project_id: str, input_fingerprint: str) -> Optional[VideoAnalysis]:
+        """按分析输入指纹取该项目下最近一条分析结果（见 analysis.result_cache）。"""
         client = get_client()
         resp = (
             client.table(TABLE)
             .select("*")
-            .eq("post_id", post_id)
+            .eq("project_id", project_id)
+            .eq("input_fingerprint", input_fingerprint)
             .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
+            .limit(1)
             .execute()
         )
+        row = resp.data[0] if resp.data else None
+        return VideoAnalysisRepository._row_to_model(row) if row else None
+
+    @staticmethod
+    def list_by_post(post_id: int, limit: int = 50, offset: int = 0, after_id: Optional[int] = None) -> List[VideoAnalysis]:
+        client = get_client()
+        query = (
+            client.table(TABLE)
+            .select("*")
+            .eq("post_id", post_id)
+        )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [VideoAnalysisRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
-    def list_recent(limit: int = 50, offset: int = 0) -> List[VideoAnalysis]:
+    def list_recent(limit: int = 50, offset: int = 0, after_id: Optional[int] = None) -> List[VideoAnalysis]:
         client = get_client()
-        resp = (
+        query = (
             client.table(TABLE)
             .select("*")
-            .order("id", desc=True)
-            .range(offset, offset + max(limit - 1, 0))
-            .execute()
         )
+        resp = page_by_id(query, limit, offset, after_id).execute()
         return [VideoAnalysisRepository._row_to_model(r) for r in (resp.data or [])]
 
     @staticmethod
@@ -140,6 +159,7 @@ class VideoAnalysisRepository:
             relevance_evidence=row.get("relevance_evidence"),
             transcript_json=row.get("transcript_json"),
             handling_suggestions=row.get("handling_suggestions"),
+            input_fingerprint=row.get("input_fingerprint"),
         )
 
 
@@ -0,0 +1,54 @@
+from __future__ import annotations
+from typing import Any, Optional, Tuple
+import base64
+import gzip
+import json
+import os
+
+try:  # 可选依赖：安装 zstandard 后使用 zstd，否则回落 gzip
+    import zstandard as _zstd  # type: ignore
+except Exception:  # pragma: no cover
+    _zstd = None
+
+CODEC_ZSTD = "zstd"
+CODEC_GZIP = "gzip"
+
+_ZSTD_LEVEL = int(os.getenv("RAW_DETAILS_ZSTD_LEVEL", "6"))
+_GZIP_LEVEL = int(os.getenv("RAW_DETAILS_GZIP_LEVEL", "6"))
+
+
+def default_codec() -> str:
+    """RAW_DETAILS_CODEC 指定的编码（zstd/gzip）；zstd 不可用时回落 gzip。"""
+    codec = (os.getenv("RAW_DETAILS_CODEC", CODEC_ZSTD) or CODEC_ZSTD).strip().lower()
+    if codec == CODEC_ZSTD and _zstd is None:
+        return CODEC_GZIP
+    return codec if codec in (CODEC_ZSTD, CODEC_GZIP) else CODEC_GZIP
+
+
+def compress_json(obj: Any, codec: Optional[str] = None) -> Tuple[str, str, int]:
+    """JSON 序列化并压缩，返回 (codec, base64 文本, 原始字节数)。
+    以 base64 文本存储，便于经 PostgREST 的 JSON 接口读写。
+    """
+    codec = codec or default_codec()
+    raw = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if codec == CODEC_ZSTD:
+        if _zstd is None:
+            raise RuntimeError("zstandard 未安装，无法使用 zstd 编码")
+        packed = _zstd.ZstdCompressor(level=_ZSTD_LEVEL).compress(raw)
+    else:
+        packed = gzip.compress(raw, compresslevel=_GZIP_LEVEL)
+    return codec, base64.b64encode(packed).decode("ascii"), len(raw)
+
+
+def decompress_json(codec: str, payload: str) -> Any:
+    """compress_json 的逆操作。"""
+    packed = base64.b64decode(payload)
+    if codec == CODEC_ZSTD:
+        if _zstd is None:
+            raise RuntimeError("zstandard 未安装，无法解压 zstd 数据")
+        raw = _zstd.ZstdDecompressor().decompress(packed)
+    elif codec == CODEC_GZIP:
+        raw = gzip.decompress(packed)
+    else:
+        raise ValueError(f"未知的压缩编码: {codec}")
+    return json.loads(raw.decode("utf-8"))
@@ -0,0 +1,38 @@
+from __future__ import annotations
+import threading
+import time
+
+
+class RateLimiter:
+    """线程安全的令牌桶限流器。
+
+    - rate: 每秒补充的令牌数（<=0 表示不限流）
+    - burst: 桶容量，允许的瞬时突发请求数
+    acquire() 会阻塞到拿到令牌为止，多个线程共享同一个实例即可实现全局限流。
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self) -> None:
+        if not self.enabled:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
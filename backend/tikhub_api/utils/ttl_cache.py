@@ -0,0 +1,83 @@
+from __future__ import annotations
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+import threading
+import time
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[V]):
+    """线程安全的进程内 TTL 缓存（轻量实现，不引入额外依赖）。
+
+    - 每个条目可单独指定过期时间，默认使用 default_ttl（秒）
+    - 超过 max_size 时优先淘汰已过期条目，再按写入顺序淘汰最旧条目
+    - 仅适合小规模热点数据（详情报文、URL 校验结果、prompt 模板等）
+    """
+
+    def __init__(self, default_ttl: float = 60.0, max_size: int = 1024) -> None:
+        self.default_ttl = float(default_ttl)
+        self.max_size = max(1, int(max_size))
+        self._data: Dict[Hashable, Tuple[float, V]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                self._data.pop(key, None)
+                return default
+            return value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        ttl_val = self.default_ttl if ttl is None else float(ttl)
+        if ttl_val <= 0:
+            return
+        expires_at = time.monotonic() + ttl_val
+        with self._lock:
+            # dict 保持插入顺序：重复写入时先删除再插入，使其成为“最新”条目
+            self._data.pop(key, None)
+            self._data[key] = (expires_at, value)
+            if len(self._data) > self.max_size:
+                self._evict_locked()
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING  # type: ignore[arg-type]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def _evict_locked(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+        for k in expired:
+            self._data.pop(k, None)
+        while len(self._data) > self.max_size:
+            oldest = next(iter(self._data))
+            self._data.pop(oldest, None)
+
+
+def make_key(*parts: Any) -> Tuple[Any, ...]:
+    """将请求参数规整为可哈希的缓存 key（dict 按 key 排序）。"""
+    out = []
+    for p in parts:
+        if isinstance(p, dict):
+            out.append(tuple(sorted((str(k), str(v)) for k, v in p.items())))
+        else:
+            out.append(p)
+    return tuple(out)
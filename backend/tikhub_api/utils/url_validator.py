@@ -1,7 +1,15 @@
 from __future__ import annotations
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit, parse_qs
 import logging
+import os
+import re
+import time
 import requests
+from requests.adapters import HTTPAdapter
+
+from .ttl_cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -10,8 +18,44 @@ logger = logging.getLogger(__name__)
 # - 若 HEAD 不允许或返回 405/403/4xx，但可能可直连，则尝试带 Range 的 GET（只取前 1 字节）
 # - 认为有效的条件：HTTP 200/206，并且 Content-Type 看起来像视频或 application/octet-stream
 # - 超时和错误都视为无效
+#
+# 并发模型：
+# - 所有校验请求提交到进程级共享线程池（_MAX_WORKERS 即全局并发上限），共享一个带连接池的 Session
+# - validate_url_groups 支持一次提交整页所有帖子的候选 URL，每组（每帖）达到 need 个有效即提前结束
+# - deadline 为整体截止时间；截止时尚未完成（含仍在共享线程池排队）的校验结果未知，URL 保留（排在有效 URL 之后），
+#   只有实际校验失败的 URL 才视为无效
+#
+# 校验时机（URL_VALIDATION_MODE）：
+# - eager（默认）：入库时即联网校验，只存有效 URL；下载前只做离线过滤，不再重复联网校验
+# - lazy：入库时只做离线过滤（去重、剔除已过期的签名 URL），联网校验推迟到下载前（validate_before_download）
+# - 下载前校验带缓存：按 URL 缓存校验结果，并解析 CDN 签名参数中的过期时间，已过期的 URL 不发任何请求
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+_DEFAULT_TIMEOUT = _env_int("URL_VALIDATE_TIMEOUT_SEC", 5)  # 单次请求超时（秒）
+_DEFAULT_DEADLINE = _env_int("URL_VALIDATE_DEADLINE_SEC", 15)  # 一次批量校验的整体截止（秒）
+_MAX_WORKERS = _env_int("URL_VALIDATE_MAX_WORKERS", 16)  # 全局并发上限
+# 每帖找到多少个有效 URL 即停止校验其余候选（<=0 表示校验全部）
+DEFAULT_NEED_PER_POST = _env_int("URL_VALIDATE_NEED_PER_POST", 2)
+URL_VALIDATION_MODE = (os.getenv("URL_VALIDATION_MODE", "eager") or "eager").strip().lower()
+_EXPIRY_MARGIN_SEC = _env_int("URL_EXPIRY_MARGIN_SEC", 60)  # 距过期不足该秒数即视为已过期（留出下载时间）
+_VALID_CACHE_TTL_SEC = _env_int("URL_VALIDATE_CACHE_TTL_SEC", 600)  # 有效结果缓存秒数（不超过 URL 自身过期时间）
+_INVALID_CACHE_TTL_SEC = _env_int("URL_VALIDATE_INVALID_CACHE_TTL_SEC", 120)  # 无效结果缓存秒数
+
+# 合理的 epoch 秒区间（2015-01-01 ~ 2100-01-01），用于排除误匹配
+_EPOCH_MIN = 1420070400
+_EPOCH_MAX = 4102444800
+# 十进制 epoch 的过期参数（抖音/TikTok/通用 CDN）
+_DECIMAL_EXPIRY_KEYS = ("x-expires", "x-expire", "expires", "expire", "deadline")
+_HEX8_RE = re.compile(r"^[0-9a-fA-F]{8}$")
+_HEX32_RE = re.compile(r"^[0-9a-fA-F]{32}$")
 
-_DEFAULT_TIMEOUT = 8  # seconds
 _VIDEO_CT_KEYWORDS = (
     "video/",
     "application/octet-stream",
@@ -27,6 +71,12 @@ _DEFAULT_HEADERS = {
     )
 }
 
+_executor = ThreadPoolExecutor(max_workers=max(1, _MAX_WORKERS), thread_name_prefix="url-validate")
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=_MAX_WORKERS, pool_maxsize=_MAX_WORKERS))
+_session.mount("http://", HTTPAdapter(pool_connections=_MAX_WORKERS, pool_maxsize=_MAX_WORKERS))
+_session.headers.update(_DEFAULT_HEADERS)
+
 
 def _looks_like_media(content_type: Optional[str]) -> bool:
     if not content_type:
@@ -38,7 +88,7 @@ def _looks_like_media(content_type: Optional[str]) -> bool:
 
 def _head_ok(url: str, timeout: int) -> bool:
     try:
-        r = requests.head(url, headers=_DEFAULT_HEADERS, allow_redirects=True, timeout=timeout)
+        r = _session.head(url, allow_redirects=True, timeout=timeout)
         if r.status_code in (200, 206):
             return _looks_like_media(r.headers.get("Content-Type"))
         # 有些源对 HEAD 返回 403/405，但 GET 可用
@@ -49,35 +99,258 @@ def _head_ok(url: str, timeout: int) -> bool:
 
 def _range_get_ok(url: str, timeout: int) -> bool:
     try:
-        headers = dict(_DEFAULT_HEADERS)
-        headers["Range"] = "bytes=0-0"
-        r = requests.get(url, headers=headers, stream=True, allow_redirects=True, timeout=timeout)
-        if r.status_code in (200, 206):
-            return _looks_like_media(r.headers.get("Content-Type"))
+        # stream=True 只读响应头；使用 with 及时释放连接回连接池
+        with _session.get(url, headers={"Range": "bytes=0-0"}, stream=True, allow_redirects=True, timeout=timeout) as r:
+            if r.status_code in (200, 206):
+                return _looks_like_media(r.headers.get("Content-Type"))
+            return False
+    except Exception:
         return False
+
+
+def _check_url(url: str, timeout: int) -> bool:
+    return _head_ok(url, timeout) or _range_get_ok(url, timeout)
+
+
+def _plausible_epoch(value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return None
+    if value > _EPOCH_MAX * 100:
+        value = value / 1000.0  # 毫秒
+    return value if _EPOCH_MIN <= value <= _EPOCH_MAX else None
+
+
+def parse_url_expiry(url: str) -> Optional[float]:
+    """从签名 URL 中解析过期时间（epoch 秒），无法识别时返回 None。
+
+    识别规则：
+      - 查询参数 x-expires / expires / deadline 等十进制时间戳（秒或毫秒）
+      - 小红书 CDN：带 sign 的 URL，t 参数为十六进制过期时间戳
+      - 抖音 vod CDN：路径形如 /<32位签名>/<8位十六进制过期时间>/video/...
+    """
+    try:
+        parts = urlsplit(url)
     except Exception:
+        return None
+    query = {k.lower(): v for k, v in parse_qs(parts.query).items() if v}
+
+    for key in _DECIMAL_EXPIRY_KEYS:
+        raw = (query.get(key) or [None])[0]
+        if raw and raw.isdigit():
+            ts = _plausible_epoch(float(raw))
+            if ts is not None:
+                return ts
+
+    if "sign" in query:
+        raw = (query.get("t") or [None])[0]
+        if raw and _HEX8_RE.match(raw):
+            ts = _plausible_epoch(float(int(raw, 16)))
+            if ts is not None:
+                return ts
+
+    segs = [seg for seg in parts.path.split("/") if seg]
+    if len(segs) >= 2 and _HEX32_RE.match(segs[0]) and _HEX8_RE.match(segs[1]):
+        return _plausible_epoch(float(int(segs[1], 16)))
+    return None
+
+
+def is_url_expired(url: str, margin: float = _EXPIRY_MARGIN_SEC, now: Optional[float] = None) -> bool:
+    """URL 携带的签名已过期（或将在 margin 秒内过期）时返回 True；无法识别过期时间时返回 False。"""
+    expires_at = parse_url_expiry(url)
+    if expires_at is None:
         return False
+    return expires_at - margin <= (time.time() if now is None else now)
 
 
-def filter_valid_video_urls(urls: Iterable[Optional[str]], timeout: int = _DEFAULT_TIMEOUT) -> List[str]:
-    """过滤可用的视频直链。
+def _clean_candidates(urls: Iterable[Optional[str]]) -> List[str]:
+    """去空白、去重（保持原顺序）。"""
+    out: List[str] = []
+    seen = set()
+    for u in urls or []:
+        if isinstance(u, str) and u.strip():
+            s = u.strip()
+            if s not in seen:
+                seen.add(s)
+                out.append(s)
+    return out
+
+
+def validate_url_groups(
+    groups: Sequence[Iterable[Optional[str]]],
+    timeout: int = _DEFAULT_TIMEOUT,
+    deadline: Optional[float] = _DEFAULT_DEADLINE,
+    need: Optional[int] = None,
+) -> List[List[str]]:
+    """并发校验多组候选 URL（通常一组对应一个帖子，一次传入整页）。
 
     参数:
-      - urls: URL 可迭代，允许包含 None/空串
+      - groups: 每组为一个 URL 可迭代，允许包含 None/空串
       - timeout: 单次请求超时秒数
+      - deadline: 整体截止秒数（None 表示不设整体截止）；截止时未完成校验的 URL 结果未知，仍保留
+      - need: 每组有效 URL 达到该数量即取消该组剩余校验（None/<=0 表示全部校验）
     返回:
-      - 仅包含验证通过的 URL 列表；若全无效则返回空列表
+      - 与 groups 一一对应的 URL 列表：校验通过的（保持候选原顺序）在前，未完成校验且未过期的在后；
+        need 生效时每组至多 need 个
     """
-    candidates: List[str] = []
-    for u in urls or []:
-        if isinstance(u, str) and u.strip():
-            candidates.append(u.strip())
+    need_n = int(need) if need and need > 0 else 0
+    out: List[List[str]] = []
+    for valid, unchecked in _validate_groups(groups, timeout, deadline, need_n):
+        kept = valid + unchecked
+        out.append(kept[:need_n] if need_n else kept)
+    return out
+
+
+def _validate_groups(
+    groups: Sequence[Iterable[Optional[str]]],
+    timeout: int,
+    deadline: Optional[float],
+    need_n: int,
+) -> List[tuple[List[str], List[str]]]:
+    """validate_url_groups 的实现，按组返回 (校验通过的 URL, 截止时未完成校验且未过期的 URL)。"""
+    cleaned = [_clean_candidates(g) for g in groups]
+    results: List[List[Optional[bool]]] = [[None] * len(c) for c in cleaned]
+    valid_count = [0] * len(cleaned)
+
+    pending: dict[Future, tuple[int, int]] = {}
+    for gi, cands in enumerate(cleaned):
+        for ui, u in enumerate(cands):
+            pending[_executor.submit(_check_url, u, timeout)] = (gi, ui)
+
+    total = len(pending)
+    start = time.monotonic()
+    timed_out = 0
+    while pending:
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+        done, _ = wait(list(pending.keys()), timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for fut in done:
+            gi, ui = pending.pop(fut)
+            try:
+                ok = bool(fut.result())
+            except Exception:
+                ok = False
+            results[gi][ui] = ok
+            if ok:
+                valid_count[gi] += 1
+                # 提前结束：该组已找到足够的有效 URL，取消其尚未开始的校验
+                if need_n and valid_count[gi] >= need_n:
+                    for other, (ogi, _) in list(pending.items()):
+                        if ogi == gi:
+                            other.cancel()
+                            pending.pop(other, None)
+
+    # 截止后仍未完成的请求：尽力取消，结果未知（不视为无效）
+    unfinished = set()
+    for fut, pos in pending.items():
+        fut.cancel()
+        unfinished.add(pos)
+        timed_out += 1
+
+    out: List[tuple[List[str], List[str]]] = []
+    for gi, (cands, flags) in enumerate(zip(cleaned, results)):
+        valid = [u for u, ok in zip(cands, flags) if ok]
+        unchecked = [u for ui, u in enumerate(cands) if (gi, ui) in unfinished and not is_url_expired(u)]
+        out.append((valid, unchecked))
+
+    logger.info(
+        "URL 有效性校验完成：组数=%d，候选=%d，有效=%d，截止未完成=%d（保留），耗时=%.2fs",
+        len(cleaned), total, sum(len(v) for v, _ in out), timed_out, time.monotonic() - start,
+    )
+    return out
+
+
+def drop_expired_urls(urls: Iterable[Optional[str]]) -> List[str]:
+    """离线过滤：去空白、去重并剔除已过期的签名 URL（不发任何网络请求）。"""
+    return [u for u in _clean_candidates(urls) if not is_url_expired(u)]
+
+
+def ingest_url_groups(groups: Sequence[Iterable[Optional[str]]], need: Optional[int] = DEFAULT_NEED_PER_POST) -> List[List[str]]:
+    """入库阶段的候选 URL 处理：eager 模式并发联网校验；lazy 模式仅离线过滤，保留全部候选待下载前校验。"""
+    if URL_VALIDATION_MODE == "lazy":
+        return [drop_expired_urls(g) for g in groups]
+    return validate_url_groups(groups, need=need)
+
+
+def ingest_video_urls(urls: Iterable[Optional[str]], need: Optional[int] = DEFAULT_NEED_PER_POST) -> List[str]:
+    """ingest_url_groups 的单组便捷入口。"""
+    return ingest_url_groups([urls], need=need)[0]
 
-    valid: List[str] = []
+
+_result_cache: TTLCache[bool] = TTLCache(default_ttl=_VALID_CACHE_TTL_SEC, max_size=4096)
+
+
+def validate_before_download(
+    urls: Iterable[Optional[str]],
+    need: Optional[int] = None,
+    deadline: Optional[float] = _DEFAULT_DEADLINE,
+) -> List[str]:
+    """下载前即时校验（带缓存），返回按原顺序排列的可用 URL。
+
+    - 已过期的签名 URL 直接剔除，不发请求
+    - eager 模式下 URL 在入库时已联网校验过，此处只做离线过滤
+    - lazy 模式：命中缓存的 URL 直接复用结果；其余 URL 并发校验后写入缓存（截止时未完成校验的保留在末尾、不缓存）
+    - 有效结果的缓存时间不超过 URL 自身的过期时间
+    """
+    candidates = drop_expired_urls(urls)
+    need_n = int(need) if need and need > 0 else 0
+    if URL_VALIDATION_MODE != "lazy":
+        return candidates[:need_n] if need_n else candidates
+
+    cached: dict[str, bool] = {}
+    unknown: List[str] = []
     for u in candidates:
-        if _head_ok(u, timeout) or _range_get_ok(u, timeout):
-            valid.append(u)
-    invalid_count = max(len(candidates) - len(valid), 0)
-    logger.info("URL 有效性校验完成：输入=%d，判定无效=%d，有效=%d", len(candidates), invalid_count, len(valid))
-    return valid
+        hit = _result_cache.get(u)
+        if hit is None:
+            unknown.append(u)
+        else:
+            cached[u] = hit
+
+    known_valid = sum(1 for ok in cached.values() if ok)
+    unchecked_set: set = set()
+    if unknown and not (need_n and known_valid >= need_n):
+        remaining_need = need_n - known_valid if need_n else 0
+        valid, unchecked = _validate_groups([unknown], _DEFAULT_TIMEOUT, deadline, remaining_need)[0]
+        valid_set = set(valid)
+        unchecked_set = set(unchecked)
+        now = time.time()
+        for u in unknown:
+            if u in unchecked_set:
+                continue  # 截止时未完成校验：结果未知，保留为候选（排在已知有效之后），不写缓存
+            ok = u in valid_set
+            cached[u] = ok
+            if ok:
+                ttl: float = _VALID_CACHE_TTL_SEC
+                expires_at = parse_url_expiry(u)
+                if expires_at is not None:
+                    ttl = min(ttl, expires_at - _EXPIRY_MARGIN_SEC - now)
+                _result_cache.set(u, True, ttl=ttl)
+            elif not need_n:
+                # 提前结束时未校验的 URL 也不在 valid_set 中，只有全量校验时才缓存“无效”
+                _result_cache.set(u, False, ttl=_INVALID_CACHE_TTL_SEC)
+
+    out = [u for u in candidates if cached.get(u)] + [u for u in candidates if u in unchecked_set]
+    return out[:need_n] if need_n else out
 
+
+def filter_valid_video_urls(
+    urls: Iterable[Optional[str]],
+    timeout: int = _DEFAULT_TIMEOUT,
+    deadline: Optional[float] = _DEFAULT_DEADLINE,
+    need: Optional[int] = None,
+) -> List[str]:
+    """过滤可用的视频直链（单组便捷入口，组内 URL 并发校验）。
+
+    参数:
+      - urls: URL 可迭代，允许包含 None/空串
+      - timeout: 单次请求超时秒数
+      - deadline: 整体截止秒数
+      - need: 找到该数量的有效 URL 即提前返回（None 表示全部校验）
+    返回:
+      - 验证通过的 URL 列表，其后为截止时未完成校验的 URL；若全部校验失败则返回空列表
+    """
+    return validate_url_groups([urls], timeout=timeout, deadline=deadline, need=need)[0]
@@ -1,9 +1,14 @@
 import os
 import requests
-from typing import Optional
+import tempfile
+from typing import IO, Optional
 from urllib.parse import urlparse
 import time
 
+# 流式下载的临时文件目录（默认系统临时目录）与写盘块大小
+SPOOL_DIR = os.getenv("VIDEO_SPOOL_DIR") or None
+SPOOL_CHUNK_SIZE = int(os.getenv("VIDEO_SPOOL_CHUNK_SIZE", str(1024 * 1024)))
+
 
 class VideoDownloader:
     """视频下载工具类，用于下载网络视频流"""
@@ -152,6 +157,66 @@ class VideoDownloader:
         print(f"❌ 下载失败(字节流)，已重试 {max_retries} 次")
         return None
 
+    def download_video_to_tempfile(self, url: str, timeout: int = 30,
+                                   chunk_size: int = SPOOL_CHUNK_SIZE) -> Optional[IO[bytes]]:
+        """
+        流式下载到临时文件（内存占用上限为 chunk_size，与视频大小无关），返回已 seek 到开头的文件句柄。
+
+        临时文件位于 VIDEO_SPOOL_DIR（默认系统临时目录），句柄的 name 为文件路径（供 ffmpeg 等外部工具读取），
+        关闭句柄即自动删除；调用方负责 close。
+
+        Args:
+            url (str): 视频下载链接
+            timeout (int): 请求超时时间，默认 30 秒
+            chunk_size (int): 每次写盘的块大小，默认 1MB
+
+        Returns:
+            Optional[IO[bytes]]: 成功返回可 seek 的二进制文件句柄，失败返回 None
+        """
+        if not url:
+            print("错误: URL 不能为空")
+            return None
+        fh = tempfile.NamedTemporaryFile(mode="w+b", dir=SPOOL_DIR, suffix=".mp4")
+        try:
+            with requests.get(url, headers=self.headers, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        fh.write(chunk)
+            fh.flush()
+            fh.seek(0)
+            return fh
+        except requests.RequestException as e:
+            fh.close()
+            print(f"❌ 下载失败(临时文件) - 网络错误: {str(e)}")
+            return None
+        except Exception as e:
+            fh.close()
+            print(f"❌ 下载失败(临时文件) - 未知错误: {str(e)}")
+            return None
+
+    def download_video_to_tempfile_with_retry(self, url: str, max_retries: int = 3, **kwargs) -> Optional[IO[bytes]]:
+        """
+        带重试的临时文件下载。
+
+        Args:
+            url (str): 视频下载链接
+            max_retries (int): 最大重试次数
+            **kwargs: 透传给 download_video_to_tempfile 的参数
+
+        Returns:
+            Optional[IO[bytes]]: 成功返回文件句柄（调用方负责 close），失败返回 None
+        """
+        for attempt in range(max_retries + 1):
+            if attempt > 0:
+                print(f"(临时文件) 第 {attempt} 次重试下载...")
+                time.sleep(2)
+            fh = self.download_video_to_tempfile(url, **kwargs)
+            if fh is not None:
+                return fh
+        print(f"❌ 下载失败(临时文件)，已重试 {max_retries} 次")
+        return None
+
 
     def download_video_with_retry(self, url: str, filename: Optional[str] = None,
                                  max_retries: int = 3, **kwargs) -> Optional[str]:
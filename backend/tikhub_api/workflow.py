@@ -14,11 +14,13 @@ if __name__ == "__main__":
     from tikhub_api.fetchers import create_fetcher, get_supported_platforms
     from tikhub_api.video_downloader import VideoDownloader
     from tikhub_api.orm.post_repository import PostRepository
+    from tikhub_api.utils.url_validator import validate_before_download
 else:
     # 作为模块导入时使用相对导入
     from .fetchers import create_fetcher, get_supported_platforms
     from .video_downloader import VideoDownloader
     from .orm.post_repository import PostRepository
+    from .utils.url_validator import validate_before_download
 
 from jobs.logger import get_logger
 
@@ -42,6 +44,7 @@ class WorkflowOptions:
     force_refresh: bool = False
     page_size: int = 20  # 评论分页等用途
     max_comments: int = 100  # 最大同步评论数量
+    sync_replies: bool = False  # 是否同步楼中楼回复（父子关联按帖子集合式修正）
     # 批处理控制
     batch_size: int = 20  # 搜索结果按批落库大小
     concurrency: int = 1  # 处理并发：当前按 1 顺序处理，后续只需改数字即可
@@ -112,7 +115,8 @@ def run_video_workflow(
         if report.post_id is None:
             report.steps["comments"] = StepResult(ok=False, skipped=True, error="缺少 post_id 或详情未入库")
         else:
-            b_res = _step_sync_comments(fetcher, video_id, int(report.post_id), options.page_size, options.max_comments)
+            b_res = _step_sync_comments(fetcher, video_id, int(report.post_id), options.page_size, options.max_comments,
+                                        sync_replies=options.sync_replies)
             report.steps["comments"] = b_res
     else:
         report.steps["comments"] = StepResult(ok=True, skipped=True)
@@ -164,13 +168,15 @@ def _step_sync_details_and_upsert(fetcher, video_id: str) -> StepResult:
         return StepResult(ok=False, error=f"入库统一领域模型出错: {e}")
 
 
-def _step_sync_comments(fetcher, video_id: str, post_id: int, page_size: int = 20, max_comments: int = 100) -> StepResult:
+def _step_sync_comments(fetcher, video_id: str, post_id: int, page_size: int = 20, max_comments: int = 100,
+                        sync_replies: bool = False) -> StepResult:
     """同步评论（支持多平台）
 
     通过 fetcher.get_comment_adapter() 动态获取对应平台的评论适配器，
     实现平台无关的评论同步逻辑。
 
-    注意：当前仅同步顶层评论，不获取评论的回复（楼中楼）。
+    默认仅同步顶层评论；sync_replies=True 时同步有回复的顶层评论的楼中楼，
+    全部写入后按帖子一次性修正父子关联（CommentRepository.resolve_parent_links）。
 
     翻页逻辑：
     - 抖音：使用 cursor (int) 和 has_more (0/1)
@@ -200,6 +206,8 @@ def _step_sync_comments(fetcher, video_id: str, post_id: int, page_size: int = 2
 
         cursor = 0  # 初始游标（抖音用int，小红书会转为str）
         total_top = 0
+        id_map: Dict[str, int] = {}
+        reply_parents: List[str] = []
         log.info("开始同步顶层评论：视频ID=%s，post_id=%s，最大数量=%s", video_id, post_id, max_comments)
 
         while True:
@@ -233,12 +241,15 @@ def _step_sync_comments(fetcher, video_id: str, post_id: int, page_size: int = 2
 
             # 使用动态适配器转换评论
             models = comment_adapter.to_comment_list(comments, post_id)
-            for c in models:
-                try:
-                    CommentRepository.upsert_comment(c)
-                    # 注意：暂时不同步评论的回复（楼中楼），仅记录顶层评论
-                except Exception as e:
-                    log.warning("视频ID=%s，post_id=%s，顶层评论入库失败：%s", video_id, post_id, e)
+            try:
+                # 整页批量入库（一次往返）
+                id_map.update(CommentRepository.upsert_comments(models))
+                if sync_replies:
+                    reply_parents.extend(
+                        str(m.platform_comment_id) for m in models if int(getattr(m, "reply_count", 0) or 0) > 0
+                    )
+            except Exception as e:
+                log.warning("视频ID=%s，post_id=%s，顶层评论入库失败：%s", video_id, post_id, e)
 
             total_top += len(models)
             log.info("视频ID=%s，post_id=%s，顶层评论累计入库：%s 条", video_id, post_id, total_top)
@@ -255,13 +266,23 @@ def _step_sync_comments(fetcher, video_id: str, post_id: int, page_size: int = 2
             else:
                 break
 
-        return StepResult(ok=True, output={"top_count": total_top})
+        if sync_replies and reply_parents:
+            for top_cid in reply_parents:
+                _sync_replies_for_top_comment(fetcher, video_id, top_cid, post_id, id_map, resolve_links=False)
+            try:
+                fixed = CommentRepository.resolve_parent_links(post_id)
+                log.info("视频ID=%s，post_id=%s，楼中楼父子关联修正：%s 条", video_id, post_id, fixed)
+            except Exception as e:
+                log.warning("视频ID=%s，post_id=%s，修正父子关联失败：%s", video_id, post_id, e)
+
+        return StepResult(ok=True, output={"top_count": total_top, "reply_threads": len(reply_parents)})
     except Exception as e:
         return StepResult(ok=False, error=f"评论同步失败: {e}")
 
 
 
-def sync_comments_for_post_id(post_id: int, page_size: int = 20, max_comments: int = 100) -> StepResult:
+def sync_comments_for_post_id(post_id: int, page_size: int = 20, max_comments: int = 100,
+                              sync_replies: bool = False) -> StepResult:
     """公开方法：按 post_id 同步评论，成功后将 analysis_status 置为 pending。
     封装 _step_sync_comments 以及状态回写逻辑，供 worker/CLI 复用。
 
@@ -269,6 +290,7 @@ def sync_comments_for_post_id(post_id: int, page_size: int = 20, max_comments: i
         post_id: 帖子ID
         page_size: 每页评论数量，默认 20
         max_comments: 最大同步评论数量，默认 100 条
+        sync_replies: 是否同步楼中楼回复
     """
     try:
         # 延迟导入，兼容作为模块或脚本运行
@@ -289,7 +311,8 @@ def sync_comments_for_post_id(post_id: int, page_size: int = 20, max_comments: i
 
         # 创建对应平台 fetcher 并调用内部实现
         fetcher = create_fetcher(str(platform))
-        res = _step_sync_comments(fetcher, str(video_id), int(post_id), page_size=page_size, max_comments=max_comments)
+        res = _step_sync_comments(fetcher, str(video_id), int(post_id), page_size=page_size, max_comments=max_comments,
+                                  sync_replies=sync_replies)
 
         # 成功且未跳过时，写回 analysis_status=pending；失败则写回 comments_failed
         if getattr(res, "ok", False) and not getattr(res, "skipped", False):
@@ -336,7 +359,8 @@ def _step_sync_danmaku_from_post(fetcher, unified_post, video_id: str, video_dir
         duration = int(getattr(unified_post, "duration_ms", 0) or 0)
         if duration <= 0:
             # 尝试从 raw_details 中取
-            raw = getattr(unified_post, "raw_details", {}) or {}
+            raw = PostRepository.get_raw_details(unified_post) if unified_post else {}
+            raw = raw or {}
             if isinstance(raw, dict):
                 aweme_detail = raw.get("aweme_detail", {}) or {}
                 video = aweme_detail.get("video", {}) or {}
@@ -386,7 +410,9 @@ def _step_download_video(fetcher, unified_post, video_id: str, video_dir: str) -
             else:
                 # 兼容旧数据（单个字符串）
                 download_urls = [str(video_url)]
-        else:
+            # 下载前校验：剔除已过期的存储 URL；lazy 模式下另行联网校验可用性（结果带缓存）
+            download_urls = validate_before_download(download_urls)
+        if not download_urls:
             urls = fetcher.get_download_urls(video_id) or []
             download_urls = [str(u) for u in urls if u]
 
@@ -484,10 +510,12 @@ def _fetch_and_save_danmaku(fetcher, video_id: str, video_details: dict, video_d
 
 
 
-def _sync_replies_for_top_comment(fetcher, video_id: str, top_comment_id: str, video_post_id: int, id_map: dict[str, int]):
+def _sync_replies_for_top_comment(fetcher, video_id: str, top_comment_id: str, video_post_id: int, id_map: dict[str, int],
+                                  resolve_links: bool = True):
     """为一个顶层评论同步其所有楼中楼回复（分页拉取，无节流）。
 
-    ⚠️ 注意：此方法暂时不使用，当前仅同步顶层评论，不获取评论的回复。
+    由 _step_sync_comments(sync_replies=True) 调用；每页回复一次批量 upsert，
+    父子关联不再逐条修正，而是由 CommentRepository.resolve_parent_links 按帖子集合式修正。
 
     支持多平台：
     - 通过 fetcher.get_comment_adapter() 获取对应平台的适配器
@@ -499,6 +527,7 @@ def _sync_replies_for_top_comment(fetcher, video_id: str, top_comment_id: str, v
         top_comment_id: 顶层评论 ID
         video_post_id: 数据库中的 post_id
         id_map: 平台评论ID到数据库ID的映射字典
+        resolve_links: 同步完成后是否立即修正父子关联（批量同步多个顶层评论时由调用方最后统一修正）
     """
     try:
         # 动态导入仓库
@@ -514,13 +543,6 @@ def _sync_replies_for_top_comment(fetcher, video_id: str, top_comment_id: str, v
 
         comment_adapter = fetcher.get_comment_adapter()
 
-        # 获取平台名称（用于第二趟修正）
-        platform = getattr(fetcher, 'platform_name', 'unknown').lower()
-        if platform == '抖音':
-            platform = 'douyin'
-        elif platform == '小红书':
-            platform = 'xiaohongshu'
-
         cursor = 0
         page_size = 20
         page_count = 0
@@ -554,61 +576,22 @@ def _sync_replies_for_top_comment(fetcher, video_id: str, top_comment_id: str, v
             if not replies:
                 break
 
-            # 第一趟：基础 upsert，尽力绑定父级
+            # 批量 upsert，尽力绑定父级（父评论尚未入库的留待集合式修正）
             models = comment_adapter.to_reply_list(replies, video_post_id, top_comment_id, id_map)
-            for m in models:
-                try:
-                    saved = CommentRepository.upsert_comment(m)
-                    if getattr(saved, "platform_comment_id", None) and getattr(saved, "id", None):
-                        id_map[str(saved.platform_comment_id)] = int(saved.id)
-                    synced += 1
-                except Exception as e:
-                    log.warning("楼中楼入库失败：top_comment_id=%s，错误=%s", top_comment_id, e)
-
-            # 第二趟：尝试修正 parent_comment_id（针对抖音的 reply_to_reply_id 或小红书的 target_comment）
-            for raw in replies:
-                try:
-                    # 抖音使用 reply_to_reply_id
-                    if platform == 'douyin':
-                        reply_to_reply_id = str(raw.get('reply_to_reply_id', '') or '0')
-                        if reply_to_reply_id == '0':
-                            continue
-                        child_cid = str(raw.get('cid', ''))
-                        parent_db = id_map.get(reply_to_reply_id)
-                        child_db = id_map.get(child_cid)
-                        if parent_db and child_db:
-                            CommentRepository.update_parent_link(
-                                platform=platform,
-                                platform_comment_id=child_cid,
-                                parent_comment_id=parent_db,
-                                parent_platform_comment_id=reply_to_reply_id,
-                                post_id=video_post_id,
-                            )
-                    # 小红书使用 target_comment
-                    elif platform == 'xiaohongshu':
-                        target_comment = raw.get('target_comment') or {}
-                        target_id = str(target_comment.get('id', '') or '')
-                        if not target_id or target_id == top_comment_id:
-                            continue
-                        child_id = str(raw.get('id', ''))
-                        parent_db = id_map.get(target_id)
-                        child_db = id_map.get(child_id)
-                        if parent_db and child_db:
-                            CommentRepository.update_parent_link(
-                                platform=platform,
-                                platform_comment_id=child_id,
-                                parent_comment_id=parent_db,
-                                parent_platform_comment_id=target_id,
-                                post_id=video_post_id,
-                            )
-                except Exception as e:
-                    log.warning("修正父子关联失败：错误=%s", e)
+            try:
+                saved_ids = CommentRepository.upsert_comments(models)
+                id_map.update(saved_ids)
+                synced += len(saved_ids)
+            except Exception as e:
+                log.warning("楼中楼入库失败：top_comment_id=%s，错误=%s", top_comment_id, e)
 
             if has_more == 1 and next_cursor != cursor:
                 cursor = next_cursor
                 continue
             else:
                 break
+        if resolve_links:
+            CommentRepository.resolve_parent_links(video_post_id)
         log.info("视频ID=%s，post_id=%s，顶层评论回复同步完成：top_comment_id=%s，页数=%s，新增/更新=%s", video_id, video_post_id, top_comment_id, page_count, synced)
     except Exception as e:
         log.error("同步楼中楼失败：top_comment_id=%s，错误=%s", top_comment_id, e)
@@ -357,6 +357,7 @@ export default function VideoAnalysisDetail() {
   const ANALYSIS_STATUS_MAP: Record<string, { label: string; className: string }> = {
     init: { label: "未开始", className: "bg-gray-200 dark:bg-gray-800 text-gray-700 dark:text-gray-300" },
     pending: { label: "分析中", className: "bg-blue-100 dark:bg-blue-900/30 text-blue-600 dark:text-blue-400" },
+    batch_queued: { label: "批量分析中", className: "bg-blue-100 dark:bg-blue-900/30 text-blue-600 dark:text-blue-400" },
     analyzed: { label: "已完成", className: "bg-green-100 dark:bg-green-900/30 text-green-600 dark:text-green-400" },
     screening_failed: { label: "初筛失败", className: "bg-red-100 dark:bg-red-900/30 text-red-600 dark:text-red-400" },
     comments_failed: { label: "评论获取失败", className: "bg-red-100 dark:bg-red-900/30 text-red-600 dark:text-red-400" },